@@ -1,76 +1,16 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
-import io # Importamos io para manejar archivos en memoria
+import time
 
-# Estilos CSS para ambientar en amarillo, blanco y azul rey
-st.markdown(
-    """
-    <style>
-    /* Estilos generales del fondo con degradado */
-    .stApp {
-        background: linear-gradient(to right, #FFFFFF, #FFFACD, #4169E1); /* Blanco, Amarillo claro (Cream), Azul Rey */
-        color: #333333; /* Color de texto general */
-    }
-    /* Sidebar */
-    .st-emotion-cache-1oe6z58 { /* Esta clase puede cambiar en futuras versiones de Streamlit */
-        background-color: #F0F8FF; /* Azul claro para la sidebar */
-    }
-    /* Títulos */
-    h1, h2, h3, h4, h5, h6 {
-        color: #4169E1; /* Azul Rey para los títulos */
-    }
-    /* Botones */
-    .stButton>button {
-        background-color: #4169E1; /* Azul Rey para los botones */
-        color: white;
-        border: none;
-        padding: 0.75rem 1.5rem;
-        border-radius: 0.5rem;
-        transition: background-color 0.3s ease;
-    }
-    .stButton>button:hover {
-        background-color: #F8D568; /* Amarillo para hover */
-        color: #4169E1;
-        border: 1px solid #4169E1;
-    }
-    /* Contenedores de contenido principal */
-    .st-emotion-cache-z5fcl4, .st-emotion-cache-1c7y2kl, .st-emotion-cache-nahz7x { /* Clases genéricas para contenedores */
-        background-color: rgba(255, 255, 255, 0.9); /* Blanco semitransparente */
-        padding: 1.5rem;
-        border-radius: 0.75rem;
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-        margin-bottom: 1rem;
-    }
-    /* Mejoras para la tabla (dataframe) */
-    .streamlit-dataframe {
-        border-radius: 0.5rem;
-        overflow: hidden; /* Asegura que las esquinas redondeadas se apliquen bien */
-    }
-    /* Estilo para el botón de "Analiza tus datos" */
-    .analyze-button {
-        background-color: #4169E1;
-        color: white;
-        border: none;
-        padding: 0.75rem 1.5rem;
-        border-radius: 0.5rem;
-        transition: background-color 0.3s ease;
-        text-decoration: none; /* Quita el subrayado del enlace */
-        display: inline-block; /* Permite aplicar padding y centrar */
-        text-align: center;
-        cursor: pointer;
-    }
-    .analyze-button:hover {
-        background-color: #F8D568;
-        color: #4169E1;
-        border: 1px solid #4169E1;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+from avisos_cache import CacheColumnar
+from avisos_estilos import CSS_BOTON_ANALIZAR, CSS_TEMA, hoja_de_estilos
+from avisos_exportacion import exportar_csv, exportar_parquet, exportar_xlsx
+from avisos_ingesta import nucleos_disponibles, revisar_libro
+from avisos_medicion import RUTA_REGISTRO, Medidor
+from avisos_pipeline import POLITICAS_COSTO, atribuir_costes, cargar_y_unir, compactar_tipos
+
+# Estilos CSS para ambientar en amarillo, blanco y azul rey (ver avisos_estilos)
+st.markdown(hoja_de_estilos(CSS_TEMA, CSS_BOTON_ANALIZAR), unsafe_allow_html=True)
 
 # --- Bienvenida y encabezado ---
 st.title("¡Hola, usuario Sura! 👋")
@@ -79,7 +19,7 @@ st.header("Proyecto de **Gerencia de Gestión Administrativa** en Ingeniería Cl
 st.markdown("""
     Aquí podrás **Unir los datos de avisos** para optimizar los procesos.
     Por favor, **sube el archivo `BASE DE DATOS.XLSX`** para comenzar.
-    **Importante**: El archivo debe contener las siguientes hojas y en el orden especificado:
+    **Importante**: El archivo debe contener las siguientes hojas (se buscan por nombre y, si no se encuentran, por este orden):
     1.  **IW29**
     2.  **IW39**
     3.  **IH08**
@@ -89,100 +29,179 @@ st.markdown("""
     Este documento fue creado por **Naida López, Aprendiz Universitaria 2025**.
 """)
 
-# --- Función de carga & unión (optimizada para Streamlit) ---
-@st.cache_data
-def load_and_merge_data(uploaded_file_buffer: io.BytesIO) -> pd.DataFrame:
+# --- Caché en disco compartida entre sesiones y reinicios del servidor ---
+@st.cache_resource
+def obtener_cache() -> CacheColumnar:
+    return CacheColumnar()
+
+# --- Función de carga & unión (con caché en disco por contenido del archivo) ---
+def load_and_merge_data(contenido: bytes, paralelo: bool = False, filtros: dict = None) -> tuple:
     """
     Carga y fusiona los datos de las diferentes hojas de un archivo Excel.
+    Si el mismo archivo ya se procesó antes, el resultado se lee de la caché en disco.
 
     Args:
-        uploaded_file_buffer (io.BytesIO): Buffer del archivo Excel subido por el usuario.
+        contenido (bytes): Contenido del archivo Excel subido por el usuario.
+        paralelo (bool): Si es True, cada hoja se lee en un proceso distinto.
+        filtros (dict): Filtros que se aplican a IW29 antes de unir las hojas.
 
     Returns:
-        pd.DataFrame: El DataFrame combinado y limpio.
+        tuple: El DataFrame combinado y limpio, la lista de tiempos de lectura por hoja,
+        el reporte de filas de cada unión y el de cada filtro.
     """
-    # Cargar hojas directamente desde el buffer
-    # Asegúrate de que el orden de las hojas en el archivo Excel coincida con este orden de índices.
-    iw29 = pd.read_excel(uploaded_file_buffer, sheet_name=0)
-    uploaded_file_buffer.seek(0) # Rebobinar el buffer para leer la siguiente hoja
-    iw39 = pd.read_excel(uploaded_file_buffer, sheet_name=1)
-    uploaded_file_buffer.seek(0)
-    ih08 = pd.read_excel(uploaded_file_buffer, sheet_name=2)
-    uploaded_file_buffer.seek(0)
-    iw65 = pd.read_excel(uploaded_file_buffer, sheet_name=3)
-    uploaded_file_buffer.seek(0)
-    zpm015 = pd.read_excel(uploaded_file_buffer, sheet_name=4)
-
-    # Limpiar encabezados
-    for df_temp in (iw29, iw39, ih08, iw65, zpm015):
-        df_temp.columns = df_temp.columns.str.strip()
-
-    # Guardar "Equipo" original desde IW29 para evitar pérdida
-    equipo_original = iw29[["Aviso", "Equipo", "Duración de parada", "Descripción"]].copy()
-
-    # Extraer solo columnas necesarias de iw39 para el merge (incluyendo 'Total general (real)')
-    iw39_subset = iw39[["Aviso", "Total general (real)"]]
-
-    # Unir por 'Aviso'
-    tmp1 = pd.merge(iw29, iw39_subset, on="Aviso", how="left")
-    tmp2 = pd.merge(tmp1, iw65, on="Aviso", how="left")
-
-    # Restaurar el valor original de "Equipo" de IW29 después del merge
-    tmp2.drop(columns=["Equipo"], errors='ignore', inplace=True)
-    tmp2 = pd.merge(tmp2, equipo_original, on="Aviso", how="left")
-
-    # Unir por 'Equipo' con IH08
-    tmp3 = pd.merge(tmp2, ih08[[
-        "Equipo", "Inic.garantía prov.", "Fin garantía prov.", "Texto", "Indicador ABC", "Denominación de objeto técnico"
-    ]], on="Equipo", how="left")
-
-    # Unir por 'Equipo' con ZPM015
-    tmp4 = pd.merge(tmp3, zpm015[["Equipo", "TIPO DE SERVICIO"]], on="Equipo", how="left")
-
-    # Renombrar columnas
-    tmp4.rename(columns={
-        "Texto": "Texto_equipo",
-        "Total general (real)": "Costes tot.reales"
-    }, inplace=True)
-
-    columnas_finales = [
-        "Aviso", "Orden", "Fecha de aviso", "Código postal", "Status del sistema",
-        "Descripción", "Ubicación técnica", "Indicador", "Equipo",
-        "Denominación de objeto técnico", "Denominación ejecutante",
-        "Duración de parada", "Centro de coste", "Costes tot.reales",
-        "Inic.garantía prov.", "Fin garantía prov.", "Texto_equipo",
-        "Indicador ABC", "Texto código acción", "Texto de acción",
-        "Texto grupo acción", "TIPO DE SERVICIO"
-    ]
-
-    # Filtrar solo las columnas que realmente existen en tmp4
-    columnas_finales = [col for col in columnas_finales if col in tmp4.columns]
-
-    return tmp4[columnas_finales]
+    # El libro ya se revisó con revisar_libro antes de llamar a esta función
+    return cargar_y_unir(contenido, paralelo=paralelo, cache=obtener_cache(), filtros=filtros, revisar=False)
+
+
+# --- Administración de la caché ---
+with st.sidebar.expander("Administración de caché"):
+    estado_cache = obtener_cache().estadisticas()
+    st.metric("Aciertos", f"{estado_cache['aciertos']:,}")
+    st.metric("Fallos", f"{estado_cache['fallos']:,}")
+    st.metric("Archivos en caché", f"{estado_cache['entradas']:,}")
+    st.metric(
+        "Espacio usado",
+        f"{estado_cache['bytes_usados'] / 1024**2:,.1f} MB de {estado_cache['limite_bytes'] / 1024**2:,.0f} MB"
+    )
+    if st.button("Vaciar caché", key="vaciar_cache"):
+        obtener_cache().vaciar()
+        st.rerun()
 
 # --- 3. Uploader y Ejecución ---
+lectura_paralela = st.sidebar.checkbox(
+    "Leer las hojas en paralelo",
+    value=nucleos_disponibles() > 1,
+    help="Lee cada hoja del archivo en un proceso distinto. En servidores de un solo núcleo se lee en secuencia."
+)
+politica_costo = st.sidebar.selectbox(
+    "Reparto del costo de cada aviso",
+    options=list(POLITICAS_COSTO),
+    format_func=lambda politica: POLITICAS_COSTO[politica],
+    help="Cómo se asigna el costo de un aviso a sus filas (una por acción)."
+)
+compactar = st.sidebar.checkbox(
+    "Compactar tipos de columnas",
+    value=True,
+    help="Guarda los textos repetidos como categorías y los identificadores como enteros: "
+         "ocupa menos memoria y agiliza los cálculos. El Parquet descargado conserva estos tipos."
+)
+
+# Filtros que se aplican a IW29 antes de las uniones: las filas descartadas no se unen
+with st.sidebar.expander("Filtros previos a la unión"):
+    filtros = {"excluir_status": st.text_input(
+        "Excluir avisos cuyo 'Status del sistema' contiene", value="PTBO",
+        help="Déjalo vacío para no excluir ningún status."
+    ).strip()}
+    if st.checkbox("Limitar por fecha de aviso", key="filtrar_fechas"):
+        rango_fechas = st.date_input("Fecha de aviso (desde – hasta)", value=(), key="rango_fechas")
+        if len(rango_fechas) == 2:
+            filtros["fecha_desde"], filtros["fecha_hasta"] = rango_fechas
+    centros_texto = st.text_input("Centros de coste (separados por coma)", help="Déjalo vacío para incluir todos.")
+    filtros["centros_coste"] = [centro.strip() for centro in centros_texto.split(",") if centro.strip()]
+
+mostrar_medicion = st.sidebar.checkbox(
+    "Mostrar medición por etapa",
+    help="Tiempo real, tiempo de CPU y memoria de cada etapa de esta ejecución. "
+         "Las etapas se guardan siempre en el registro de medición."
+)
+
+# Cada ejecución de la app mide sus etapas; se registran junto con las opciones elegidas
+medidor = Medidor(
+    "union", politica_costo=politica_costo, paralelo=lectura_paralela, compactar=compactar, filtros=filtros
+)
+
+def mostrar_medicion_etapas():
+    """Panel de la barra lateral con las etapas medidas en esta ejecución, si se pidió."""
+    if not mostrar_medicion:
+        return
+    with st.sidebar.expander("Medición por etapa", expanded=True):
+        st.dataframe(medidor.tabla(), hide_index=True)
+        st.caption(
+            f"Ejecución completa: {medidor.segundos_transcurridos():,.2f} s. "
+            f"Registro: {RUTA_REGISTRO or 'desactivado'}."
+        )
+
 uploaded_file = st.file_uploader("Sube tu archivo 'BASE DE DATOS.XLSX' aquí", type=["xlsx"])
 
 if uploaded_file:
-    # Usamos io.BytesIO para pasar el archivo como un buffer en memoria
-    # Esto es crucial para que read_excel pueda leer múltiples hojas del mismo archivo
-    # sin tener que guardarlo en el disco del servidor de Streamlit.
-    file_buffer = io.BytesIO(uploaded_file.getvalue())
+    # Los bytes del archivo identifican la entrada en la caché y se leen desde un buffer
+    # en memoria, sin tener que guardar el archivo subido en el disco del servidor.
+    contenido_archivo = uploaded_file.getvalue()
+
+    # Revisión previa: solo nombres de hojas y encabezados, sin leer los datos
+    with medidor.etapa("revisión del libro"):
+        revision = revisar_libro(contenido_archivo)
+    for advertencia in revision["Advertencias"]:
+        st.warning(advertencia)
+    if revision["Errores"]:
+        st.error(
+            "El archivo no se puede procesar:\n\n" + "\n".join(f"- {error}" for error in revision["Errores"])
+            + "\n\nRevisa que tenga las hojas IW29, IW39, IH08, IW65 y ZPM015 con sus columnas."
+        )
+        st.caption(f"Revisión del archivo: {revision['Segundos']:,.2f} s")
+        # st.stop() termina el script antes del final: el panel de medición se muestra aquí
+        mostrar_medicion_etapas()
+        st.stop()
 
     with st.spinner('Cargando y procesando datos... Esto puede tomar un momento.'):
         try:
-            df = load_and_merge_data(file_buffer)
+            inicio_carga = time.perf_counter()
+            with medidor.etapa("lectura y unión"):
+                df, tiempos_lectura, reporte_union, reporte_filtros = load_and_merge_data(
+                    contenido_archivo, paralelo=lectura_paralela, filtros=filtros
+                )
+            with st.expander("Tiempos de lectura por hoja"):
+                st.dataframe(pd.DataFrame(tiempos_lectura))
+                st.caption(f"Tiempo total de carga y unión: {time.perf_counter() - inicio_carga:,.2f} s")
+            with st.expander("Detalle de las uniones"):
+                st.dataframe(reporte_union)
+            if not reporte_filtros.empty:
+                with st.expander("Filtros aplicados antes de la unión"):
+                    st.dataframe(reporte_filtros)
+                    st.caption(
+                        f"Tiempo de unión ahorrado (estimado): "
+                        f"{reporte_filtros['Segundos de unión ahorrados (estimado)'].sum():,.2f} s"
+                    )
+
+            # Avisar cuando una hoja de dimensión trae claves repetidas (se conservó la primera fila)
+            for _, union in reporte_union[reporte_union["Filas descartadas"] > 0].iterrows():
+                st.warning(
+                    f"{union['Unión']}: se encontraron {union['Claves repetidas']} valores de '{union['Clave']}' repetidos "
+                    f"(p. ej. {union['Ejemplos de claves repetidas']}). Se conservó la primera fila de cada uno "
+                    f"y se descartaron {union['Filas descartadas']} filas para no multiplicar los avisos."
+                )
+
+            # Textos repetidos como categorías e identificadores como enteros compactos
+            if compactar:
+                with medidor.etapa("compactación de tipos"):
+                    df, resumen_tipos = compactar_tipos(df)
+                with st.expander("Memoria de los datos"):
+                    st.write(
+                        f"{resumen_tipos['Bytes antes'] / 1024**2:,.1f} MB → "
+                        f"{resumen_tipos['Bytes después'] / 1024**2:,.1f} MB"
+                    )
+                    st.caption(
+                        f"Categóricas: {', '.join(resumen_tipos['Categóricas']) or 'ninguna'}. "
+                        f"Enteras: {', '.join(resumen_tipos['Enteras']) or 'ninguna'}."
+                    )
 
             # --- Procesamiento adicional ---
-            # Eliminar registros cuyo 'Status del sistema' contenga "PTBO"
-            initial_rows = len(df)
-            df = df[~df["Status del sistema"].str.contains("PTBO", case=False, na=False)]
-            st.info(f"Se eliminaron {initial_rows - len(df)} registros con 'PTBO' en 'Status del sistema'.")
-
-            # Dejar solo una fila con coste por cada aviso
-            df['Costes tot.reales'] = df.groupby('Aviso')['Costes tot.reales'].transform(
-                lambda x: [x.iloc[0]] + [0]*(len(x)-1)
-            )
+            # Los registros con "PTBO" en 'Status del sistema' (y los demás filtros) se quitaron antes de unir
+            for _, filtro in reporte_filtros.iterrows():
+                st.info(f"Se eliminaron {filtro['Filas eliminadas']} avisos por el filtro: {filtro['Filtro']}.")
+
+            # Repartir el costo de cada aviso entre sus filas según la política elegida
+            pesos_grupo = None
+            if politica_costo == "por_grupo_accion" and "Texto grupo acción" in df.columns:
+                with st.expander("Pesos por grupo de acción"):
+                    grupos_accion = sorted(df["Texto grupo acción"].dropna().astype(str).unique())
+                    tabla_pesos = st.data_editor(
+                        pd.DataFrame({"Grupo de acción": grupos_accion, "Peso": 1.0}),
+                        disabled=["Grupo de acción"], hide_index=True, key="pesos_grupo_accion"
+                    )
+                    pesos_grupo = dict(zip(tabla_pesos["Grupo de acción"], tabla_pesos["Peso"]))
+            with medidor.etapa("reparto de costos"):
+                df = atribuir_costes(df, politica_costo, pesos_grupo)
 
             st.success("✅ Datos cargados y procesados exitosamente.")
             st.write(f"**Filas finales:** {len(df)} – **Columnas:** {len(df.columns)}")
@@ -209,36 +228,42 @@ if uploaded_file:
             st.markdown("---")
             st.subheader("Descarga de Datos Procesados")
 
-            # Preparar CSV para descarga
-            csv_output = df.to_csv(index=False).encode('utf-8')
+            # Los archivos se generan solo cuando se pulsa cada botón, por bloques y en un archivo temporal;
+            # Streamlit recibe los bytes del archivo terminado (ver avisos_exportacion).
+            # Esas etapas terminan después de la ejecución: solo quedan en el registro de medición.
             st.download_button(
                 label="Descargar como CSV",
-                data=csv_output,
+                data=lambda datos=df: medidor.medir("exportación csv", exportar_csv, datos),
                 file_name="avisos_filtrados.csv",
                 mime="text/csv",
                 help="Descarga el archivo en formato CSV."
             )
 
-            # Preparar Excel para descarga
-            excel_buffer = io.BytesIO()
-            df.to_excel(excel_buffer, index=False, engine='openpyxl')
-            excel_buffer.seek(0) # Rebobinar el buffer antes de enviarlo
             st.download_button(
                 label="Descargar como Excel",
-                data=excel_buffer,
+                data=lambda datos=df: medidor.medir("exportación xlsx", exportar_xlsx, datos),
                 file_name="avisos_filtrados.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 help="Descarga el archivo en formato XLSX."
             )
 
+            st.download_button(
+                label="Descargar para análisis (Parquet)",
+                data=lambda datos=df: medidor.medir("exportación parquet", exportar_parquet, datos),
+                file_name="avisos_filtrados.parquet",
+                mime="application/vnd.apache.parquet",
+                help="Archivo con los tipos de datos conservados. Súbelo en 'Analiza tus datos' para cargarlo en segundos."
+            )
+
             st.markdown("---")
             st.success("¡El procesamiento ha finalizado! Ahora puedes descargar tus datos o seguir explorando.")
 
             # --- Botón para la siguiente página ---
             st.markdown("---")
             st.subheader("Siguiente Paso")
+            st.caption("Para que el análisis cargue en segundos, sube allí el archivo descargado en formato Parquet.")
             # Se usa un st.markdown con HTML para simular un botón de redirección externo.
-            # Se aplica la clase CSS 'analyze-button' definida en el bloque de estilo inicial.
+            # Se aplica la clase CSS 'analyze-button' de la hoja de estilos (CSS_BOTON_ANALIZAR en avisos_estilos).
             st.markdown(
                 f'<a href="https://codigoavisos-q7pbp58bj6oegweh3ag6vo.streamlit.app/" target="_blank" class="analyze-button">'
                 f'Analiza tus datos'
@@ -252,3 +277,6 @@ if uploaded_file:
             st.exception(e) # Muestra el traceback completo para depuración
 else:
     st.info("⬆️ Sube tu archivo `BASE DE DATOS.XLSX` para empezar con el análisis.")
+
+# --- Medición por etapa de esta ejecución ---
+mostrar_medicion_etapas()
@@ -0,0 +1,488 @@
+# -*- coding: utf-8 -*-
+"""
+Mediciones de rendimiento de las etapas del procesamiento de avisos.
+
+Suites:
+    costos   Atribución de costos con lambda frente a las políticas vectorizadas.
+    ingesta  Lectura, unión, filtro y exportación con datos sintéticos de varios
+             tamaños; guarda los resultados en JSON para compararlos entre versiones.
+    arranque Arranque en frío de las dos apps (primera ejecución de la página de
+             carga en un intérprete nuevo) frente a un presupuesto de segundos, con
+             los módulos que más tardan en importarse.
+
+Uso:
+    python avisos_bench.py --filas 300000
+    python avisos_bench.py --suite ingesta --tamanos 10000 100000 1000000 5000000 --json bench.json
+    python avisos_bench.py --suite ingesta --tamanos 100000 --comparar bench_anterior.json
+    python avisos_bench.py --suite arranque --presupuesto 2.5
+"""
+
+import argparse
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from avisos_cache import CacheColumnar
+from avisos_exportacion import escribir_csv, escribir_parquet, escribir_xlsx
+from avisos_ingesta import leer_hojas_sap, nucleos_disponibles
+from avisos_medicion import leer_memoria_mb
+from avisos_pipeline import POLITICAS_COSTO, atribuir_costes, excluir_status, unir_con_filtros, unir_hojas
+from avisos_sintetico import FILAS_MAXIMAS_EXCEL, escribir_libro_sap, generar_hojas_sap
+
+# Tamaños por defecto de la suite de ingesta (filas del resultado de la unión)
+TAMANOS_INGESTA = [10_000, 100_000, 1_000_000, 5_000_000]
+
+_RUTA_TABLERO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_avisos (4).py")
+_RUTA_UNION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "avisos.py")
+
+# Apps de la suite de arranque y presupuesto de su arranque en frío, en segundos (importar
+# streamlit + primera ejecución de la página de carga; se puede cambiar con una variable de entorno)
+APPS_ARRANQUE = {"unión (avisos.py)": _RUTA_UNION, "tablero": _RUTA_TABLERO}
+PRESUPUESTO_ARRANQUE_S = float(os.environ.get("AVISOS_PRESUPUESTO_ARRANQUE", "2.5"))
+# Librerías de gráficos, que la página de carga no debe importar
+LIBRERIAS_GRAFICOS = ("matplotlib", "seaborn")
+_MARCA_ARRANQUE = "@@arranque avisos@@"
+
+# Se ejecuta en un intérprete nuevo con -X importtime: mide la importación de streamlit y
+# dos ejecuciones de la app; la marca separa en stderr las importaciones de la app
+_CODIGO_ARRANQUE = f"""
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_listo = time.perf_counter()
+sys.stderr.write({_MARCA_ARRANQUE!r} + "\\n")
+sys.stderr.flush()
+app = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+primera = time.perf_counter()
+app.run()
+segunda = time.perf_counter()
+print(json.dumps({{
+    "streamlit": streamlit_listo - inicio,
+    "primera": primera - streamlit_listo,
+    "siguiente": segunda - primera,
+    "errores": [str(error.value) for error in app.exception],
+    "graficos": [modulo for modulo in {LIBRERIAS_GRAFICOS!r} if modulo in sys.modules],
+}}))
+"""
+
+
+def _cronometrar(funcion, repeticiones: int, preparar=None) -> float:
+    """Devuelve el mejor tiempo (en segundos) de varias ejecuciones de la función."""
+    return _medir(funcion, repeticiones, preparar)[0]
+
+
+def _medir(funcion, repeticiones: int, preparar=None) -> tuple:
+    """
+    Ejecuta la función varias veces y devuelve (mejor tiempo en segundos, último resultado).
+    Si se indica, 'preparar' se ejecuta antes de cada repetición, fuera de la medición.
+    """
+    mejor = float("inf")
+    resultado = None
+    for _ in range(max(1, repeticiones)):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def _pico_memoria(funcion, preparar=None) -> tuple:
+    """
+    Ejecuta la función una vez y devuelve (segundos, resultado, pico de memoria en MB).
+
+    En Linux el pico es lo que crece la memoria residente del proceso (VmHWM, que se
+    reinicia antes de medir), e incluye la memoria de pyarrow y de las librerías en C.
+    En otros sistemas se usa tracemalloc, que solo ve la memoria reservada desde Python
+    y hace la ejecución más lenta.
+    """
+    if preparar is not None:
+        preparar()
+    try:
+        # Escribir '5' en clear_refs reinicia el pico de memoria residente (VmHWM)
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        base = leer_memoria_mb("VmRSS")
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        return segundos, resultado, round(leer_memoria_mb("VmHWM") - base, 1)
+    except OSError:
+        pass
+
+    tracemalloc.start()
+    try:
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return segundos, resultado, round(pico / 1024 / 1024, 1)
+
+
+def _atribucion_con_lambda(df: pd.DataFrame) -> pd.Series:
+    """Versión anterior de la atribución de costos (una lambda por aviso), como referencia."""
+    return df.groupby("Aviso")["Costes tot.reales"].transform(
+        lambda x: [x.iloc[0]] + [0]*(len(x)-1)
+    )
+
+
+def bench_atribucion_costes(filas: int = 300_000, acciones_por_aviso: float = 2.0, repeticiones: int = 3) -> list:
+    """
+    Compara la atribución de costos con lambda frente a cada política vectorizada.
+
+    Args:
+        filas (int): Filas del DataFrame de prueba (una por acción).
+        acciones_por_aviso (float): Promedio de acciones por aviso.
+        repeticiones (int): Ejecuciones por medición; se reporta la más rápida.
+
+    Returns:
+        list: Un dict por método con 'Método', 'Filas', 'Segundos' y 'Aceleración'.
+    """
+    rng = np.random.default_rng(0)
+    avisos = np.sort(rng.integers(0, max(1, int(filas / acciones_por_aviso)), filas)) + 10_000_000
+    costo_aviso = pd.Series(rng.random(avisos.max() + 1) * 1_000_000)
+    df = pd.DataFrame({
+        "Aviso": avisos,
+        "Costes tot.reales": costo_aviso.to_numpy()[avisos],
+        "Texto grupo acción": rng.choice(["REPARACIÓN", "REVISIÓN", "CALIBRACIÓN"], filas),
+    })
+    pesos = {"REPARACIÓN": 3.0, "REVISIÓN": 1.0, "CALIBRACIÓN": 2.0}
+
+    base = _cronometrar(lambda: _atribucion_con_lambda(df), repeticiones)
+    resultados = [{"Método": "lambda (anterior)", "Filas": filas, "Segundos": round(base, 4), "Aceleración": 1.0}]
+    for politica in POLITICAS_COSTO:
+        segundos = _cronometrar(lambda: atribuir_costes(df, politica, pesos), repeticiones)
+        resultados.append({
+            "Método": politica,
+            "Filas": filas,
+            "Segundos": round(segundos, 4),
+            "Aceleración": round(base / segundos, 1),
+        })
+    return resultados
+
+
+def _cargar_tablero():
+    """
+    Importa el tablero (code_avisos (4).py) como módulo para medir su carga de datos.
+
+    La caché en disco y el registro de mediciones del tablero se cambian por unos en
+    una carpeta temporal: la medición vacía la caché antes de cada carga y no debe
+    tocar la del tablero real ni agregar sus etapas a su registro.
+    """
+    spec = importlib.util.spec_from_file_location("tablero_avisos", _RUTA_TABLERO)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    carpeta = tempfile.mkdtemp(prefix="avisos_bench_")
+    cache = CacheColumnar(directorio=os.path.join(carpeta, "cache"))
+    modulo.obtener_cache = lambda: cache
+    modulo.medidor.ruta_registro = os.path.join(carpeta, "medicion_avisos.jsonl")
+    return modulo
+
+
+def _etapas_ingesta(filas: int, opciones: dict, tablero) -> list:
+    """
+    Define, en orden, las etapas que se miden para un tamaño. Cada etapa es una tupla
+    (nombre, resultados previos que requiere, función que recibe el estado, clave del
+    estado donde se guarda su resultado, función 'preparar' o None, motivo para omitirla o None).
+    """
+    omitir_excel = None
+    if filas > FILAS_MAXIMAS_EXCEL:
+        omitir_excel = f"más de {FILAS_MAXIMAS_EXCEL} filas no caben en una hoja de Excel"
+
+    def en_memoria(escritor, datos):
+        destino = io.BytesIO()
+        escritor(datos, destino)
+        return destino.getvalue()
+
+    etapas = [
+        ("generación", (), lambda e: generar_hojas_sap(filas, **opciones), "hojas", None, None),
+        ("libro SAP a xlsx", ("hojas",), lambda e: en_memoria(escribir_libro_sap, e["hojas"]), "libro", None, omitir_excel),
+        ("lectura 5 hojas (avisos.py)", ("libro",), lambda e: leer_hojas_sap(io.BytesIO(e["libro"]))[0], None, None, omitir_excel),
+        ("unión", ("hojas",), lambda e: unir_hojas(e["hojas"])[0], "union", None, None),
+        ("filtro PTBO", ("union",), lambda e: excluir_status(e["union"], "PTBO")[0], "filtrado", None, None),
+        # Lo mismo que 'unión' + 'filtro PTBO', pero filtrando IW29 antes de unir
+        ("filtro PTBO previo + unión", ("hojas",), lambda e: unir_con_filtros(e["hojas"])[0], None, None, None),
+        ("reparto de costos", ("filtrado",), lambda e: atribuir_costes(e["filtrado"]), "final", None, None),
+        ("exportación csv", ("final",), lambda e: en_memoria(escribir_csv, e["final"]), None, None, None),
+        ("exportación parquet", ("final",), lambda e: en_memoria(escribir_parquet, e["final"]), "parquet", None, None),
+        ("exportación xlsx", ("final",), lambda e: en_memoria(escribir_xlsx, e["final"]), "xlsx", None, omitir_excel),
+    ]
+    if tablero is not None:
+        # La caché en disco del tablero se vacía antes de cada carga para medir la lectura real
+        vaciar_cache = lambda: tablero.obtener_cache().vaciar()
+        etapas += [
+            (
+                "carga xlsx (tablero)", ("xlsx",),
+                lambda e: tablero.load_and_merge_data(io.BytesIO(e["xlsx"])), None, vaciar_cache, omitir_excel
+            ),
+            (
+                "carga parquet (tablero)", ("parquet",),
+                lambda e: tablero.load_and_merge_data(io.BytesIO(e["parquet"])), None, vaciar_cache, None
+            ),
+        ]
+    return etapas
+
+
+def _filas_resultado(resultado):
+    """Filas de un resultado intermedio (DataFrame o dict de hojas); None para bytes."""
+    if isinstance(resultado, pd.DataFrame):
+        return len(resultado)
+    if isinstance(resultado, dict):
+        return sum(len(df) for df in resultado.values())
+    return None
+
+
+def bench_ingesta(
+    tamanos: list = None,
+    repeticiones: int = 1,
+    medir_memoria: bool = True,
+    incluir_tablero: bool = True,
+    **opciones,
+) -> list:
+    """
+    Mide cada etapa de la ingesta con datos sintéticos de varios tamaños.
+
+    Las etapas que necesitan un archivo Excel se omiten cuando el tamaño supera el
+    máximo de filas de una hoja. Si una etapa falla (por ejemplo, por una columna
+    faltante) se registra el error y se omiten las etapas que dependen de ella.
+
+    Args:
+        tamanos (list): Filas del resultado de la unión que se prueban.
+        repeticiones (int): Ejecuciones por medición; se reporta la más rápida.
+        medir_memoria (bool): Si es True, se registra el pico de memoria de cada etapa.
+        incluir_tablero (bool): Si es True, también se mide la carga de datos del tablero.
+        **opciones: Opciones de generar_hojas_sap (tasa_duplicados, columnas_faltantes...).
+
+    Returns:
+        list: Un dict por etapa y tamaño con 'Etapa', 'Filas', 'Filas salida',
+        'Segundos', 'Pico MB' y 'Nota'.
+    """
+    tablero = None
+    if incluir_tablero:
+        tablero = _cargar_tablero()
+
+    resultados = []
+    for filas in tamanos or TAMANOS_INGESTA:
+        estado = {}
+        for nombre, requiere, funcion, clave, preparar, omitir in _etapas_ingesta(filas, opciones, tablero):
+            fila = {"Etapa": nombre, "Filas": filas, "Filas salida": None, "Segundos": None, "Pico MB": None, "Nota": ""}
+            resultados.append(fila)
+            faltante = next((requerido for requerido in requiere if requerido not in estado), None)
+            if omitir:
+                fila["Nota"] = f"omitida: {omitir}"
+                continue
+            if faltante:
+                fila["Nota"] = f"omitida: no hay resultado de '{faltante}'"
+                continue
+
+            ejecutar = lambda: funcion(estado)
+            try:
+                if medir_memoria:
+                    # La primera ejecución mide también la memoria; las demás solo el tiempo
+                    segundos, resultado, fila["Pico MB"] = _pico_memoria(ejecutar, preparar)
+                    if repeticiones > 1:
+                        segundos = min(segundos, _cronometrar(ejecutar, repeticiones - 1, preparar))
+                else:
+                    segundos, resultado = _medir(ejecutar, repeticiones, preparar)
+            except Exception as e:
+                fila["Nota"] = f"error: {type(e).__name__}: {e}"
+                continue
+            fila["Segundos"] = round(segundos, 4)
+            fila["Filas salida"] = _filas_resultado(resultado)
+            if clave is not None:
+                estado[clave] = resultado
+            del resultado
+    return resultados
+
+
+def _importaciones_app(stderr: str, cantidad: int) -> list:
+    """
+    Resume la salida de -X importtime después de la marca: tiempo acumulado de los
+    módulos que importa la app directamente, sumado por paquete, de mayor a menor.
+    """
+    _, _, salida = stderr.partition(_MARCA_ARRANQUE)
+    por_paquete = {}
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        # Los módulos importados por otros van con dos espacios más por nivel
+        if not acumulado.strip().isdigit() or len(nombre) - len(nombre.lstrip()) > 1:
+            continue
+        paquete = nombre.strip().split(".")[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0) + int(acumulado) / 1e6
+    mayores = sorted(por_paquete.items(), key=lambda item: item[1], reverse=True)[:cantidad]
+    return [{"Módulo": paquete, "Segundos": round(segundos, 4)} for paquete, segundos in mayores]
+
+
+def bench_arranque(
+    repeticiones: int = 1, presupuesto: float = PRESUPUESTO_ARRANQUE_S, modulos: int = 10, apps: dict = None
+) -> tuple:
+    """
+    Mide el arranque en frío de las apps: cada medición corre en un intérprete nuevo,
+    con la página de carga (la que se ve al abrir la app) y sin datos.
+
+    Etapas: importar streamlit, primera ejecución del script (sus importaciones y la
+    primera pintura) y una ejecución siguiente, ya con los módulos cargados. El
+    arranque en frío (las dos primeras) se compara con el presupuesto.
+
+    Args:
+        repeticiones (int): Mediciones por app; se reporta la más rápida.
+        presupuesto (float): Segundos máximos del arranque en frío.
+        modulos (int): Módulos por app en el informe de importaciones.
+        apps (dict): Nombre -> ruta del script (por defecto, APPS_ARRANQUE).
+
+    Returns:
+        tuple: (un dict por etapa y app con 'Etapa', 'Filas', 'Segundos' y 'Nota';
+        un dict por app y módulo con 'App', 'Módulo' y 'Segundos' de importación).
+    """
+    resultados, importaciones = [], []
+    for nombre, ruta in (apps or APPS_ARRANQUE).items():
+        mejor = None
+        for _ in range(max(1, repeticiones)):
+            proceso = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", _CODIGO_ARRANQUE, ruta],
+                capture_output=True, text=True, cwd=os.path.dirname(ruta),
+            )
+            if proceso.returncode != 0:
+                raise RuntimeError(f"No se pudo medir el arranque de {nombre}: {proceso.stderr.strip()[-500:]}")
+            medicion = json.loads(proceso.stdout.strip().splitlines()[-1])
+            if mejor is None or medicion["streamlit"] + medicion["primera"] < mejor["streamlit"] + mejor["primera"]:
+                mejor, stderr = medicion, proceso.stderr
+
+        frio = mejor["streamlit"] + mejor["primera"]
+        notas = [
+            f"{'dentro del' if frio <= presupuesto else 'SUPERA el'} presupuesto: {frio:,.2f} s de {presupuesto:,.2f} s"
+        ]
+        if mejor["graficos"]:
+            notas.append(f"la página de carga importa {', '.join(mejor['graficos'])}")
+        if mejor["errores"]:
+            notas.append(f"errores: {'; '.join(mejor['errores'])}")
+        for etapa, clave, nota in [
+            ("importación de streamlit", "streamlit", ""),
+            ("primera ejecución", "primera", "; ".join(notas)),
+            ("ejecución siguiente", "siguiente", ""),
+        ]:
+            resultados.append({
+                "Etapa": f"arranque {nombre}: {etapa}", "Filas": None, "Segundos": round(mejor[clave], 4), "Nota": nota,
+            })
+        importaciones += [{"App": nombre, **fila} for fila in _importaciones_app(stderr, modulos)]
+    return resultados, importaciones
+
+
+def arranque_aceptable(resultados: list) -> bool:
+    """True si ninguna app supera el presupuesto ni importa gráficos o falla en la página de carga."""
+    notas = " ".join(fila["Nota"] for fila in resultados)
+    return not any(texto in notas for texto in ("SUPERA", "importa", "errores"))
+
+
+def guardar_resultados(resultados: list, ruta: str, parametros: dict):
+    """
+    Guarda los resultados en JSON junto con los datos del entorno, para compararlos
+    con mediciones de otras versiones.
+    """
+    documento = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "nucleos": nucleos_disponibles(),
+        "parametros": parametros,
+        "resultados": resultados,
+    }
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2)
+
+
+def comparar_resultados(resultados: list, ruta_anterior: str) -> pd.DataFrame:
+    """
+    Compara los tiempos con los de un JSON guardado antes, por etapa y tamaño.
+
+    Returns:
+        pd.DataFrame: Segundos actuales y anteriores y el cambio en porcentaje
+        (positivo = más lento que antes).
+    """
+    with open(ruta_anterior, encoding="utf-8") as f:
+        anteriores = pd.DataFrame(json.load(f)["resultados"])
+    actuales = pd.DataFrame(resultados)
+    comparacion = actuales[["Etapa", "Filas", "Segundos"]].merge(
+        anteriores[["Etapa", "Filas", "Segundos"]], on=["Etapa", "Filas"], how="left", suffixes=("", " anterior")
+    )
+    comparacion["Cambio %"] = ((comparacion["Segundos"] / comparacion["Segundos anterior"] - 1) * 100).round(1)
+    return comparacion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el rendimiento de las etapas del procesamiento de avisos.")
+    parser.add_argument("--suite", choices=["costos", "ingesta", "arranque"], default="costos", help="Conjunto de mediciones.")
+    parser.add_argument("--filas", type=int, default=300_000, help="Filas del DataFrame de prueba (suite costos).")
+    parser.add_argument("--repeticiones", type=int, default=None, help="Ejecuciones por medición (3 en costos, 1 en ingesta).")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS_INGESTA, help="Tamaños de la suite ingesta.")
+    parser.add_argument("--tasa-duplicados", type=float, default=0.0, help="Fracción de filas repetidas en las dimensiones.")
+    parser.add_argument("--sin-columna", action="append", default=[], help="Columna que se omite en los datos sintéticos.")
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir el pico de memoria.")
+    parser.add_argument("--sin-tablero", action="store_true", help="No medir la carga de datos del tablero.")
+    parser.add_argument("--json", help="Archivo donde guardar los resultados.")
+    parser.add_argument("--comparar", help="JSON de una medición anterior con el que comparar.")
+    parser.add_argument(
+        "--presupuesto", type=float, default=PRESUPUESTO_ARRANQUE_S, help="Segundos máximos de arranque (suite arranque)."
+    )
+    args = parser.parse_args()
+
+    if args.suite == "costos":
+        print(pd.DataFrame(bench_atribucion_costes(args.filas, repeticiones=args.repeticiones or 3)).to_string(index=False))
+        return
+
+    if args.suite == "arranque":
+        resultados, importaciones = bench_arranque(args.repeticiones or 1, args.presupuesto)
+        print(pd.DataFrame(resultados).to_string(index=False))
+        print()
+        print(pd.DataFrame(importaciones).to_string(index=False))
+        if args.comparar:
+            print()
+            print(comparar_resultados(resultados, args.comparar).to_string(index=False))
+        if args.json:
+            guardar_resultados(resultados, args.json, {"repeticiones": args.repeticiones or 1, "presupuesto": args.presupuesto})
+            print(f"\nResultados guardados en {args.json}", file=sys.stderr)
+        # Código de salida 1 si el arranque se sale del presupuesto (para usarlo en la integración continua)
+        sys.exit(0 if arranque_aceptable(resultados) else 1)
+
+    parametros = {
+        "tamanos": args.tamanos,
+        "repeticiones": args.repeticiones or 1,
+        "tasa_duplicados": args.tasa_duplicados,
+        "columnas_faltantes": args.sin_columna,
+    }
+    resultados = bench_ingesta(
+        args.tamanos,
+        repeticiones=parametros["repeticiones"],
+        medir_memoria=not args.sin_memoria,
+        incluir_tablero=not args.sin_tablero,
+        tasa_duplicados=args.tasa_duplicados,
+        columnas_faltantes=args.sin_columna,
+    )
+    print(pd.DataFrame(resultados).to_string(index=False))
+    if args.comparar:
+        print()
+        print(comparar_resultados(resultados, args.comparar).to_string(index=False))
+    if args.json:
+        guardar_resultados(resultados, args.json, parametros)
+        print(f"\nResultados guardados en {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Caché en disco, direccionada por contenido, para las hojas SAP ya procesadas, y caché
+en memoria de resultados de consultas del tablero.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from avisos_exportacion import escribir_parquet
+
+# Directorio y tamaño máximo por defecto (se pueden cambiar con variables de entorno)
+DIRECTORIO_CACHE = os.environ.get(
+    "AVISOS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_avisos")
+)
+LIMITE_CACHE_MB = float(os.environ.get("AVISOS_CACHE_MAX_MB", "512"))
+# Resultados que se conservan en memoria (agrupaciones, tendencias, indicadores...)
+MAXIMO_RESULTADOS = int(os.environ.get("AVISOS_RESULTADOS_MAX", "128"))
+
+
+def huella_contenido(contenido: bytes) -> str:
+    """
+    Calcula la huella (hash) del contenido de un archivo subido.
+
+    Args:
+        contenido (bytes): Bytes del archivo.
+
+    Returns:
+        str: Huella hexadecimal que identifica el archivo en la caché.
+    """
+    return hashlib.blake2b(contenido, digest_size=20).hexdigest()
+
+
+class CacheColumnar:
+    """
+    Guarda DataFrames en formato Parquet bajo una carpeta por huella de archivo.
+    Cuando el tamaño total supera el límite se eliminan las entradas usadas hace más tiempo (LRU).
+
+    Los aciertos y fallos se cuentan en memoria, por instancia: varios procesos pueden
+    compartir la carpeta sin pisarse un archivo de contadores.
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_CACHE, limite_mb: float = LIMITE_CACHE_MB):
+        self.directorio = directorio
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._contadores = {"aciertos": 0, "fallos": 0}
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta_entrada(self, huella: str) -> str:
+        return os.path.join(self.directorio, huella)
+
+    def _ruta_tabla(self, huella: str, nombre: str) -> str:
+        return os.path.join(self._ruta_entrada(huella), f"{nombre}.parquet")
+
+    def _marcar_uso(self, huella: str) -> bool:
+        """
+        Marca la entrada como usada recientemente (política LRU). Devuelve False si otra
+        sesión o proceso la eliminó entretanto (límite de tamaño o vaciar).
+        """
+        try:
+            os.utime(self._ruta_entrada(huella))
+        except OSError:
+            return False
+        return True
+
+    def _registrar(self, campo: str):
+        """Suma uno al contador indicado ('aciertos' o 'fallos')."""
+        with self._lock:
+            self._contadores[campo] += 1
+
+    def leer(self, huella: str, nombre: str):
+        """
+        Devuelve la tabla guardada para (huella, nombre) o None si no existe.
+
+        Args:
+            huella (str): Huella del archivo de origen.
+            nombre (str): Nombre de la tabla (por ejemplo 'IW29' o 'union').
+
+        Returns:
+            pd.DataFrame | None: La tabla leída de la caché.
+        """
+        ruta = self._ruta_tabla(huella, nombre)
+        try:
+            df = pd.read_parquet(ruta)
+        except (OSError, ValueError):
+            self._registrar("fallos")
+            return None
+        # Si la entrada se eliminó después de leerla, se trata como un fallo
+        if not self._marcar_uso(huella):
+            self._registrar("fallos")
+            return None
+        self._registrar("aciertos")
+        return df
+
+    def guardar(self, huella: str, nombre: str, df: pd.DataFrame) -> bool:
+        """
+        Guarda una tabla en la caché y aplica el límite de tamaño.
+
+        Args:
+            huella (str): Huella del archivo de origen.
+            nombre (str): Nombre de la tabla.
+            df (pd.DataFrame): Tabla a guardar.
+
+        Returns:
+            bool: True si la tabla quedó guardada; False si no se pudo serializar o si
+            otra sesión eliminó la entrada mientras se guardaba.
+        """
+        ruta = self._ruta_tabla(huella, nombre)
+        ruta_temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self._ruta_entrada(huella), exist_ok=True)
+            escribir_parquet(df, ruta_temporal)
+            os.replace(ruta_temporal, ruta) # Escritura atómica: nunca queda un archivo a medias
+        except Exception:
+            # Si la tabla no se puede serializar simplemente no se guarda en caché
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+            return False
+        if not self._marcar_uso(huella):
+            return False
+        self._aplicar_limite()
+        return True
+
+    def _entradas(self) -> list:
+        """Lista (última modificación, bytes, ruta) de cada entrada de la caché."""
+        entradas = []
+        for huella in os.listdir(self.directorio):
+            ruta = self._ruta_entrada(huella)
+            if not os.path.isdir(ruta):
+                continue
+            tamano = sum(entry.stat().st_size for entry in os.scandir(ruta) if entry.is_file())
+            entradas.append((os.stat(ruta).st_mtime, tamano, ruta))
+        return entradas
+
+    def _aplicar_limite(self):
+        """Elimina las entradas menos usadas hasta que la caché quepa en el límite."""
+        with self._lock:
+            entradas = sorted(self._entradas())
+            total = sum(tamano for _, tamano, _ in entradas)
+            for _, tamano, ruta in entradas:
+                if total <= self.limite_bytes:
+                    break
+                shutil.rmtree(ruta, ignore_errors=True)
+                total -= tamano
+
+    def vaciar(self):
+        """Elimina todas las entradas y reinicia los contadores."""
+        with self._lock:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+            os.makedirs(self.directorio, exist_ok=True)
+            self._contadores = {"aciertos": 0, "fallos": 0}
+
+    def estadisticas(self) -> dict:
+        """
+        Resume el estado de la caché para la vista de administración.
+
+        Returns:
+            dict: Aciertos y fallos de esta instancia (desde que se creó o se vació),
+            número de entradas, bytes usados y límite en bytes.
+        """
+        with self._lock:
+            contadores = dict(self._contadores)
+        entradas = self._entradas()
+        return {
+            "aciertos": contadores["aciertos"],
+            "fallos": contadores["fallos"],
+            "entradas": len(entradas),
+            "bytes_usados": sum(tamano for _, tamano, _ in entradas),
+            "limite_bytes": self.limite_bytes,
+        }
+
+
+class CacheResultados:
+    """
+    Caché en memoria de resultados ya calculados, con un número máximo de entradas:
+    al superarlo se descarta la usada hace más tiempo (LRU).
+
+    Las claves deben identificar por completo el cálculo (huella de los datos, filtros,
+    opción de análisis...). Los resultados se comparten entre ejecuciones y sesiones,
+    así que quien los recibe no debe modificarlos.
+    """
+
+    def __init__(self, maximo: int = MAXIMO_RESULTADOS):
+        self.maximo = maximo
+        self._entradas = OrderedDict()
+        self._aciertos = 0
+        self._fallos = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: tuple, calcular):
+        """
+        Devuelve el resultado guardado para la clave o, si no está, lo calcula con
+        calcular() y lo guarda.
+
+        Args:
+            clave (tuple): Clave del resultado (sus elementos deben ser hashables).
+            calcular: Función sin argumentos que calcula el resultado.
+
+        Returns:
+            El resultado guardado o recién calculado.
+        """
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self._aciertos += 1
+                return self._entradas[clave]
+            self._fallos += 1
+        # El cálculo se hace fuera del bloqueo para no detener otras sesiones
+        resultado = calcular()
+        with self._lock:
+            self._entradas[clave] = resultado
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+        return resultado
+
+    def vaciar(self):
+        """Elimina todos los resultados y reinicia los contadores."""
+        with self._lock:
+            self._entradas.clear()
+            self._aciertos = 0
+            self._fallos = 0
+
+    def estadisticas(self) -> dict:
+        """
+        Resume el estado de la caché para la vista de administración.
+
+        Returns:
+            dict: Aciertos, fallos, tasa de aciertos (0 a 1), entradas y máximo de entradas.
+        """
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasa_aciertos": self._aciertos / consultas if consultas else 0.0,
+                "entradas": len(self._entradas),
+                "maximo": self.maximo,
+            }
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Calificaciones de la evaluación de proveedores: una matriz de enteros pregunta ×
+entidad (proveedor o tipo de servicio) por evaluación, guardada en un archivo SQLite
+local por evaluador y evaluación (modo y tipo de servicio o proveedor evaluado).
+
+Los borradores sobreviven a los cambios de selector, a las nuevas ejecuciones y a los
+reinicios del servidor, y el resumen se lee de la matriz de una vez, sin recorrer
+pregunta por pregunta.
+"""
+
+import contextlib
+import datetime
+import hashlib
+import os
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Carpeta de los archivos de calificaciones (se puede cambiar con una variable de entorno)
+DIRECTORIO_CALIFICACIONES = os.environ.get(
+    "AVISOS_CALIFICACIONES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "calificaciones_avisos")
+)
+EVALUADOR_POR_DEFECTO = "anonimo"
+
+# Valor de la matriz para las preguntas sin calificar (las puntuaciones van de -1 a 2)
+SIN_CALIFICAR = np.iinfo(np.int8).min
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS calificaciones (
+    categoria TEXT NOT NULL,
+    pregunta TEXT NOT NULL,
+    entidad TEXT NOT NULL,
+    valor INTEGER NOT NULL,
+    actualizado TEXT NOT NULL,
+    PRIMARY KEY (categoria, pregunta, entidad)
+)
+"""
+
+
+def _nombre_archivo(texto: str) -> str:
+    """Texto apto para nombre de archivo, con una huella corta para que no choquen dos textos parecidos."""
+    legible = re.sub(r"[^0-9A-Za-z_-]+", "_", texto).strip("_")[:60] or "sin_nombre"
+    return f"{legible}-{hashlib.blake2b(texto.encode('utf-8'), digest_size=4).hexdigest()}"
+
+
+def ruta_calificaciones(evaluador: str, modo: str, identificador: str, directorio: str = DIRECTORIO_CALIFICACIONES) -> str:
+    """Archivo SQLite de las calificaciones de un evaluador para una evaluación."""
+    evaluador = (evaluador or "").strip() or EVALUADOR_POR_DEFECTO
+    return os.path.join(directorio, _nombre_archivo(evaluador), f"{_nombre_archivo(f'{modo}-{identificador}')}.sqlite")
+
+
+class AlmacenCalificaciones:
+    """
+    Puntuaciones de una evaluación en una matriz int8 (pregunta × entidad), con
+    SIN_CALIFICAR en las celdas vacías. Los cambios se guardan en SQLite con guardar().
+    """
+
+    def __init__(self, preguntas, entidades, ruta: str = None):
+        """
+        Args:
+            preguntas: (categoría, texto) de cada pregunta, en el orden de la evaluación.
+            entidades: Proveedores o tipos de servicio evaluados.
+            ruta (str): Archivo SQLite (ver ruta_calificaciones); None para no guardar.
+        """
+        self.preguntas = pd.MultiIndex.from_tuples([tuple(pregunta) for pregunta in preguntas], names=['Categoría', 'Pregunta'])
+        self.entidades = pd.Index(list(entidades))
+        self.valores = np.full((len(self.preguntas), len(self.entidades)), SIN_CALIFICAR, dtype=np.int8)
+        self.ruta = ruta
+        self._fila = {pregunta: i for i, pregunta in enumerate(self.preguntas)}
+        self._columna = {entidad: j for j, entidad in enumerate(self.entidades)}
+        self._pendientes = set()
+        if ruta is not None:
+            self._cargar()
+
+    def _conectar(self):
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=10)
+        conexion.execute(_ESQUEMA)
+        return contextlib.closing(conexion)
+
+    def _cargar(self):
+        """Lee las calificaciones guardadas; las de preguntas o entidades que ya no están se ignoran."""
+        if not os.path.exists(self.ruta):
+            return
+        with self._conectar() as conexion:
+            guardadas = pd.read_sql_query("SELECT categoria, pregunta, entidad, valor FROM calificaciones", conexion)
+        # Posición de cada calificación guardada en la matriz (-1 si ya no está)
+        filas = self.preguntas.get_indexer(pd.MultiIndex.from_arrays([guardadas['categoria'], guardadas['pregunta']]))
+        columnas = self.entidades.get_indexer(guardadas['entidad'])
+        conocidas = (filas >= 0) & (columnas >= 0)
+        self.valores[filas[conocidas], columnas[conocidas]] = guardadas['valor'].to_numpy()[conocidas]
+
+    def valor(self, pregunta: tuple, entidad, defecto=None):
+        """Puntuación de una pregunta para una entidad, o el valor por defecto si no está calificada."""
+        valor = self.valores[self._fila[pregunta], self._columna[entidad]]
+        return defecto if valor == SIN_CALIFICAR else int(valor)
+
+    def asignar(self, pregunta: tuple, entidad, valor: int):
+        """Cambia una puntuación (queda pendiente de guardar si es distinta de la actual)."""
+        fila, columna = self._fila[pregunta], self._columna[entidad]
+        if self.valores[fila, columna] != valor:
+            self.valores[fila, columna] = valor
+            self._pendientes.add((fila, columna))
+
+    def guardar(self):
+        """Guarda en SQLite las puntuaciones cambiadas desde el último guardado, en una transacción."""
+        if self.ruta is None or not self._pendientes:
+            return
+        actualizado = datetime.datetime.now().isoformat(timespec="seconds")
+        filas = [
+            (*self.preguntas[fila], self.entidades[columna], int(self.valores[fila, columna]), actualizado)
+            for fila, columna in sorted(self._pendientes)
+        ]
+        with self._conectar() as conexion, conexion:
+            conexion.executemany(
+                "INSERT INTO calificaciones (categoria, pregunta, entidad, valor, actualizado) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (categoria, pregunta, entidad) DO UPDATE SET valor = excluded.valor, actualizado = excluded.actualizado",
+                filas,
+            )
+        self._pendientes.clear()
+
+    def hay_calificaciones(self) -> bool:
+        return bool((self.valores != SIN_CALIFICAR).any())
+
+    def tabla(self) -> pd.DataFrame:
+        """
+        Puntuaciones como DataFrame: una fila por pregunta (índice Categoría, Pregunta),
+        una columna por entidad y NaN en las celdas sin calificar.
+        """
+        valores = np.where(self.valores == SIN_CALIFICAR, np.nan, self.valores.astype('float64'))
+        return pd.DataFrame(valores, index=self.preguntas, columns=self.entidades)
+
+    def totales(self) -> pd.Series:
+        """Puntuación total de cada entidad (las preguntas sin calificar no suman)."""
+        calificadas = np.where(self.valores == SIN_CALIFICAR, 0, self.valores.astype('int64'))
+        return pd.Series(calificadas.sum(axis=0), index=self.entidades)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Procesamiento por lotes, sin interfaz, de archivos BASE DE DATOS.XLSX.
+
+Cada archivo se lee, se filtra, se une y se le reparte el costo igual que en la
+app de Streamlit (avisos.py); el resultado se guarda como CSV y/o Parquet.
+
+Uso:
+    python avisos_cli.py regionales/ otro.xlsx --salida resultados --formato csv parquet --procesos 4
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from avisos_exportacion import escribir_csv, escribir_parquet
+from avisos_ingesta import nucleos_disponibles
+from avisos_pipeline import POLITICAS_COSTO, procesar_libro
+
+EXTENSIONES = {"csv": ".csv", "parquet": ".parquet"}
+
+
+def buscar_archivos(entradas: list) -> list:
+    """
+    Expande las rutas recibidas: los archivos se toman tal cual y las carpetas se
+    recorren buscando archivos .xlsx (se ignoran los temporales '~$' de Excel).
+
+    Returns:
+        list: Tuplas (ruta del archivo, carpeta base) en orden alfabético.
+    """
+    archivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for carpeta, _, nombres in os.walk(entrada):
+                for nombre in nombres:
+                    if nombre.lower().endswith(".xlsx") and not nombre.startswith("~$"):
+                        archivos.append((os.path.join(carpeta, nombre), entrada))
+        else:
+            archivos.append((entrada, os.path.dirname(entrada)))
+    return sorted(archivos)
+
+
+def nombre_salida(ruta: str, base: str) -> str:
+    """
+    Nombre del resultado a partir de la ruta relativa del archivo, para que varios
+    'BASE DE DATOS.XLSX' de carpetas distintas no se pisen (p. ej. 'norte__BASE DE DATOS').
+    """
+    relativa = os.path.relpath(ruta, base) if base else os.path.basename(ruta)
+    sin_extension = os.path.splitext(relativa)[0]
+    return sin_extension.replace(os.sep, "__")
+
+
+def procesar_archivo(
+    ruta: str,
+    destino_base: str,
+    formatos: list,
+    politica_costo: str,
+    usar_cache: bool,
+    compactar: bool = False,
+    filtros: dict = None,
+) -> dict:
+    """
+    Procesa un archivo y escribe sus salidas. Se ejecuta dentro de cada proceso del lote.
+
+    Args:
+        ruta (str): Archivo Excel de entrada.
+        destino_base (str): Ruta de salida sin extensión.
+        formatos (list): Formatos a escribir ('csv', 'parquet').
+        politica_costo (str): Política de reparto del costo.
+        usar_cache (bool): Si es True, se usa la caché en disco de avisos_cache.
+        compactar (bool): Si es True, los textos repetidos se guardan como categorías.
+        filtros (dict): Filtros que se aplican a IW29 antes de unir las hojas.
+
+    Returns:
+        dict: 'Archivo', 'Filas', 'Etapas' (lista de tiempos) y 'Salidas'.
+    """
+    cache = None
+    if usar_cache:
+        from avisos_cache import CacheColumnar
+        cache = CacheColumnar()
+
+    etapas = []
+    inicio = time.perf_counter()
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    etapas.append({"Etapa": "lectura del archivo", "Filas": 0, "Segundos": round(time.perf_counter() - inicio, 3)})
+
+    df, etapas_libro = procesar_libro(
+        contenido, politica_costo=politica_costo, cache=cache, compactar=compactar, filtros=filtros
+    )
+    etapas.extend(etapas_libro)
+
+    salidas = []
+    escritores = {"csv": escribir_csv, "parquet": escribir_parquet}
+    for formato in formatos:
+        destino = destino_base + EXTENSIONES[formato]
+        inicio = time.perf_counter()
+        escritores[formato](df, destino)
+        etapas.append({"Etapa": f"escritura {formato}", "Filas": len(df), "Segundos": round(time.perf_counter() - inicio, 3)})
+        salidas.append(destino)
+
+    return {"Archivo": ruta, "Filas": len(df), "Etapas": etapas, "Salidas": salidas}
+
+
+def _imprimir_resultado(resultado: dict):
+    """Muestra los tiempos por etapa de un archivo procesado."""
+    total = sum(etapa["Segundos"] for etapa in resultado["Etapas"])
+    print(f"\n{resultado['Archivo']}: {resultado['Filas']} filas en {total:.2f} s")
+    print(pd.DataFrame(resultado["Etapas"]).to_string(index=False))
+    for salida in resultado["Salidas"]:
+        print(f"  -> {salida}")
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Procesa por lotes archivos BASE DE DATOS.XLSX de SAP.")
+    parser.add_argument("entradas", nargs="+", help="Archivos .xlsx o carpetas que los contienen.")
+    parser.add_argument("--salida", default="resultados", help="Carpeta donde se escriben los resultados.")
+    parser.add_argument(
+        "--formato", nargs="+", choices=sorted(EXTENSIONES), default=["csv"], help="Formatos de salida."
+    )
+    parser.add_argument(
+        "--procesos", type=int, default=None,
+        help="Archivos procesados a la vez (por defecto, los núcleos disponibles)."
+    )
+    parser.add_argument(
+        "--politica-costo", choices=list(POLITICAS_COSTO), default="primera_fila",
+        help="Cómo se reparte el costo de cada aviso entre sus filas."
+    )
+    parser.add_argument("--cache", action="store_true", help="Usar la caché en disco de las hojas ya procesadas.")
+    parser.add_argument(
+        "--compactar-tipos", action="store_true",
+        help="Guardar los textos repetidos como categorías y los identificadores como enteros (útil con Parquet)."
+    )
+    parser.add_argument(
+        "--excluir-status", default="PTBO",
+        help="Excluir los avisos cuyo 'Status del sistema' contiene este texto ('' para no excluir)."
+    )
+    parser.add_argument("--desde", type=datetime.date.fromisoformat, help="Fecha de aviso inicial (AAAA-MM-DD), incluida.")
+    parser.add_argument("--hasta", type=datetime.date.fromisoformat, help="Fecha de aviso final (AAAA-MM-DD), incluida.")
+    parser.add_argument(
+        "--centro-coste", action="append", default=[], help="Centro de coste a conservar (se puede repetir)."
+    )
+    args = parser.parse_args(argv)
+
+    # Los filtros se aplican a IW29 antes de las uniones
+    filtros = {
+        "excluir_status": args.excluir_status,
+        "fecha_desde": args.desde,
+        "fecha_hasta": args.hasta,
+        "centros_coste": args.centro_coste,
+    }
+
+    archivos = buscar_archivos(args.entradas)
+    if not archivos:
+        print("No se encontraron archivos .xlsx.", file=sys.stderr)
+        return 1
+    os.makedirs(args.salida, exist_ok=True)
+
+    tareas = {
+        ruta: (
+            ruta, os.path.join(args.salida, nombre_salida(ruta, base)), args.formato,
+            args.politica_costo, args.cache, args.compactar_tipos, filtros
+        )
+        for ruta, base in archivos
+    }
+    procesos = min(len(tareas), args.procesos or nucleos_disponibles())
+
+    inicio = time.perf_counter()
+    errores = 0
+    if procesos <= 1:
+        for ruta, parametros in tareas.items():
+            try:
+                _imprimir_resultado(procesar_archivo(*parametros))
+            except Exception as e:
+                errores += 1
+                print(f"\n{ruta}: error: {e}", file=sys.stderr)
+    else:
+        # Un archivo por proceso; dentro de cada uno las hojas se leen en secuencia
+        try:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = {pool.submit(procesar_archivo, *parametros): ruta for ruta, parametros in tareas.items()}
+                for futuro in as_completed(futuros):
+                    try:
+                        _imprimir_resultado(futuro.result())
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        errores += 1
+                        print(f"\n{futuros[futuro]}: error: {e}", file=sys.stderr)
+        except (BrokenProcessPool, OSError) as e:
+            print(f"No se pudo procesar en paralelo ({e}).", file=sys.stderr)
+            return 1
+
+    print(f"\n{len(tareas) - errores}/{len(tareas)} archivos procesados en {time.perf_counter() - inicio:.2f} s.")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Cubo de métricas de los avisos, armado una vez al cargar los datos: las medidas
+aditivas de avisos_indicadores (avisos, costo, tiempo de parada, días y horas de
+operación) y el número de filas por proveedor × tipo de servicio × categoría de la
+descripción × mes.
+
+Las consultas del tablero suman celdas del cubo en lugar de recorrer las filas, así
+que su tiempo depende del número de celdas (unos miles) y no del número de avisos.
+"""
+
+import numpy as np
+import pandas as pd
+
+from avisos_indicadores import MEDIDAS_ADITIVAS, indicadores_desde_medidas
+
+# Grano del cubo; 'MES' es el periodo mensual de la fecha del aviso
+DIMENSIONES_CUBO = ['PROVEEDOR', 'TIPO DE SERVICIO', 'description_category', 'MES']
+COLUMNA_FECHA = 'fecha_de_aviso'
+
+
+class CuboAvisos:
+    """
+    Medidas aditivas por celda (una combinación de DIMENSIONES_CUBO), con la primera y
+    la última fecha de aviso de cada celda para saber si un rango de fechas la toma entera.
+
+    Los avisos distintos de varias celdas solo se pueden sumar si cada aviso cae en una
+    sola celda, que es lo normal (proveedor, tipo de servicio, descripción y fecha son
+    datos del aviso). Si los datos no lo cumplen, avisos_aditivos es False y el cubo no
+    responde consultas (seleccionar devuelve None).
+    """
+
+    def __init__(self, df: pd.DataFrame, columna_fecha: str = COLUMNA_FECHA):
+        """
+        Args:
+            df (pd.DataFrame): Avisos del tablero, ya enriquecidos (ver avisos_enriquecimiento).
+            columna_fecha (str): Columna de fecha de la que sale el mes.
+
+        Raises:
+            ValueError: Si faltan columnas de las dimensiones o de las medidas.
+        """
+        requeridas = DIMENSIONES_CUBO[:-1] + [columna_fecha] + [col for col, _ in MEDIDAS_ADITIVAS.values()]
+        faltantes = [col for col in dict.fromkeys(requeridas) if col not in df.columns]
+        if faltantes:
+            raise ValueError(f"Faltan columnas para armar el cubo de avisos: {', '.join(faltantes)}")
+
+        claves = [df[dimension] for dimension in DIMENSIONES_CUBO[:-1]]
+        claves.append(df[columna_fecha].dt.to_period('M').rename('MES'))
+        # dropna=False: las filas sin proveedor, tipo o fecha también cuentan en los totales
+        self.celdas = df.groupby(claves, observed=True, dropna=False).agg(
+            **MEDIDAS_ADITIVAS,
+            **{
+                "Filas": (columna_fecha, 'size'),
+                "Primera fecha": (columna_fecha, 'min'),
+                "Última fecha": (columna_fecha, 'max'),
+            },
+        ).reset_index()
+        self.filas = len(df)
+        self.avisos_aditivos = int(self.celdas["Avisos"].sum()) == df['AVISO'].nunique()
+
+    def seleccionar(self, proveedor=None, tipo_servicio=None, desde=None, hasta=None):
+        """
+        Celdas que cumplen los filtros (None en un filtro = sin filtrar).
+
+        Un rango de fechas solo se puede responder con el cubo si toma enteras o deja
+        fuera todas las celdas: si corta una celda por la mitad de sus avisos (un mes
+        que el rango incluye solo en parte) hay que calcular sobre las filas.
+
+        Args:
+            proveedor: Valor de 'PROVEEDOR'.
+            tipo_servicio: Valor de 'TIPO DE SERVICIO'.
+            desde (datetime.date): Fecha de aviso inicial, incluida.
+            hasta (datetime.date): Fecha de aviso final, incluida (todo el día).
+
+        Returns:
+            pd.DataFrame | None: Las celdas seleccionadas, o None si el cubo no puede
+            responder exactamente.
+        """
+        if not self.avisos_aditivos:
+            return None
+        celdas = self.celdas
+        mascara = np.ones(len(celdas), dtype=bool)
+        if proveedor is not None:
+            mascara &= (celdas['PROVEEDOR'] == proveedor).to_numpy()
+        if tipo_servicio is not None:
+            mascara &= (celdas['TIPO DE SERVICIO'] == tipo_servicio).to_numpy()
+        if desde is not None or hasta is not None:
+            primera, ultima = celdas["Primera fecha"], celdas["Última fecha"]
+            inicio = pd.Timestamp(desde) if desde is not None else primera.min()
+            fin = pd.Timestamp(hasta) + pd.Timedelta(days=1) if hasta is not None else ultima.max() + pd.Timedelta(days=1)
+            # Las comparaciones con NaT son falsas: las celdas sin fecha quedan fuera
+            dentro = ((primera >= inicio) & (ultima < fin)).to_numpy()
+            fuera = ((ultima < inicio) | (primera >= fin) | primera.isna()).to_numpy()
+            if (mascara & ~dentro & ~fuera).any():
+                return None
+            mascara &= dentro
+        return celdas[mascara]
+
+
+def sumar_por(celdas: pd.DataFrame, claves, medidas=None) -> pd.DataFrame:
+    """
+    Suma las medidas de las celdas por las dimensiones indicadas (las celdas con la
+    dimensión vacía se descartan, como en un groupby sobre las filas).
+
+    Args:
+        celdas (pd.DataFrame): Celdas de CuboAvisos.seleccionar.
+        claves: Dimensión o lista de dimensiones de DIMENSIONES_CUBO.
+        medidas (list): Columnas a sumar (por defecto, todas las de MEDIDAS_ADITIVAS y 'Filas').
+
+    Returns:
+        pd.DataFrame: Las medidas sumadas, indexadas por las claves.
+    """
+    medidas = list(MEDIDAS_ADITIVAS) + ["Filas"] if medidas is None else list(medidas)
+    return celdas.groupby(claves, observed=True)[medidas].sum()
+
+
+def indicadores_cubo(celdas: pd.DataFrame, claves) -> pd.DataFrame:
+    """
+    Indicadores de servicio por grupo sumando celdas; el resultado es el mismo que
+    calcular_tabla_indicadores sobre las filas de esas celdas.
+    """
+    return indicadores_desde_medidas(sumar_por(celdas, claves, MEDIDAS_ADITIVAS))
+
+
+def serie_mensual(celdas: pd.DataFrame, medidas=("Costo", "Avisos")) -> pd.DataFrame:
+    """
+    Medidas por mes entre el primer y el último mes con datos, con 0 en los meses sin
+    avisos e indexadas por el último día de cada mes (igual que resample('ME')).
+    """
+    mensual = sumar_por(celdas, 'MES', medidas)
+    if mensual.empty:
+        return mensual.set_axis(pd.DatetimeIndex([], name='MES'))
+    meses = pd.period_range(mensual.index.min(), mensual.index.max(), freq='M', name='MES')
+    mensual = mensual.reindex(meses, fill_value=0)
+    return mensual.set_axis(meses.to_timestamp(how='end').normalize())
+
+
+def valores_dimension(celdas: pd.DataFrame, dimension: str) -> list:
+    """Valores distintos y no vacíos de una dimensión en las celdas, ordenados."""
+    return sorted(celdas[dimension].dropna().unique().tolist())
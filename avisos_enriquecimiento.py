@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Columnas derivadas que el tablero (code_avisos (4).py) agrega a cada aviso:
+horario de operación del equipo, categoría de la descripción, año y mes.
+
+Todas se calculan una vez por valor distinto y se expanden a las filas con sus
+códigos, sin funciones de Python por fila.
+"""
+
+import calendar
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Tabla de horarios versionada junto al código (se puede cambiar con una variable de entorno)
+RUTA_HORARIOS = os.environ.get(
+    "AVISOS_HORARIOS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "horarios.csv")
+)
+COLUMNAS_HORARIOS = ["HORARIO", "HORA/ DIA", "DIAS/ AÑO"]
+
+# Categoría de la descripción: las dos letras mayúsculas antes de '/' al inicio (p. ej. 'MC/...')
+PATRON_CATEGORIA = re.compile(r"^([A-Z]{2})/")
+CATEGORIA_POR_DEFECTO = "Otros"
+
+
+def cargar_horarios(ruta: str = RUTA_HORARIOS) -> pd.DataFrame:
+    """
+    Lee la tabla de horarios: horas de operación por día y días de operación por año
+    de cada código HORARIO_n.
+
+    Args:
+        ruta (str): Archivo CSV con las columnas de COLUMNAS_HORARIOS.
+
+    Returns:
+        pd.DataFrame: 'HORA/ DIA' y 'DIAS/ AÑO' (numéricas), indexadas por el código
+        de horario en mayúsculas y sin espacios.
+
+    Raises:
+        ValueError: Si faltan columnas, hay valores no numéricos o códigos repetidos.
+    """
+    horarios = pd.read_csv(ruta, dtype={"HORARIO": str}, encoding="utf-8")
+    horarios.columns = horarios.columns.str.strip()
+    faltantes = [col for col in COLUMNAS_HORARIOS if col not in horarios.columns]
+    if faltantes:
+        raise ValueError(f"Al archivo de horarios '{ruta}' le faltan las columnas: {', '.join(faltantes)}.")
+
+    horarios["HORARIO"] = horarios["HORARIO"].str.strip().str.upper()
+    repetidos = horarios.loc[horarios["HORARIO"].duplicated(), "HORARIO"].unique()
+    if len(repetidos):
+        raise ValueError(f"El archivo de horarios '{ruta}' repite los horarios: {', '.join(repetidos)}.")
+    for col in COLUMNAS_HORARIOS[1:]:
+        valores = pd.to_numeric(horarios[col], errors="coerce")
+        if valores.isna().any():
+            raise ValueError(f"El archivo de horarios '{ruta}' tiene valores no numéricos en '{col}'.")
+        horarios[col] = valores.astype("float64")
+    return horarios.set_index("HORARIO")[COLUMNAS_HORARIOS[1:]]
+
+
+def _codigos_y_valores(serie: pd.Series) -> tuple:
+    """(códigos por fila, valores distintos como Series de objetos); los vacíos tienen código -1."""
+    codigos, unicos = pd.factorize(serie)
+    return codigos, pd.Series(np.asarray(unicos, dtype=object), dtype=object)
+
+
+def _categorica(codigos: np.ndarray, valores: pd.Series, valor_vacio=None) -> pd.Categorical:
+    """
+    Arma una columna categórica a partir de los códigos por fila y el valor ya
+    transformado de cada código (varios códigos pueden dar el mismo valor). Las
+    filas vacías (código -1) toman valor_vacio, o quedan vacías si es None.
+    """
+    if valor_vacio is not None:
+        valores = pd.concat([valores, pd.Series([valor_vacio], dtype=object)], ignore_index=True)
+        codigos = np.where(codigos >= 0, codigos, len(valores) - 1)
+    codigos_valor, categorias = pd.factorize(valores)
+    if len(codigos_valor) == 0:
+        return pd.Categorical.from_codes(codigos, categorias)
+    return pd.Categorical.from_codes(np.where(codigos >= 0, codigos_valor[np.maximum(codigos, 0)], -1), categorias)
+
+
+def agregar_horarios(df: pd.DataFrame, horarios: pd.DataFrame, columna: str = "texto_equipo") -> pd.DataFrame:
+    """
+    Agrega 'HORARIO' (categórica), 'HORA/ DIA' y 'DIAS/ AÑO' cruzando el texto del
+    equipo con la tabla de horarios. Los horarios que no están en la tabla quedan vacíos.
+
+    Args:
+        df (pd.DataFrame): Avisos con los nombres de columnas normalizados.
+        horarios (pd.DataFrame): Tabla de cargar_horarios.
+        columna (str): Columna con el código de horario de cada equipo.
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las tres columnas agregadas.
+    """
+    if columna not in df.columns:
+        df['HORARIO'] = np.nan
+        df['HORA/ DIA'] = np.nan
+        df['DIAS/ AÑO'] = np.nan
+        return df
+
+    codigos, valores = _codigos_y_valores(df[columna])
+    horario = _categorica(codigos, valores.str.strip().str.upper())
+    # Un valor de la tabla por categoría; cada fila lo toma con el código de su categoría
+    tabla = horarios.reindex(horario.categories)
+    df['HORARIO'] = horario
+    for col in ('HORA/ DIA', 'DIAS/ AÑO'):
+        por_categoria = np.append(tabla[col].to_numpy(dtype="float64"), np.nan) # el código -1 toma el NaN final
+        df[col] = por_categoria[horario.codes]
+    return df
+
+
+def agregar_categoria_descripcion(df: pd.DataFrame, columna: str = "descripcion") -> pd.DataFrame:
+    """
+    Agrega 'description_category': las dos letras del inicio de la descripción
+    (PATRON_CATEGORIA), o 'Otros' si no tiene ese formato o está vacía.
+    """
+    if columna not in df.columns:
+        df["description_category"] = CATEGORIA_POR_DEFECTO
+        return df
+
+    codigos, valores = _codigos_y_valores(df[columna])
+    categorias = valores.astype(str).str.strip().str.extract(PATRON_CATEGORIA, expand=False)
+    df["description_category"] = _categorica(
+        codigos, categorias.fillna(CATEGORIA_POR_DEFECTO), valor_vacio=CATEGORIA_POR_DEFECTO
+    )
+    return df
+
+
+def agregar_anio_mes(df: pd.DataFrame, columna: str = "fecha_de_aviso") -> pd.DataFrame:
+    """
+    Convierte la fecha del aviso a fecha y agrega 'año' y 'mes' (nombre del mes en el
+    idioma del sistema, igual que strftime('%B')), tomando el nombre del número de mes.
+    """
+    if columna not in df.columns:
+        df[columna] = pd.NaT # Not a Time
+        df["año"] = np.nan
+        df["mes"] = np.nan
+        return df
+
+    df[columna] = pd.to_datetime(df[columna], errors="coerce")
+    df["año"] = df[columna].dt.year
+    nombres_meses = np.array(list(calendar.month_name), dtype=object) # índice 0 = '' (sin mes)
+    numero_mes = df[columna].dt.month.fillna(0).to_numpy(dtype="int64")
+    df["mes"] = pd.Series(nombres_meses[numero_mes], index=df.index).replace("", np.nan)
+    return df
+
+
+def enriquecer_avisos(df: pd.DataFrame, horarios: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega al tablero las columnas derivadas: horario, categoría de la descripción, año y mes.
+
+    Args:
+        df (pd.DataFrame): Avisos con los nombres de columnas normalizados.
+        horarios (pd.DataFrame): Tabla de cargar_horarios.
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las columnas agregadas.
+    """
+    df = agregar_horarios(df, horarios)
+    df = agregar_anio_mes(df)
+    return agregar_categoria_descripcion(df)
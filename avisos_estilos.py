@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Estilos CSS de las apps de avisos (amarillo, blanco y azul rey de Sura).
+
+Streamlit descarta en cada ejecución los elementos que el script no vuelve a
+escribir, así que la hoja de estilos se tiene que enviar en todas las ejecuciones.
+Se arma y se compacta (sin comentarios ni espacios de sobra) una sola vez por
+proceso y cada ejecución solo envía el texto ya listo.
+"""
+
+import functools
+import re
+
+# Tema común de las dos apps
+CSS_TEMA = """
+    /* Estilos generales del fondo con degradado */
+    .stApp {
+        background: linear-gradient(to right, #FFFFFF, #FFFACD, #4169E1); /* Blanco, Amarillo claro (Cream), Azul Rey */
+        color: #333333; /* Color de texto general */
+    }
+    /* Sidebar */
+    .st-emotion-cache-1oe6z58 { /* Esta clase puede cambiar en futuras versiones de Streamlit */
+        background-color: #F0F8FF; /* Azul claro para la sidebar */
+    }
+    /* Títulos */
+    h1, h2, h3, h4, h5, h6 {
+        color: #4169E1; /* Azul Rey para los títulos */
+    }
+    /* Botones */
+    .stButton>button {
+        background-color: #4169E1; /* Azul Rey para los botones */
+        color: white;
+        border: none;
+        padding: 0.75rem 1.5rem;
+        border-radius: 0.5rem;
+        transition: background-color 0.3s ease;
+    }
+    .stButton>button:hover {
+        background-color: #F8D568; /* Amarillo para hover */
+        color: #4169E1;
+        border: 1px solid #4169E1;
+    }
+    /* Contenedores de contenido principal */
+    .st-emotion-cache-z5fcl4, .st-emotion-cache-1c7y2kl, .st-emotion-cache-nahz7x { /* Clases genéricas para contenedores */
+        background-color: rgba(255, 255, 255, 0.9); /* Blanco semitransparente */
+        padding: 1.5rem;
+        border-radius: 0.75rem;
+        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
+        margin-bottom: 1rem;
+    }
+    /* Mejoras para la tabla (dataframe) */
+    .streamlit-dataframe {
+        border-radius: 0.5rem;
+        overflow: hidden; /* Asegura que las esquinas redondeadas se apliquen bien */
+    }
+"""
+
+# Enlace con forma de botón de la app de unión ("Analiza tus datos")
+CSS_BOTON_ANALIZAR = """
+    .analyze-button {
+        background-color: #4169E1;
+        color: white;
+        border: none;
+        padding: 0.75rem 1.5rem;
+        border-radius: 0.5rem;
+        transition: background-color 0.3s ease;
+        text-decoration: none; /* Quita el subrayado del enlace */
+        display: inline-block; /* Permite aplicar padding y centrar */
+        text-align: center;
+        cursor: pointer;
+    }
+    .analyze-button:hover {
+        background-color: #F8D568;
+        color: #4169E1;
+        border: 1px solid #4169E1;
+    }
+"""
+
+_COMENTARIOS = re.compile(r"/\*.*?\*/", re.DOTALL)
+_ESPACIOS = re.compile(r"\s+")
+_ESPACIOS_SIGNOS = re.compile(r"\s*([{};:,>])\s*")
+
+
+def compactar_css(css: str) -> str:
+    """Quita los comentarios y los espacios que no cambian el significado del CSS."""
+    css = _ESPACIOS.sub(" ", _COMENTARIOS.sub("", css))
+    return _ESPACIOS_SIGNOS.sub(r"\1", css).replace(";}", "}").strip()
+
+
+@functools.lru_cache(maxsize=None)
+def hoja_de_estilos(*bloques: str) -> str:
+    """
+    Bloque <style> con los bloques de CSS indicados, compactado una vez por combinación.
+
+    Args:
+        *bloques (str): Bloques de CSS (por defecto, CSS_TEMA).
+
+    Returns:
+        str: HTML para st.markdown(..., unsafe_allow_html=True).
+    """
+    return f"<style>{compactar_css(''.join(bloques or (CSS_TEMA,)))}</style>"
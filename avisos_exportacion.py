@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Exportación de los avisos procesados a CSV, Excel y Parquet con memoria acotada."""
+
+import tempfile
+
+import pandas as pd
+import xlsxwriter
+
+# Filas que se convierten y escriben en cada bloque
+FILAS_POR_BLOQUE = 50_000
+
+
+def _formato_fecha_csv(serie: pd.Series):
+    """
+    Formato de texto de una columna de fechas con hora, el que pandas le daría al
+    escribirla completa; None si pandas la escribe igual en cualquier bloque (solo
+    fechas, sin hora, o con zona horaria).
+    """
+    if not pd.api.types.is_datetime64_any_dtype(serie) or isinstance(serie.dtype, pd.DatetimeTZDtype):
+        return None
+    fechas = serie.dropna()
+    if fechas.empty or (fechas == fechas.dt.normalize()).all():
+        return None
+    return "%Y-%m-%d %H:%M:%S.%f" if (fechas.dt.microsecond != 0).any() else "%Y-%m-%d %H:%M:%S"
+
+
+def escribir_csv(df: pd.DataFrame, destino, filas_por_bloque: int = FILAS_POR_BLOQUE):
+    """
+    Escribe el DataFrame como CSV UTF-8 por bloques de filas, sin armar el texto completo en memoria.
+
+    pandas elige el formato de las fechas por bloque (sin hora si todas las del bloque
+    son a medianoche), así que las columnas de fecha con hora se convierten a texto en
+    cada bloque con el formato de la columna completa.
+
+    Args:
+        df (pd.DataFrame): Datos a exportar.
+        destino: Ruta o archivo binario abierto donde escribir.
+        filas_por_bloque (int): Filas que se convierten a texto en cada paso.
+    """
+    formatos = {col: _formato_fecha_csv(df[col]) for col in df.columns}
+    formatos = {col: formato for col, formato in formatos.items() if formato}
+    if not formatos:
+        df.to_csv(destino, index=False, encoding="utf-8", mode="wb", chunksize=filas_por_bloque)
+        return
+
+    for inicio in range(0, max(len(df), 1), filas_por_bloque):
+        bloque = df.iloc[inicio:inicio + filas_por_bloque]
+        bloque = bloque.assign(**{col: bloque[col].dt.strftime(formato) for col, formato in formatos.items()})
+        # Con una ruta, el primer bloque crea el archivo y los demás se agregan al final
+        bloque.to_csv(destino, index=False, header=inicio == 0, encoding="utf-8", mode="wb" if inicio == 0 else "ab")
+
+
+# Día cero de las fechas seriales de Excel
+_EPOCA_EXCEL = pd.Timestamp("1899-12-30")
+
+
+def _valores_celda(serie: pd.Series) -> list:
+    """Convierte una columna a valores de Python que xlsxwriter sabe escribir (vacíos como None)."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        if isinstance(serie.dtype, pd.DatetimeTZDtype):
+            serie = serie.dt.tz_localize(None)
+        # Las fechas se convierten a número serial de Excel de una sola vez, no celda por celda
+        serie = (serie - _EPOCA_EXCEL) / pd.Timedelta(days=1)
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+
+def escribir_xlsx(df: pd.DataFrame, destino, hoja: str = "Sheet1", filas_por_bloque: int = FILAS_POR_BLOQUE):
+    """
+    Escribe el DataFrame como XLSX con el modo de memoria constante de xlsxwriter,
+    que vuelca cada fila a disco en cuanto se escribe.
+
+    Args:
+        df (pd.DataFrame): Datos a exportar.
+        destino: Ruta o archivo binario abierto donde escribir.
+        hoja (str): Nombre de la hoja.
+        filas_por_bloque (int): Filas que se convierten a valores de Python en cada paso.
+    """
+    escribir_xlsx_hojas({hoja: df}, destino, filas_por_bloque)
+
+
+def escribir_xlsx_hojas(hojas: dict, destino, filas_por_bloque: int = FILAS_POR_BLOQUE):
+    """
+    Escribe varias hojas en un mismo XLSX, en el orden del diccionario, con memoria constante.
+
+    Args:
+        hojas (dict): Nombre de la hoja -> DataFrame.
+        destino: Ruta o archivo binario abierto donde escribir.
+        filas_por_bloque (int): Filas que se convierten a valores de Python en cada paso.
+    """
+    libro = xlsxwriter.Workbook(destino, {"constant_memory": True})
+    formato_encabezado = libro.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    formato_fecha = libro.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+
+    for hoja, df in hojas.items():
+        hoja_excel = libro.add_worksheet(hoja)
+        # El formato de fecha se asigna a la columna; las celdas sin formato propio lo heredan
+        for idx, col in enumerate(df.columns):
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                hoja_excel.set_column(idx, idx, 19, formato_fecha)
+
+        hoja_excel.write_row(0, 0, [str(col) for col in df.columns], formato_encabezado)
+        for inicio in range(0, len(df), filas_por_bloque):
+            bloque = df.iloc[inicio:inicio + filas_por_bloque]
+            columnas = [_valores_celda(bloque[col]) for col in bloque.columns]
+            # En modo de memoria constante las filas deben escribirse en orden
+            for desplazamiento, fila in enumerate(zip(*columnas)):
+                hoja_excel.write_row(inicio + desplazamiento + 1, 0, fila)
+    libro.close()
+
+
+def preparar_para_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte a texto las columnas 'object' con tipos mezclados (por ejemplo un
+    código postal que a veces es número y a veces texto), que Parquet no admite.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def escribir_parquet(df: pd.DataFrame, destino):
+    """
+    Escribe el DataFrame como Parquet conservando los tipos de cada columna
+    (fechas, enteros, categorías), para que el tablero lo lea sin volver a interpretarlo.
+
+    Args:
+        df (pd.DataFrame): Datos a exportar.
+        destino: Ruta o archivo binario abierto donde escribir.
+    """
+    preparar_para_parquet(df).to_parquet(destino, index=False)
+
+
+def es_parquet(contenido: bytes) -> bool:
+    """Indica si los bytes corresponden a un archivo Parquet (empieza por la firma 'PAR1')."""
+    return contenido[:4] == b"PAR1"
+
+
+def _generar_en_archivo_temporal(escribir, df: pd.DataFrame) -> bytes:
+    """
+    Genera el archivo con escribir(df, archivo) en un archivo temporal (la conversión
+    va por bloques y no arma una segunda copia del archivo en memoria) y devuelve sus
+    bytes. El archivo temporal se borra al terminar.
+
+    st.download_button con data=callable solo acepta bytes, str o algunos tipos de
+    archivo (no el de tempfile.TemporaryFile) y de todos modos lee el archivo completo
+    en memoria al pulsar el botón: el pico de memoria es el tamaño del archivo generado.
+    """
+    with tempfile.TemporaryFile() as archivo:
+        escribir(df, archivo)
+        archivo.seek(0)
+        return archivo.read()
+
+
+def exportar_csv(df: pd.DataFrame) -> bytes:
+    """Genera el CSV para st.download_button (ver _generar_en_archivo_temporal)."""
+    return _generar_en_archivo_temporal(escribir_csv, df)
+
+
+def exportar_xlsx(df: pd.DataFrame) -> bytes:
+    """Genera el XLSX para st.download_button (ver _generar_en_archivo_temporal)."""
+    return _generar_en_archivo_temporal(escribir_xlsx, df)
+
+
+def exportar_parquet(df: pd.DataFrame) -> bytes:
+    """Genera el Parquet para st.download_button (ver _generar_en_archivo_temporal)."""
+    return _generar_en_archivo_temporal(escribir_parquet, df)
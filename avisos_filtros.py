@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de filtros del tablero, armado una vez por conjunto de datos: las fechas de
+aviso ordenadas (para buscar un rango con searchsorted) y, para el proveedor y el tipo
+de servicio, las posiciones de las filas de cada valor.
+
+Una selección empieza por el filtro con menos filas y revisa los demás solo sobre
+esas filas, así que no recorre todo el DataFrame ni lo copia: devuelve posiciones
+de filas para usar con df.iloc.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+COLUMNA_FECHA = 'fecha_de_aviso'
+# Filtro de seleccionar -> columna indexada
+COLUMNAS_INDEXADAS = {'proveedor': 'PROVEEDOR', 'tipo_servicio': 'TIPO DE SERVICIO'}
+
+# Selecciones recordadas por índice (las menos usadas recientemente se descartan)
+MAXIMO_SELECCIONES = 64
+
+
+class _IndiceColumna:
+    """Código de cada fila y, por código, las posiciones de sus filas en orden."""
+
+    def __init__(self, serie: pd.Series):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos, valores = serie.cat.codes.to_numpy(), serie.cat.categories
+        else:
+            codigos, valores = pd.factorize(serie)
+        self.codigos = np.asarray(codigos)
+        self.codigo_de = {valor: codigo for codigo, valor in enumerate(valores)}
+        # Las filas de cada código quedan contiguas (los vacíos, con código -1, al principio)
+        self.orden = np.argsort(self.codigos, kind='stable')
+        self.limites = np.searchsorted(self.codigos[self.orden], np.arange(len(valores) + 1))
+
+    def posiciones(self, valor) -> np.ndarray:
+        codigo = self.codigo_de.get(valor)
+        if codigo is None:
+            return self.orden[:0]
+        return self.orden[self.limites[codigo]:self.limites[codigo + 1]]
+
+
+class IndiceFiltros:
+    """
+    Índice para filtrar los avisos por proveedor, tipo de servicio y rango de fechas.
+    Las selecciones se recuerdan por combinación de filtros, de modo que volver a una
+    combinación ya usada no calcula nada.
+    """
+
+    def __init__(self, df: pd.DataFrame, columna_fecha: str = COLUMNA_FECHA, maximo: int = MAXIMO_SELECCIONES):
+        """
+        Args:
+            df (pd.DataFrame): Avisos del tablero.
+            columna_fecha (str): Columna de fecha del filtro por rango.
+            maximo (int): Selecciones que se recuerdan.
+
+        Raises:
+            ValueError: Si faltan columnas del índice.
+        """
+        faltantes = [col for col in [columna_fecha, *COLUMNAS_INDEXADAS.values()] if col not in df.columns]
+        if faltantes:
+            raise ValueError(f"Faltan columnas para el índice de filtros: {', '.join(faltantes)}")
+
+        self.filas = len(df)
+        fechas = df[columna_fecha].to_numpy(dtype='datetime64[ns]')
+        self.fechas = fechas
+        # numpy ordena NaT al final: el rango buscable son las primeras 'validas' fechas
+        self.orden_fechas = np.argsort(fechas, kind='stable')
+        self.validas = int((~np.isnat(fechas)).sum())
+        self.fechas_ordenadas = fechas[self.orden_fechas[:self.validas]]
+        self.columnas = {filtro: _IndiceColumna(df[col]) for filtro, col in COLUMNAS_INDEXADAS.items()}
+        self.maximo = maximo
+        self._selecciones = OrderedDict()
+
+    def rango_fechas(self) -> tuple:
+        """(primera, última) fecha de aviso como Timestamp, o (None, None) si no hay fechas."""
+        if not self.validas:
+            return None, None
+        return pd.Timestamp(self.fechas_ordenadas[0]), pd.Timestamp(self.fechas_ordenadas[-1])
+
+    @staticmethod
+    def _limites_fechas(desde, hasta) -> tuple:
+        """[inicio, fin) del rango como datetime64; None en el lado sin límite."""
+        inicio = None if desde is None else np.datetime64(pd.Timestamp(desde), 'ns')
+        fin = None if hasta is None else np.datetime64(pd.Timestamp(hasta) + pd.Timedelta(days=1), 'ns')
+        return inicio, fin
+
+    def _posiciones_fechas(self, desde, hasta) -> np.ndarray:
+        """Filas del rango de fechas, buscadas en las fechas ordenadas."""
+        inicio, fin = self._limites_fechas(desde, hasta)
+        primera = 0 if inicio is None else np.searchsorted(self.fechas_ordenadas, inicio, side='left')
+        ultima = self.validas if fin is None else np.searchsorted(self.fechas_ordenadas, fin, side='left')
+        return self.orden_fechas[primera:ultima]
+
+    def _en_rango(self, posiciones: np.ndarray, desde, hasta) -> np.ndarray:
+        """Máscara de las filas indicadas cuya fecha está en el rango (NaT nunca lo está)."""
+        inicio, fin = self._limites_fechas(desde, hasta)
+        fechas = self.fechas[posiciones]
+        dentro = ~np.isnat(fechas)
+        if inicio is not None:
+            dentro &= fechas >= inicio
+        if fin is not None:
+            dentro &= fechas < fin
+        return dentro
+
+    def seleccionar(self, proveedor=None, tipo_servicio=None, desde=None, hasta=None) -> np.ndarray:
+        """
+        Posiciones (en el orden original) de las filas que cumplen los filtros; None en
+        un filtro = sin filtrar. Las filas sin fecha quedan fuera si se filtra por fecha.
+
+        Args:
+            proveedor: Valor de 'PROVEEDOR'.
+            tipo_servicio: Valor de 'TIPO DE SERVICIO'.
+            desde (datetime.date): Fecha de aviso inicial, incluida.
+            hasta (datetime.date): Fecha de aviso final, incluida (todo el día).
+
+        Returns:
+            np.ndarray: Posiciones de solo lectura, para usar con df.iloc.
+        """
+        clave = (proveedor, tipo_servicio, desde, hasta)
+        if clave in self._selecciones:
+            self._selecciones.move_to_end(clave)
+            return self._selecciones[clave]
+
+        valores = {'proveedor': proveedor, 'tipo_servicio': tipo_servicio}
+        candidatas = [
+            (filtro, self.columnas[filtro].posiciones(valor)) for filtro, valor in valores.items() if valor is not None
+        ]
+        if desde is not None or hasta is not None:
+            candidatas.append(('fechas', self._posiciones_fechas(desde, hasta)))
+
+        if not candidatas:
+            posiciones = np.arange(self.filas)
+        else:
+            # Se parte del filtro con menos filas y los demás se revisan solo en ellas
+            candidatas.sort(key=lambda candidata: len(candidata[1]))
+            posiciones = candidatas[0][1]
+            for filtro, _ in candidatas[1:]:
+                if filtro == 'fechas':
+                    posiciones = posiciones[self._en_rango(posiciones, desde, hasta)]
+                else:
+                    indice = self.columnas[filtro]
+                    posiciones = posiciones[indice.codigos[posiciones] == indice.codigo_de.get(valores[filtro], -2)]
+            posiciones = np.sort(posiciones)
+
+        posiciones.setflags(write=False)
+        self._selecciones[clave] = posiciones
+        if len(self._selecciones) > self.maximo:
+            self._selecciones.popitem(last=False)
+        return posiciones
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Gráficos del tablero renderizados a PNG una sola vez por combinación de datos y
+especificación (tipo de gráfico, títulos, colores, tamaño).
+
+Las figuras se crean con matplotlib.figure.Figure, fuera de pyplot: no quedan
+registradas en su estado global (que no es seguro entre las sesiones, cada una en su
+hilo) y se liberan al terminar de renderizarlas. Las imágenes se guardan en una caché
+LRU, así que repetir una vista ya dibujada no usa matplotlib.
+
+matplotlib y seaborn se importan (y el estilo de los gráficos se aplica) recién al
+dibujar el primer gráfico: las páginas sin gráficos, como la de carga, no los cargan.
+"""
+
+import functools
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+from avisos_cache import CacheResultados
+
+# Imágenes que se conservan en memoria (se puede cambiar con una variable de entorno)
+MAXIMO_GRAFICOS = int(os.environ.get("AVISOS_GRAFICOS_MAX", "64"))
+# Igual que st.pyplot: gráficos nítidos y recortados a su contenido
+DPI_GRAFICOS = 200
+# Ancho máximo que st.image muestra sin reescalar; las imágenes más anchas se reescalan
+# (y se vuelven a codificar) en cada ejecución, así que se guardan ya con este ancho
+ANCHO_MAXIMO_PX = 1460
+# Estilo de seaborn de todos los gráficos del tablero
+ESTILO_GRAFICOS = 'whitegrid'
+
+
+def huella_datos(*datos) -> str:
+    """
+    Huella de los datos de un gráfico: valores e índices de las Series y DataFrames
+    (y nombres de sus columnas), o la representación de cualquier otro valor.
+    """
+    huella = hashlib.blake2b(digest_size=16)
+    for dato in datos:
+        if isinstance(dato, (pd.Series, pd.DataFrame)):
+            huella.update(pd.util.hash_pandas_object(dato, index=True).to_numpy().tobytes())
+            nombres = list(dato.columns) if isinstance(dato, pd.DataFrame) else [dato.name]
+            huella.update(repr(nombres).encode("utf-8"))
+        else:
+            huella.update(repr(dato).encode("utf-8"))
+    return huella.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def preparar_estilo(estilo: str = ESTILO_GRAFICOS):
+    """Importa seaborn y aplica el estilo de los gráficos (una sola vez por proceso)."""
+    import seaborn as sns
+
+    sns.set_style(estilo)
+
+
+def renderizar_png(dibujar, figsize: tuple, dpi: int = DPI_GRAFICOS, ancho_maximo: int = ANCHO_MAXIMO_PX) -> bytes:
+    """
+    Crea una figura, la dibuja con dibujar(fig) y la devuelve como PNG. La figura se
+    libera siempre, también si el dibujo falla.
+
+    Args:
+        dibujar: Función que recibe la figura vacía y le agrega los ejes (fig.subplots...).
+        figsize (tuple): Tamaño de la figura en pulgadas.
+        dpi (int): Resolución de la imagen.
+        ancho_maximo (int): Ancho máximo en píxeles (0 para no reescalar).
+
+    Returns:
+        bytes: La imagen PNG.
+    """
+    from matplotlib.figure import Figure
+
+    preparar_estilo()
+    fig = Figure(figsize=figsize)
+    try:
+        dibujar(fig)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight", dpi=dpi)
+    finally:
+        fig.clear()
+    return _limitar_ancho(buffer.getvalue(), ancho_maximo)
+
+
+def _limitar_ancho(png: bytes, ancho_maximo: int) -> bytes:
+    """Reescala la imagen al ancho máximo (como lo haría st.image) si es más ancha."""
+    from PIL import Image
+
+    imagen = Image.open(io.BytesIO(png))
+    ancho, alto = imagen.size
+    if not ancho_maximo or ancho <= ancho_maximo:
+        return png
+    imagen = imagen.resize((ancho_maximo, int(alto * ancho_maximo / ancho)), resample=Image.BILINEAR)
+    buffer = io.BytesIO()
+    imagen.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ServicioGraficos:
+    """Renderiza gráficos a PNG y guarda las imágenes por (gráfico, huella de los datos, especificación)."""
+
+    def __init__(self, maximo: int = MAXIMO_GRAFICOS, dpi: int = DPI_GRAFICOS):
+        self.dpi = dpi
+        self.cache = CacheResultados(maximo)
+
+    def png(self, nombre: str, dibujar, datos: tuple, figsize: tuple, **especificacion) -> bytes:
+        """
+        Imagen del gráfico: la guardada si ya se dibujó con los mismos datos y
+        especificación, o una recién renderizada.
+
+        Args:
+            nombre (str): Tipo de gráfico (p. ej. 'barras' o 'tendencia mensual').
+            dibujar: Función dibujar(fig, *datos, **especificacion).
+            datos (tuple): Datos del gráfico (Series, DataFrames u otros valores).
+            figsize (tuple): Tamaño de la figura en pulgadas.
+            **especificacion: Títulos, etiquetas, colores... (valores hashables).
+
+        Returns:
+            bytes: La imagen PNG.
+        """
+        clave = (nombre, huella_datos(*datos), tuple(figsize), tuple(sorted(especificacion.items())))
+        return self.cache.obtener(
+            clave, lambda: renderizar_png(lambda fig: dibujar(fig, *datos, **especificacion), figsize, self.dpi)
+        )
+
+    def estadisticas(self) -> dict:
+        """Aciertos, fallos, tasa de aciertos y entradas de la caché de imágenes."""
+        return self.cache.estadisticas()
+
+    def vaciar(self):
+        """Elimina las imágenes guardadas."""
+        self.cache.vaciar()
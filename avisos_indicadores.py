@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Indicadores de servicio de los avisos (avisos, costo, MTTR, MTBF, disponibilidad y
+rendimiento) calculados en una sola agregación agrupada, para cualquier combinación
+de claves: proveedor, tipo de servicio, proveedor × tipo de servicio, mes...
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columnas que necesita el cálculo (además de las claves de agrupación)
+COLUMNAS_REQUERIDAS_INDICADORES = ['TIEMPO PARADA', 'COSTO', 'AVISO', 'HORA/ DIA', 'DIAS/ AÑO']
+
+# Columnas de la tabla de indicadores, después de las claves
+COLUMNAS_INDICADORES = [
+    "Avisos", "Costo", "MTTR (hrs)", "Tiempo de parada (hrs)", "Tiempo de operación (hrs)",
+    "MTBF (hrs)", "Disponibilidad (%)", "Rendimiento",
+]
+
+# Disponibilidad (%) mínima de cada clase de rendimiento
+UMBRAL_RENDIMIENTO_ALTO = 90
+UMBRAL_RENDIMIENTO_MEDIO = 75
+
+
+def clasificar_rendimiento(disponibilidad) -> np.ndarray:
+    """
+    Clase de rendimiento según la disponibilidad: 'Alto', 'Medio', 'Bajo' o
+    'No Aplica' cuando no hay disponibilidad.
+    """
+    disponibilidad = np.asarray(disponibilidad, dtype="float64")
+    return np.select(
+        [np.isnan(disponibilidad), disponibilidad >= UMBRAL_RENDIMIENTO_ALTO, disponibilidad >= UMBRAL_RENDIMIENTO_MEDIO],
+        ["No Aplica", "Alto", "Medio"],
+        default="Bajo",
+    ).astype(object)
+
+
+# Medidas aditivas de las que salen los indicadores: los promedios se guardan como suma y
+# conteo para poder sumar grupos (por ejemplo las celdas del cubo de avisos_cubo)
+MEDIDAS_ADITIVAS = {
+    "Avisos": ('AVISO', 'nunique'),
+    "Costo": ('COSTO', 'sum'),
+    "Parada (suma)": ('TIEMPO PARADA', 'sum'),
+    "Parada (n)": ('TIEMPO PARADA', 'count'),
+    "Días/año (suma)": ('DIAS/ AÑO', 'sum'),
+    "Días/año (n)": ('DIAS/ AÑO', 'count'),
+    "Horas/día (suma)": ('HORA/ DIA', 'sum'),
+    "Horas/día (n)": ('HORA/ DIA', 'count'),
+}
+
+
+def _nombres_claves(claves) -> list:
+    """Nombres de columna de las claves (las de un pd.Grouper se toman de su 'key')."""
+    return [clave if isinstance(clave, str) else clave.key for clave in claves]
+
+
+def agregar_medidas(df: pd.DataFrame, claves, dropna: bool = True) -> pd.DataFrame:
+    """
+    Suma las medidas aditivas (MEDIDAS_ADITIVAS) por grupo en una sola agregación.
+
+    Args:
+        df (pd.DataFrame): Avisos ya filtrados.
+        claves: Nombre de columna, pd.Grouper o lista de ellos.
+        dropna (bool): Si es False, las filas con claves vacías forman su propio grupo.
+
+    Returns:
+        pd.DataFrame: Las medidas, indexadas por las claves.
+
+    Raises:
+        ValueError: Si faltan columnas requeridas o de agrupación.
+    """
+    claves = list(claves) if isinstance(claves, (list, tuple)) else [claves]
+    faltantes = [
+        col for col in _nombres_claves(claves) + COLUMNAS_REQUERIDAS_INDICADORES
+        if isinstance(col, str) and col not in df.columns
+    ]
+    if faltantes:
+        raise ValueError(f"Faltan columnas requeridas para calcular indicadores: {', '.join(map(str, faltantes))}")
+    # observed=True: con columnas categóricas solo se listan los grupos presentes en los datos
+    return df.groupby(claves, observed=True, dropna=dropna).agg(**MEDIDAS_ADITIVAS)
+
+
+def indicadores_desde_medidas(medidas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula los indicadores a partir de las medidas aditivas de cada grupo.
+
+    - Avisos: avisos distintos (también son las fallas para el MTBF).
+    - Costo: suma de 'COSTO'.
+    - MTTR: promedio del tiempo de parada; tiempo de parada: su suma.
+    - Tiempo de operación: promedio de 'DIAS/ AÑO' × promedio de 'HORA/ DIA' (0 si no hay datos).
+    - MTBF: (tiempo de operación − tiempo de parada) / avisos (0 si no se puede calcular).
+    - Disponibilidad: MTBF / (MTBF + MTTR) × 100 (0 si no se puede calcular).
+
+    Args:
+        medidas (pd.DataFrame): Columnas de MEDIDAS_ADITIVAS indexadas por las claves.
+
+    Returns:
+        pd.DataFrame: Las claves como columnas y COLUMNAS_INDICADORES, una fila por grupo.
+    """
+    def promedio(nombre):
+        return medidas[f"{nombre} (suma)"] / medidas[f"{nombre} (n)"].replace(0, np.nan)
+
+    mttr = promedio("Parada")
+    operacion = (promedio("Días/año") * promedio("Horas/día")).replace([np.inf, -np.inf], np.nan).fillna(0)
+    mtbf = ((operacion - medidas["Parada (suma)"]) / medidas["Avisos"].replace(0, np.nan)).fillna(0)
+    disponibilidad = (mtbf / (mtbf + mttr)).replace([np.inf, -np.inf], np.nan) * 100
+    disponibilidad = disponibilidad.fillna(0)
+
+    tabla = pd.DataFrame({
+        "Avisos": medidas["Avisos"],
+        "Costo": medidas["Costo"],
+        "MTTR (hrs)": mttr,
+        "Tiempo de parada (hrs)": medidas["Parada (suma)"],
+        "Tiempo de operación (hrs)": operacion,
+        "MTBF (hrs)": mtbf,
+        "Disponibilidad (%)": disponibilidad,
+    }, index=medidas.index)
+    tabla["Rendimiento"] = clasificar_rendimiento(disponibilidad)
+    return tabla.reset_index()
+
+
+def calcular_tabla_indicadores(df: pd.DataFrame, claves) -> pd.DataFrame:
+    """
+    Calcula los indicadores de cada grupo (ver indicadores_desde_medidas) en una sola agregación.
+
+    Args:
+        df (pd.DataFrame): Avisos ya filtrados.
+        claves: Nombre de columna, pd.Grouper (p. ej. pd.Grouper(key='fecha_de_aviso', freq='MS')
+            para agrupar por mes) o lista de ellos.
+
+    Returns:
+        pd.DataFrame: Una fila por grupo presente en los datos, con las claves y
+        COLUMNAS_INDICADORES, ordenada por las claves.
+
+    Raises:
+        ValueError: Si faltan columnas requeridas o de agrupación.
+    """
+    return indicadores_desde_medidas(agregar_medidas(df, claves))
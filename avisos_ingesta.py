@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""Lectura de las hojas SAP contenidas en el archivo BASE DE DATOS.XLSX."""
+
+import hashlib
+import io
+import multiprocessing
+import os
+import posixpath
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.etree import ElementTree
+
+import pandas as pd
+
+# Hojas que debe contener el archivo, en el orden documentado para el usuario
+HOJAS_SAP = ("IW29", "IW39", "IH08", "IW65", "ZPM015")
+
+# Columnas que conserva el resultado final de la unión
+COLUMNAS_FINALES = [
+    "Aviso", "Orden", "Fecha de aviso", "Código postal", "Status del sistema",
+    "Descripción", "Ubicación técnica", "Indicador", "Equipo",
+    "Denominación de objeto técnico", "Denominación ejecutante",
+    "Duración de parada", "Centro de coste", "Costes tot.reales",
+    "Inic.garantía prov.", "Fin garantía prov.", "Texto_equipo",
+    "Indicador ABC", "Texto código acción", "Texto de acción",
+    "Texto grupo acción", "TIPO DE SERVICIO"
+]
+
+# Columnas que se toman de las hojas de dimensión (IW39, IH08, ZPM015)
+COLUMNAS_IW39 = ["Aviso", "Total general (real)"]
+COLUMNAS_IH08 = [
+    "Equipo", "Inic.garantía prov.", "Fin garantía prov.", "Texto", "Indicador ABC", "Denominación de objeto técnico"
+]
+COLUMNAS_ZPM015 = ["Equipo", "TIPO DE SERVICIO"]
+
+# IW29 e IW65 se unen completas, así que de ellas se leen todas las columnas que
+# pueden llegar al resultado o chocar con las de otras hojas durante la unión.
+_COLUMNAS_UNION = set(COLUMNAS_FINALES) | set(COLUMNAS_IW39) | set(COLUMNAS_IH08) | set(COLUMNAS_ZPM015)
+
+COLUMNAS_POR_HOJA = {
+    "IW29": _COLUMNAS_UNION,
+    "IW39": set(COLUMNAS_IW39),
+    "IH08": set(COLUMNAS_IH08),
+    "IW65": _COLUMNAS_UNION,
+    "ZPM015": set(COLUMNAS_ZPM015),
+}
+
+# Versión de las hojas leídas que se guardan en caché; subirla si cambia cómo se
+# leen o tipan las hojas (las columnas leídas ya entran en firma_lectura)
+VERSION_HOJAS = 1
+
+
+def firma_lectura() -> str:
+    """Identificador de la forma de leer las hojas (versión y columnas leídas de cada hoja), para nombrarlas en caché."""
+    columnas = repr(sorted((hoja, sorted(columnas)) for hoja, columnas in COLUMNAS_POR_HOJA.items()))
+    return f"v{VERSION_HOJAS}_{hashlib.blake2b(columnas.encode('utf-8'), digest_size=6).hexdigest()}"
+
+
+# Columnas sin las cuales la unión no se puede hacer, por hoja
+COLUMNAS_REQUERIDAS = {
+    "IW29": ["Aviso", "Equipo"],
+    "IW39": COLUMNAS_IW39,
+    "IH08": COLUMNAS_IH08,
+    "IW65": ["Aviso"],
+    "ZPM015": COLUMNAS_ZPM015,
+}
+
+# Forma de crear los procesos de lectura: nunca 'fork', que copia el proceso del
+# servidor de Streamlit con sus hilos y sus locks tomados (el hijo puede bloquearse)
+METODO_PROCESOS = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Espacios de nombres XML del formato XLSX
+_NS_HOJA = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_RELACION = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_RELACIONES_PAQUETE = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _texto_celda_compartida(elemento) -> str:
+    """Texto de un <si> de sharedStrings.xml (puede venir partido en varios <t> con formato)."""
+    return "".join(t.text or "" for t in elemento.iter(f"{_NS_HOJA}t"))
+
+
+def _leer_textos_compartidos(libro: zipfile.ZipFile, indices: set) -> dict:
+    """
+    Lee de sharedStrings.xml solo los textos con los índices pedidos y deja de leer
+    en cuanto los tiene, sin cargar los miles de textos de los datos.
+    """
+    if not indices or "xl/sharedStrings.xml" not in libro.namelist():
+        return {}
+    textos = {}
+    maximo = max(indices)
+    with libro.open("xl/sharedStrings.xml") as archivo:
+        posicion = 0
+        for _, elemento in ElementTree.iterparse(archivo, events=("end",)):
+            if elemento.tag != f"{_NS_HOJA}si":
+                continue
+            if posicion in indices:
+                textos[posicion] = _texto_celda_compartida(elemento)
+            elemento.clear()
+            if posicion >= maximo:
+                break
+            posicion += 1
+    return textos
+
+
+def _primera_fila(libro: zipfile.ZipFile, ruta_hoja: str) -> list:
+    """
+    Lee solo la primera fila de una hoja, recorriendo el XML en secuencia y deteniéndose al final de la fila.
+
+    Returns:
+        list: Tuplas (tipo de celda, valor en bruto) de cada celda de la fila.
+    """
+    celdas = []
+    with libro.open(ruta_hoja) as archivo:
+        for _, elemento in ElementTree.iterparse(archivo, events=("end",)):
+            if elemento.tag == f"{_NS_HOJA}c":
+                if elemento.get("t") == "inlineStr":
+                    valor = _texto_celda_compartida(elemento)
+                else:
+                    valor = elemento.findtext(f"{_NS_HOJA}v")
+                if valor is not None:
+                    celdas.append((elemento.get("t", "n"), valor))
+            elif elemento.tag == f"{_NS_HOJA}row":
+                break
+    return celdas
+
+
+def leer_encabezados_xlsx(contenido: bytes) -> dict:
+    """
+    Lee los nombres de las hojas y la fila de encabezados de cada una sin abrir el
+    libro completo: tarda lo mismo con mil filas que con un millón.
+
+    Args:
+        contenido (bytes): Contenido del archivo Excel.
+
+    Returns:
+        dict: Nombre de cada hoja, en el orden del libro -> lista de encabezados (sin espacios al inicio ni al final).
+
+    Raises:
+        ValueError: Si el archivo no es un XLSX válido.
+    """
+    try:
+        libro = zipfile.ZipFile(io.BytesIO(contenido))
+    except zipfile.BadZipFile as e:
+        raise ValueError("El archivo no es un Excel .xlsx válido.") from e
+
+    with libro:
+        try:
+            relaciones = ElementTree.fromstring(libro.read("xl/_rels/workbook.xml.rels"))
+            definicion = ElementTree.fromstring(libro.read("xl/workbook.xml"))
+        except KeyError as e:
+            raise ValueError("El archivo no es un Excel .xlsx válido.") from e
+
+        # Id de relación -> ruta de la hoja dentro del paquete
+        rutas = {}
+        for relacion in relaciones.iter(f"{_NS_RELACIONES_PAQUETE}Relationship"):
+            destino = relacion.get("Target", "")
+            rutas[relacion.get("Id")] = destino.lstrip("/") if destino.startswith("/") else posixpath.join("xl", destino)
+
+        filas = {}
+        for hoja in definicion.iter(f"{_NS_HOJA}sheet"):
+            ruta = rutas.get(hoja.get(f"{_NS_RELACION}id"))
+            filas[hoja.get("name")] = _primera_fila(libro, ruta) if ruta in libro.namelist() else []
+
+        indices = {int(valor) for celdas in filas.values() for tipo, valor in celdas if tipo == "s"}
+        textos = _leer_textos_compartidos(libro, indices)
+
+    return {
+        nombre: [(textos.get(int(valor), "") if tipo == "s" else valor).strip() for tipo, valor in celdas]
+        for nombre, celdas in filas.items()
+    }
+
+
+def revisar_libro(contenido: bytes) -> dict:
+    """
+    Revisión previa del archivo BASE DE DATOS.XLSX: comprueba con los encabezados
+    que estén las cinco hojas y sus columnas requeridas, antes de leer los datos.
+
+    Args:
+        contenido (bytes): Contenido del archivo Excel.
+
+    Returns:
+        dict: 'Hojas' (hoja SAP -> nombre en el libro), 'Errores' y 'Advertencias'
+        (listas de mensajes) y 'Segundos'.
+    """
+    inicio = time.perf_counter()
+    errores, advertencias = [], []
+    try:
+        encabezados = leer_encabezados_xlsx(contenido)
+    except ValueError as e:
+        return {"Hojas": {}, "Errores": [str(e)], "Advertencias": [], "Segundos": round(time.perf_counter() - inicio, 3)}
+
+    nombres_libro = list(encabezados)
+    resueltas, por_posicion, faltantes = _resolver(nombres_libro)
+    for hoja in por_posicion:
+        advertencias.append(
+            f"No hay una hoja llamada '{hoja}'; se usará la hoja '{resueltas[hoja]}' "
+            f"(posición {HOJAS_SAP.index(hoja) + 1})."
+        )
+    for hoja in faltantes:
+        errores.append(f"Falta la hoja '{hoja}'. Hojas del archivo: {', '.join(nombres_libro)}.")
+
+    for hoja, nombre in resueltas.items():
+        columnas = set(encabezados[nombre])
+        faltantes = [col for col in COLUMNAS_REQUERIDAS[hoja] if col not in columnas]
+        if faltantes:
+            errores.append(f"A la hoja '{nombre}' ({hoja}) le faltan las columnas: {', '.join(repr(col) for col in faltantes)}.")
+
+    # Columnas del resultado que no aporta ninguna hoja: la unión funciona, pero saldrán sin ellas
+    disponibles = set().union(*(encabezados[nombre] for nombre in resueltas.values())) if resueltas else set()
+    disponibles |= {"Texto_equipo"} if "Texto" in disponibles else set()
+    disponibles |= {"Costes tot.reales"} if "Total general (real)" in disponibles else set()
+    sin_origen = [col for col in COLUMNAS_FINALES if col not in disponibles]
+    if not errores and sin_origen:
+        advertencias.append(f"El resultado no tendrá las columnas: {', '.join(sin_origen)}.")
+
+    return {
+        "Hojas": resueltas,
+        "Errores": errores,
+        "Advertencias": advertencias,
+        "Segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def resolver_hojas(nombres_libro: list) -> dict:
+    """
+    Relaciona cada hoja SAP esperada con el nombre real de la hoja en el libro.
+
+    Se busca primero por nombre (sin distinguir mayúsculas ni espacios) y, si no
+    existe, se toma la hoja que ocupa la posición documentada.
+
+    Args:
+        nombres_libro (list): Nombres de las hojas del libro, en su orden.
+
+    Returns:
+        dict: Nombre SAP (por ejemplo 'IW29') -> nombre de la hoja en el libro.
+    """
+    resueltas, _, faltantes = _resolver(nombres_libro)
+    if faltantes:
+        raise ValueError(f"El archivo no contiene la hoja '{faltantes[0]}'.")
+    return resueltas
+
+
+def _resolver(nombres_libro: list) -> tuple:
+    """
+    Busca cada hoja SAP por nombre y, si no existe, por posición (solo si la hoja
+    de esa posición no es otra de las hojas SAP encontradas por nombre).
+
+    Returns:
+        tuple: (hoja SAP -> nombre en el libro, hojas tomadas por posición, hojas que faltan).
+    """
+    por_nombre = {str(nombre).strip().upper(): nombre for nombre in nombres_libro}
+    reclamadas = {por_nombre[hoja] for hoja in HOJAS_SAP if hoja in por_nombre}
+    resueltas, por_posicion, faltantes = {}, [], []
+    for posicion, hoja in enumerate(HOJAS_SAP):
+        if hoja in por_nombre:
+            resueltas[hoja] = por_nombre[hoja]
+        elif posicion < len(nombres_libro) and nombres_libro[posicion] not in reclamadas:
+            resueltas[hoja] = nombres_libro[posicion]
+            por_posicion.append(hoja)
+        else:
+            faltantes.append(hoja)
+    return resueltas, por_posicion, faltantes
+
+
+def _parsear_hoja(libro: pd.ExcelFile, nombre_en_libro: str, hoja: str) -> tuple:
+    """Lee una hoja SAP del libro ya abierto y devuelve (DataFrame, segundos)."""
+    columnas = COLUMNAS_POR_HOJA[hoja]
+    inicio = time.perf_counter()
+    df_hoja = libro.parse(nombre_en_libro, usecols=lambda col: str(col).strip() in columnas)
+    df_hoja.columns = df_hoja.columns.str.strip()
+    return df_hoja, time.perf_counter() - inicio
+
+
+def _leer_hoja_en_proceso(contenido: bytes, hoja: str) -> tuple:
+    """
+    Tarea de cada proceso de la lectura en paralelo: abre su propia copia del
+    libro y lee una sola hoja.
+
+    Returns:
+        tuple: (hoja, DataFrame, segundos de lectura, segundos totales del proceso, pid).
+    """
+    inicio = time.perf_counter()
+    with pd.ExcelFile(io.BytesIO(contenido)) as libro:
+        nombre_en_libro = resolver_hojas(libro.sheet_names)[hoja]
+        df_hoja, segundos = _parsear_hoja(libro, nombre_en_libro, hoja)
+    return hoja, df_hoja, segundos, time.perf_counter() - inicio, os.getpid()
+
+
+def nucleos_disponibles() -> int:
+    """Número de núcleos que el proceso puede usar (respeta los límites del contenedor)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def leer_hojas_sap(uploaded_file_buffer: io.BytesIO) -> tuple:
+    """
+    Abre el libro una sola vez y lee las cinco hojas SAP con solo las columnas
+    que usa la unión.
+
+    Args:
+        uploaded_file_buffer (io.BytesIO): Buffer del archivo Excel subido por el usuario.
+
+    Returns:
+        tuple: (dict con un DataFrame por hoja SAP, lista de dicts con
+        'Hoja', 'Filas' y 'Segundos' de cada lectura).
+    """
+    uploaded_file_buffer.seek(0)
+    hojas = {}
+    tiempos = []
+    # ExcelFile descomprime el libro una única vez y reutiliza el lector para cada hoja
+    with pd.ExcelFile(uploaded_file_buffer) as libro:
+        nombres = resolver_hojas(libro.sheet_names)
+        for hoja in HOJAS_SAP:
+            df_hoja, segundos = _parsear_hoja(libro, nombres[hoja], hoja)
+            hojas[hoja] = df_hoja
+            tiempos.append({
+                "Hoja": hoja,
+                "Filas": len(df_hoja),
+                "Segundos": round(segundos, 3),
+            })
+    return hojas, tiempos
+
+
+def leer_hojas_sap_paralelo(contenido: bytes, max_procesos: int = None) -> tuple:
+    """
+    Lee las cinco hojas SAP en procesos separados, uno por hoja.
+
+    Si la máquina tiene un solo núcleo o no se pueden crear procesos, se usa la
+    lectura secuencial de leer_hojas_sap. Los procesos se crean con METODO_PROCESOS
+    (no con 'fork'): solo reciben los bytes del libro y el nombre de la hoja.
+
+    Args:
+        contenido (bytes): Contenido del archivo Excel subido por el usuario.
+        max_procesos (int): Límite de procesos; por defecto, uno por hoja sin superar los núcleos disponibles.
+
+    Returns:
+        tuple: (dict con un DataFrame por hoja SAP, lista de dicts con 'Hoja',
+        'Filas', 'Segundos', 'Segundos proceso' y 'Proceso' de cada lectura).
+    """
+    procesos = min(len(HOJAS_SAP), max_procesos or nucleos_disponibles())
+    if procesos <= 1:
+        return leer_hojas_sap(io.BytesIO(contenido))
+
+    hojas = {}
+    tiempos = []
+    try:
+        contexto = multiprocessing.get_context(METODO_PROCESOS)
+        if METODO_PROCESOS == "forkserver":
+            # El servidor de procesos (de un solo hilo) importa pandas y este módulo una
+            # vez; cada proceso de lectura parte de esa copia en lugar de importarlos
+            contexto.set_forkserver_preload([__name__])
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+            tareas = [pool.submit(_leer_hoja_en_proceso, contenido, hoja) for hoja in HOJAS_SAP]
+            for tarea in tareas:
+                hoja, df_hoja, segundos, segundos_proceso, pid = tarea.result()
+                hojas[hoja] = df_hoja
+                tiempos.append({
+                    "Hoja": hoja,
+                    "Filas": len(df_hoja),
+                    "Segundos": round(segundos, 3),
+                    "Segundos proceso": round(segundos_proceso, 3),
+                    "Proceso": pid,
+                })
+    except (BrokenProcessPool, OSError):
+        # Contenedores sin soporte para multiprocessing: volver a la lectura secuencial
+        return leer_hojas_sap(io.BytesIO(contenido))
+    return hojas, tiempos
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Medición de tiempo real, tiempo de CPU y memoria por etapa en las apps de avisos.
+
+Cada etapa terminada se agrega a un registro JSON-lines (una línea por etapa), de
+modo que las ejecuciones lentas en producción se pueden revisar después sin
+conectar un perfilador. Cuando hace falta más detalle, cada ejecución se puede
+perfilar con cProfile (ver perfilar_ejecucion).
+"""
+
+import collections
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+# Registro y tamaño máximo por defecto (se pueden cambiar con variables de entorno;
+# AVISOS_MEDICION_LOG vacío desactiva el registro)
+RUTA_REGISTRO = os.environ.get(
+    "AVISOS_MEDICION_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "medicion_avisos.jsonl")
+)
+LIMITE_REGISTRO_MB = float(os.environ.get("AVISOS_MEDICION_MAX_MB", "20"))
+
+# Perfiles de cProfile: carpeta y cuántos se conservan (los más antiguos se borran)
+DIRECTORIO_PERFILES = os.environ.get(
+    "AVISOS_PERFILES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfiles_avisos")
+)
+MAXIMO_PERFILES = int(os.environ.get("AVISOS_PERFILES_MAX", "50"))
+
+# Funciones que se resumen en el archivo de etiquetas de cada perfil
+FUNCIONES_RESUMEN_PERFIL = 20
+
+_VALORES_ACTIVOS = {"1", "true", "si", "sí", "yes"}
+
+_lock_registro = threading.Lock()
+
+
+def leer_memoria_mb(campo: str = "VmRSS") -> float:
+    """
+    Lee un campo de memoria del proceso ('VmRSS' o 'VmHWM') de /proc/self/status, en MB.
+
+    Raises:
+        OSError: Si el sistema no tiene /proc (por ejemplo, Windows) o le falta el campo.
+    """
+    with open("/proc/self/status", encoding="ascii") as f:
+        for linea in f:
+            if linea.startswith(campo + ":"):
+                return int(linea.split()[1]) / 1024
+    raise OSError(f"/proc/self/status no tiene el campo {campo}")
+
+
+def memoria_residente_mb():
+    """
+    Memoria residente (RSS) actual del proceso en MB, o None si no se puede medir.
+    Fuera de Linux se usa psutil cuando está instalado.
+    """
+    try:
+        return leer_memoria_mb("VmRSS")
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 1024**2
+
+
+def agregar_al_registro(registros: list, ruta: str = RUTA_REGISTRO, limite_mb: float = LIMITE_REGISTRO_MB):
+    """
+    Agrega registros (diccionarios) al archivo JSON-lines. Cuando el archivo supera
+    el límite se renombra a '<ruta>.1' (reemplazando el anterior) y se empieza uno nuevo.
+    Los errores de escritura se ignoran: la medición nunca debe detener la app.
+
+    Args:
+        registros (list): Diccionarios a escribir, uno por línea.
+        ruta (str): Archivo del registro; si está vacío no se escribe nada.
+        limite_mb (float): Tamaño a partir del cual se rota el archivo.
+    """
+    if not ruta or not registros:
+        return
+    lineas = "".join(json.dumps(registro, ensure_ascii=False, default=str) + "\n" for registro in registros)
+    with _lock_registro:
+        try:
+            if os.path.exists(ruta) and os.path.getsize(ruta) > limite_mb * 1024 * 1024:
+                os.replace(ruta, ruta + ".1")
+            with open(ruta, "a", encoding="utf-8") as f:
+                f.write(lineas)
+        except OSError:
+            pass
+
+
+class Medidor:
+    """
+    Registra las etapas de una ejecución de la app. Para cada etapa guarda el tiempo
+    real, el tiempo de CPU del proceso y cuánto cambió la memoria residente.
+
+    El tiempo de CPU y la memoria son los de todo el proceso: incluyen los hilos de
+    pyarrow y, en el servidor, las demás sesiones que se estén ejecutando a la vez.
+    """
+
+    def __init__(self, app: str, ruta_registro: str = RUTA_REGISTRO, **contexto):
+        """
+        Args:
+            app (str): Nombre de la app que se mide ('union' o 'tablero').
+            ruta_registro (str): Archivo JSON-lines donde se agregan las etapas ('' para no guardar).
+            **contexto: Datos que se guardan con cada etapa (página, filtros, archivo...).
+        """
+        self.app = app
+        self.ruta_registro = ruta_registro
+        self.contexto = contexto
+        self.ejecucion = uuid.uuid4().hex[:12]
+        self.etapas = []
+        self.inicio = time.perf_counter()
+
+    @contextlib.contextmanager
+    def etapa(self, nombre: str, **datos):
+        """
+        Mide el bloque de código como una etapa con nombre. La etapa se registra
+        aunque el bloque termine con una excepción.
+
+        Args:
+            nombre (str): Nombre de la etapa (por ejemplo 'lectura' o 'gráfico mensual').
+            **datos: Datos adicionales de la etapa, como 'Filas'.
+        """
+        memoria_inicial = memoria_residente_mb()
+        cpu_inicial = time.process_time()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            cpu = time.process_time() - cpu_inicial
+            memoria_final = memoria_residente_mb()
+            self._registrar({
+                "Etapa": nombre,
+                "Segundos": round(segundos, 4),
+                "CPU (s)": round(cpu, 4),
+                "Memoria (MB)": None if memoria_final is None else round(memoria_final, 1),
+                "Δ memoria (MB)": None if memoria_final is None or memoria_inicial is None
+                else round(memoria_final - memoria_inicial, 1),
+                **datos,
+            })
+
+    def medir(self, nombre: str, funcion, *args, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) como una etapa y devuelve su resultado."""
+        with self.etapa(nombre):
+            return funcion(*args, **kwargs)
+
+    def _registrar(self, etapa: dict):
+        self.etapas.append(etapa)
+        agregar_al_registro([{
+            "Fecha": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "App": self.app,
+            "Ejecución": self.ejecucion,
+            "PID": os.getpid(),
+            **self.contexto,
+            **etapa,
+        }], self.ruta_registro)
+
+    def tabla(self) -> pd.DataFrame:
+        """Etapas medidas hasta ahora, en el orden en que terminaron."""
+        if not self.etapas:
+            return pd.DataFrame(columns=["Etapa", "Segundos", "CPU (s)", "Memoria (MB)", "Δ memoria (MB)"])
+        return pd.DataFrame(self.etapas)
+
+    def segundos_transcurridos(self) -> float:
+        """Segundos desde que se creó el medidor (el inicio de la ejecución de la app)."""
+        return time.perf_counter() - self.inicio
+
+
+def perfilado_solicitado(parametros_consulta=None) -> bool:
+    """
+    Indica si se pidió perfilar la ejecución: con la variable de entorno
+    AVISOS_PERFILAR=1 (todas las ejecuciones) o con '?perfilar=1' en la URL de la app.
+
+    Args:
+        parametros_consulta: Parámetros de la URL (st.query_params o un diccionario).
+    """
+    if os.environ.get("AVISOS_PERFILAR", "").strip().lower() in _VALORES_ACTIVOS:
+        return True
+    valor = (parametros_consulta or {}).get("perfilar", "")
+    return str(valor).strip().lower() in _VALORES_ACTIVOS
+
+
+def _resumen_perfil(perfilador: cProfile.Profile, cantidad: int) -> list:
+    """Las funciones con más tiempo acumulado (incluye el de las funciones que llaman)."""
+    estadisticas = pstats.Stats(perfilador).stats
+    funciones = sorted(estadisticas.items(), key=lambda item: item[1][3], reverse=True)[:cantidad]
+    return [
+        {
+            "Función": f"{funcion} ({os.path.basename(archivo)}:{linea})",
+            "Llamadas": llamadas,
+            "Segundos propios": round(propio, 4),
+            "Segundos acumulados": round(acumulado, 4),
+        }
+        for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in funciones
+    ]
+
+
+def _rotar_perfiles(directorio: str, maximo: int):
+    """Borra los perfiles más antiguos (y sus etiquetas) hasta dejar 'maximo'."""
+    perfiles = sorted(
+        (entrada.stat().st_mtime, entrada.path) for entrada in os.scandir(directorio)
+        if entrada.name.endswith(".prof")
+    )
+    for _, ruta in perfiles[:max(0, len(perfiles) - maximo)]:
+        for ruta_archivo in (ruta, ruta[:-len(".prof")] + ".json"):
+            try:
+                os.remove(ruta_archivo)
+            except OSError:
+                pass
+
+
+def guardar_perfil(
+    perfilador: cProfile.Profile,
+    pagina: str,
+    etiquetas: dict,
+    segundos: float,
+    ejecucion: str,
+    directorio: str = DIRECTORIO_PERFILES,
+    maximo: int = MAXIMO_PERFILES,
+) -> str:
+    """
+    Escribe el perfil '<fecha>_<página>_<ejecución>.prof' y, al lado, un .json con la
+    página, los filtros activos y las funciones más costosas. El .prof se abre con
+    'python -m pstats' o con visores de gráficos de llama como snakeviz o tuna.
+
+    Returns:
+        str: Ruta del .prof escrito, o '' si no se pudo escribir.
+    """
+    fecha = datetime.datetime.now()
+    base = os.path.join(
+        directorio, f"{fecha:%Y%m%d-%H%M%S}_{re.sub(r'[^A-Za-z0-9_-]+', '-', str(pagina))}_{ejecucion}"
+    )
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        perfilador.dump_stats(base + ".prof")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({
+                "Fecha": fecha.isoformat(timespec="seconds"),
+                "Página": pagina,
+                "Ejecución": ejecucion,
+                "Filtros": etiquetas,
+                "Segundos": round(segundos, 3),
+                "Funciones más costosas": _resumen_perfil(perfilador, FUNCIONES_RESUMEN_PERFIL),
+            }, f, ensure_ascii=False, indent=2, default=str)
+        _rotar_perfiles(directorio, maximo)
+    except OSError:
+        return ""
+    return base + ".prof"
+
+
+# Perfil ya empezado con iniciar_perfil y momento en que empezó
+PerfilEnCurso = collections.namedtuple("PerfilEnCurso", ["perfilador", "inicio"])
+
+
+def iniciar_perfil(activo: bool):
+    """
+    Empieza a perfilar con cProfile, para continuar el perfil con perfilar_ejecucion
+    desde más adelante en el script (por ejemplo, justo después de los imports).
+
+    Args:
+        activo (bool): Si es False no se perfila.
+
+    Returns:
+        PerfilEnCurso: El perfilador activo y su inicio, o None si no se perfila.
+    """
+    if not activo:
+        return None
+    perfilador = cProfile.Profile()
+    try:
+        perfilador.enable()
+    except ValueError:
+        # Desde Python 3.12 solo puede haber un perfilador activo en el proceso: si otra
+        # sesión ya se está perfilando, esta ejecución sigue sin perfilar
+        return None
+    return PerfilEnCurso(perfilador, time.perf_counter())
+
+
+@contextlib.contextmanager
+def perfilar_ejecucion(activo: bool, pagina: str, etiquetas=None, ejecucion: str = None, en_curso=None, **opciones):
+    """
+    Perfila con cProfile el bloque de código (la ejecución de la app) y guarda el
+    resultado con guardar_perfil. El perfil se guarda aunque el bloque termine con
+    una excepción, incluidas las que usa Streamlit para st.rerun() y st.stop().
+
+    Args:
+        activo (bool): Si es False el bloque se ejecuta sin perfilar.
+        pagina (str): Página de la app, que forma parte del nombre del archivo.
+        etiquetas: Diccionario de filtros activos, o una función que lo devuelve; se
+            evalúa al terminar el bloque, cuando los filtros ya tienen su valor final.
+        ejecucion (str): Identificador de la ejecución (el de Medidor, para cruzarlo con el registro).
+        en_curso (PerfilEnCurso): Perfil empezado antes con iniciar_perfil; el bloque lo
+            continúa y el perfil guardado cubre también lo ejecutado desde su inicio.
+            Si se da, 'activo' no se usa.
+        **opciones: 'directorio' y 'maximo' de guardar_perfil.
+    """
+    if en_curso is None:
+        en_curso = iniciar_perfil(activo)
+    if en_curso is None:
+        yield None
+        return
+    try:
+        yield en_curso.perfilador
+    finally:
+        en_curso.perfilador.disable()
+        try:
+            valores = etiquetas() if callable(etiquetas) else etiquetas
+        except Exception as e:
+            valores = {"error al leer los filtros": str(e)}
+        guardar_perfil(
+            en_curso.perfilador, pagina, valores or {}, time.perf_counter() - en_curso.inicio,
+            ejecucion or uuid.uuid4().hex[:12], **opciones
+        )
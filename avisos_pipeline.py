@@ -0,0 +1,568 @@
+# -*- coding: utf-8 -*-
+"""
+Etapas de transformación de los avisos SAP: lectura, unión de las hojas y limpieza posterior.
+
+Las usan tanto la app de Streamlit (avisos.py) como el procesamiento por lotes (avisos_cli.py).
+"""
+
+import hashlib
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from avisos_cache import huella_contenido
+from avisos_ingesta import (
+    COLUMNAS_FINALES, COLUMNAS_IH08, COLUMNAS_IW39, COLUMNAS_ZPM015, HOJAS_SAP,
+    firma_lectura, leer_hojas_sap, leer_hojas_sap_paralelo, revisar_libro
+)
+
+# Versión del resultado de la unión guardado en caché; subirla si cambia la lógica de unión
+VERSION_UNION = 2
+
+RENOMBRES_UNION = {
+    "Texto": "Texto_equipo",
+    "Total general (real)": "Costes tot.reales"
+}
+
+
+def _tipar_clave(tablas: list, clave: str) -> list:
+    """
+    Da el mismo tipo a la columna clave en todas las tablas que se van a unir.
+
+    Si todos los valores son números enteros la clave queda como entero; si no,
+    como texto categórico con las mismas categorías en todas las tablas.
+
+    Args:
+        tablas (list): DataFrames que contienen la columna clave.
+        clave (str): Nombre de la columna clave ('Aviso' o 'Equipo').
+
+    Returns:
+        list: Copias de las tablas con la clave tipada, en el mismo orden.
+    """
+    valores = pd.concat([tabla[clave] for tabla in tablas], ignore_index=True)
+    numericos = pd.to_numeric(valores, errors="coerce")
+    es_entera = numericos.notna().sum() == valores.notna().sum() and (numericos.dropna() % 1 == 0).all()
+
+    if es_entera:
+        # 'int64' cuando no hay vacíos (más rápido al unir); 'Int64' admite vacíos
+        tipo = "int64" if valores.notna().all() else "Int64"
+        convertir = lambda serie: pd.to_numeric(serie, errors="coerce").astype(tipo)
+    else:
+        texto = valores.dropna().astype(str).str.strip()
+        tipo = pd.CategoricalDtype(categories=texto.unique())
+        convertir = lambda serie: serie.where(serie.isna(), serie.astype(str).str.strip()).astype(tipo)
+
+    tipadas = []
+    for tabla in tablas:
+        tabla = tabla.copy(deep=False)
+        tabla[clave] = convertir(tabla[clave])
+        tipadas.append(tabla)
+    return tipadas
+
+
+def _preparar_dimension(dimension: pd.DataFrame, clave: str) -> tuple:
+    """
+    Deja una sola fila por clave en una tabla de dimensión (se conserva la primera)
+    y la indexa por la clave.
+
+    Returns:
+        tuple: (dimensión indexada por la clave, número de claves duplicadas,
+        filas descartadas, ejemplos de claves duplicadas).
+    """
+    dimension = dimension.dropna(subset=[clave])
+    duplicadas = dimension[clave].duplicated(keep="first")
+    claves_duplicadas = dimension.loc[duplicadas, clave].unique()
+    indexada = dimension.loc[~duplicadas].set_index(clave)
+    return indexada, len(claves_duplicadas), int(duplicadas.sum()), [str(c) for c in claves_duplicadas[:5]]
+
+
+def _unir_dimension(hechos: pd.DataFrame, dimension: pd.DataFrame, clave: str) -> pd.DataFrame:
+    """
+    Agrega a 'hechos' las columnas de una dimensión ya indexada por su clave única.
+    Equivale a un merge 'left' pero busca cada clave en el índice sin reordenar ni multiplicar filas.
+    """
+    columnas = [col for col in dimension.columns if col != clave]
+    valores = dimension[columnas].reindex(hechos[clave].to_numpy())
+    valores.index = hechos.index
+    return pd.concat([hechos.drop(columns=columnas, errors="ignore"), valores], axis=1)
+
+
+def unir_hojas(hojas: dict) -> tuple:
+    """
+    Fusiona las hojas SAP en un único DataFrame.
+
+    IW29 es la tabla de hechos. IW39, IH08 y ZPM015 se tratan como dimensiones:
+    se deduplican por su clave (conservando la primera fila) y se buscan por índice,
+    de modo que un registro repetido ya no multiplica los avisos. IW65 (acciones)
+    sí puede aportar varias filas por aviso.
+
+    Args:
+        hojas (dict): DataFrame de cada hoja SAP ('IW29', 'IW39', 'IH08', 'IW65', 'ZPM015').
+
+    Returns:
+        tuple: El DataFrame combinado y limpio, y una lista de dicts con las filas
+        antes y después de cada unión y las claves que multiplican filas.
+    """
+    iw29, iw39, iw65 = _tipar_clave([hojas["IW29"], hojas["IW39"], hojas["IW65"]], "Aviso")
+    iw29, ih08, zpm015 = _tipar_clave([iw29, hojas["IH08"], hojas["ZPM015"]], "Equipo")
+
+    reporte = []
+
+    def registrar(union, clave, filas_antes, filas_despues, claves_repetidas, filas_descartadas, ejemplos, inicio):
+        reporte.append({
+            "Unión": union,
+            "Clave": clave,
+            "Filas antes": filas_antes,
+            "Filas después": filas_despues,
+            "Claves repetidas": claves_repetidas,
+            "Filas descartadas": filas_descartadas,
+            "Ejemplos de claves repetidas": ", ".join(ejemplos),
+            "Segundos": round(time.perf_counter() - inicio, 3),
+        })
+
+    df = iw29
+
+    # IW39: una fila por aviso con su costo real
+    inicio = time.perf_counter()
+    dim_iw39, repetidas, descartadas, ejemplos = _preparar_dimension(iw39[COLUMNAS_IW39], "Aviso")
+    filas_antes = len(df)
+    df = _unir_dimension(df, dim_iw39, "Aviso")
+    registrar("IW29 ⋈ IW39", "Aviso", filas_antes, len(df), repetidas, descartadas, ejemplos, inicio)
+
+    # IW65: varias acciones por aviso. Las columnas que IW29 ya tiene (Equipo, Duración de parada,
+    # Descripción...) se toman de IW29, sin volver a unir IW29 consigo misma para recuperarlas
+    inicio = time.perf_counter()
+    columnas_iw65 = ["Aviso"] + [col for col in iw65.columns if col not in df.columns]
+    acciones = iw65[columnas_iw65]
+    multiplicadoras = acciones.loc[acciones["Aviso"].duplicated(), "Aviso"].unique()
+    filas_antes = len(df)
+    df = pd.merge(df, acciones, on="Aviso", how="left")
+    registrar(
+        "IW29 ⋈ IW65", "Aviso", filas_antes, len(df), len(multiplicadoras), 0,
+        [str(c) for c in multiplicadoras[:5]], inicio
+    )
+
+    # IH08 y ZPM015: datos del equipo, una fila por equipo
+    for nombre, dimension, columnas in (("IH08", ih08, COLUMNAS_IH08), ("ZPM015", zpm015, COLUMNAS_ZPM015)):
+        inicio = time.perf_counter()
+        dim_equipo, repetidas, descartadas, ejemplos = _preparar_dimension(dimension[columnas], "Equipo")
+        filas_antes = len(df)
+        df = _unir_dimension(df, dim_equipo, "Equipo")
+        registrar(f"⋈ {nombre}", "Equipo", filas_antes, len(df), repetidas, descartadas, ejemplos, inicio)
+
+    df = df.rename(columns=RENOMBRES_UNION)
+
+    # Filtrar solo las columnas que realmente existen
+    columnas_finales = [col for col in COLUMNAS_FINALES if col in df.columns]
+    return df[columnas_finales].reset_index(drop=True), reporte
+
+
+# Filtros que se aplican a IW29 antes de unir las hojas, si no se indican otros
+FILTROS_POR_DEFECTO = {"excluir_status": "PTBO"}
+
+
+def excluir_status(df: pd.DataFrame, patron: str = "PTBO", columna: str = "Status del sistema") -> tuple:
+    """
+    Elimina los registros cuyo status del sistema contiene el patrón (sin distinguir mayúsculas).
+
+    Returns:
+        tuple: (DataFrame filtrado, número de filas eliminadas).
+    """
+    if columna not in df.columns:
+        return df, 0
+    mascara = _contiene(df[columna], patron)
+    return df[~mascara], int(mascara.sum())
+
+
+def _contiene(serie: pd.Series, patron: str) -> pd.Series:
+    """Máscara de los valores que contienen el patrón como texto literal, sin distinguir mayúsculas."""
+    # Los status se repiten mucho: se busca el patrón una vez por valor distinto
+    codigos, valores = pd.factorize(serie)
+    encontrados = pd.Series(valores).astype("string").str.contains(patron, case=False, regex=False, na=False)
+    mascara = np.append(encontrados.to_numpy(dtype=bool), False)[codigos]  # código -1 (vacío) -> False
+    return pd.Series(mascara, index=serie.index)
+
+
+def _mascaras_filtros(df: pd.DataFrame, filtros: dict):
+    """
+    Traduce los filtros a máscaras de las filas que se conservan. Es un generador:
+    cada máscara se calcula cuando se pide, para poder medir cuánto tarda.
+
+    Yields:
+        tuple: (descripción del filtro, máscara booleana o None si falta la columna).
+    """
+    if filtros.get("excluir_status"):
+        patron = filtros["excluir_status"]
+        if "Status del sistema" in df.columns:
+            yield f"Status del sistema sin '{patron}'", ~_contiene(df["Status del sistema"], patron).to_numpy()
+        else:
+            yield f"Status del sistema sin '{patron}'", None
+
+    if filtros.get("fecha_desde") is not None or filtros.get("fecha_hasta") is not None:
+        desde, hasta = filtros.get("fecha_desde"), filtros.get("fecha_hasta")
+        descripcion = f"Fecha de aviso entre {desde or '…'} y {hasta or '…'}"
+        if "Fecha de aviso" in df.columns:
+            fechas = pd.to_datetime(df["Fecha de aviso"], errors="coerce")
+            mascara = fechas.notna()
+            if desde is not None:
+                mascara &= fechas >= pd.Timestamp(desde)
+            if hasta is not None:
+                # La fecha final se incluye completa, hasta las 23:59:59
+                mascara &= fechas < pd.Timestamp(hasta).normalize() + pd.Timedelta(days=1)
+            yield descripcion, mascara.to_numpy()
+        else:
+            yield descripcion, None
+
+    if filtros.get("centros_coste"):
+        centros = {str(centro).strip() for centro in filtros["centros_coste"]}
+        descripcion = f"Centro de coste en {', '.join(sorted(centros))}"
+        if "Centro de coste" in df.columns:
+            yield descripcion, df["Centro de coste"].astype("string").str.strip().isin(centros).to_numpy()
+        else:
+            yield descripcion, None
+
+
+def filtrar_hechos(iw29: pd.DataFrame, filtros: dict) -> tuple:
+    """
+    Aplica los filtros a IW29 (la tabla que guía la unión), para no unir filas que luego se descartan.
+
+    Filtros admitidos (todos opcionales):
+        'excluir_status' (str): Se quitan los avisos cuyo 'Status del sistema' lo contiene.
+        'fecha_desde', 'fecha_hasta' (fecha): Ventana de 'Fecha de aviso', ambas incluidas.
+        'centros_coste' (list): Solo se conservan estos valores de 'Centro de coste'.
+
+    Args:
+        iw29 (pd.DataFrame): Hoja IW29.
+        filtros (dict): Filtros a aplicar.
+
+    Returns:
+        tuple: (IW29 filtrada, lista de dicts con 'Filtro', 'Filas antes', 'Filas eliminadas'
+        y 'Segundos' de cada filtro, en el orden en que se aplicaron).
+    """
+    reporte = []
+    # Las máscaras se combinan y la tabla se recorta una sola vez al final
+    conservar = np.ones(len(iw29), dtype=bool)
+    inicio = time.perf_counter()
+    for descripcion, mascara in _mascaras_filtros(iw29, filtros or {}):
+        filas_antes = int(conservar.sum())
+        if mascara is None:
+            # Sin la columna no se puede filtrar; se deja constancia en el reporte
+            descripcion += " (columna no encontrada)"
+        else:
+            conservar &= mascara
+        reporte.append({
+            "Filtro": descripcion,
+            "Filas antes": filas_antes,
+            "Filas eliminadas": filas_antes - int(conservar.sum()),
+            "Segundos": round(time.perf_counter() - inicio, 3),
+        })
+        inicio = time.perf_counter()
+    if not conservar.all():
+        iw29 = iw29[conservar]
+    return iw29, reporte
+
+
+def unir_con_filtros(hojas: dict, filtros: dict = None) -> tuple:
+    """
+    Filtra IW29 y después une las hojas. Las acciones de IW65 y los datos de las
+    dimensiones de los avisos eliminados ya no pasan por ninguna unión.
+
+    Como el costo de la unión crece con las filas de IW29, el tiempo ahorrado por
+    cada filtro se estima en proporción a las filas que eliminó. La estimación es
+    menos fiable cuando quedan muy pocas filas, porque domina el costo fijo de unir.
+
+    Args:
+        hojas (dict): DataFrame de cada hoja SAP.
+        filtros (dict): Filtros de filtrar_hechos; por defecto FILTROS_POR_DEFECTO.
+
+    Returns:
+        tuple: (DataFrame combinado, reporte de las uniones (lista), reporte de los
+        filtros (lista) con la columna adicional 'Segundos de unión ahorrados (estimado)').
+    """
+    filtros = FILTROS_POR_DEFECTO if filtros is None else filtros
+    iw29, reporte_filtros = filtrar_hechos(hojas["IW29"], filtros)
+    df, reporte_union = unir_hojas({**hojas, "IW29": iw29})
+
+    segundos_union = sum(union["Segundos"] for union in reporte_union)
+    segundos_por_fila = segundos_union / len(iw29) if len(iw29) else 0.0
+    for filtro in reporte_filtros:
+        filtro["Segundos de unión ahorrados (estimado)"] = round(filtro["Filas eliminadas"] * segundos_por_fila, 3)
+    return df, reporte_union, reporte_filtros
+
+
+def firma_filtros(filtros: dict) -> str:
+    """Identificador corto de un conjunto de filtros, para guardar en caché cada resultado por separado."""
+    texto = json.dumps(filtros or {}, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=6).hexdigest()
+
+
+# Políticas de reparto del costo de cada aviso entre sus filas (una por acción de IW65)
+POLITICAS_COSTO = {
+    "primera_fila": "Todo el costo en la primera fila del aviso",
+    "reparto_igual": "Repartido en partes iguales entre las acciones",
+    "por_grupo_accion": "Repartido según el peso del grupo de acción",
+}
+
+
+def atribuir_costes(
+    df: pd.DataFrame,
+    politica: str = "primera_fila",
+    pesos_grupo: dict = None,
+    columna_costo: str = "Costes tot.reales",
+    columna_aviso: str = "Aviso",
+    columna_grupo: str = "Texto grupo acción",
+) -> pd.DataFrame:
+    """
+    Reparte el costo de cada aviso entre sus filas sin recorrer los avisos en Python.
+
+    Tras la unión con IW65 el costo del aviso aparece repetido en cada acción. Con
+    'primera_fila' se conserva solo en la primera aparición del aviso y el resto queda
+    en 0; 'reparto_igual' lo divide entre las filas del aviso y 'por_grupo_accion' lo
+    divide en proporción al peso de cada grupo de acción (peso 1 si no se indica).
+
+    Args:
+        df (pd.DataFrame): Avisos unidos, con una fila por acción.
+        politica (str): Una de las claves de POLITICAS_COSTO.
+        pesos_grupo (dict): Peso por valor de 'Texto grupo acción' (solo 'por_grupo_accion').
+        columna_costo (str): Columna con el costo del aviso.
+        columna_aviso (str): Columna que identifica el aviso.
+        columna_grupo (str): Columna con el grupo de acción.
+
+    Returns:
+        pd.DataFrame: Copia de df con el costo repartido y numérico (vacíos como 0).
+    """
+    if politica not in POLITICAS_COSTO:
+        raise ValueError(f"Política de costo desconocida: '{politica}'. Opciones: {', '.join(POLITICAS_COSTO)}")
+
+    df = df.copy()
+    costo = pd.to_numeric(df[columna_costo], errors="coerce")
+    aviso = df[columna_aviso]
+    # Las filas sin aviso no se agrupan con ninguna otra y no reciben costo
+    con_aviso = aviso.notna()
+
+    if politica == "primera_fila":
+        primera = ~aviso.duplicated(keep="first") & con_aviso
+        df[columna_costo] = costo.where(primera, 0).fillna(0)
+        return df
+
+    # Costo del aviso (el mismo en todas sus filas tras la unión) repetido en cada fila
+    grupos = costo.groupby(aviso, sort=False, observed=True)
+    costo_aviso = grupos.transform("first")
+
+    if politica == "por_grupo_accion" and columna_grupo in df.columns:
+        pesos = df[columna_grupo].map(pesos_grupo or {}).astype(float).fillna(1.0)
+    else:
+        pesos = pd.Series(1.0, index=df.index)
+
+    suma_pesos = pesos.groupby(aviso, sort=False, observed=True).transform("sum")
+    filas_aviso = pesos.groupby(aviso, sort=False, observed=True).transform("size")
+    # Si todos los pesos de un aviso son 0 se reparte en partes iguales
+    proporcion = (pesos / suma_pesos).where(suma_pesos > 0, 1.0 / filas_aviso)
+
+    df[columna_costo] = (costo_aviso * proporcion).where(con_aviso, 0).fillna(0)
+    return df
+
+
+def cargar_y_unir(
+    contenido: bytes, paralelo: bool = False, cache=None, filtros: dict = None, revisar: bool = True
+) -> tuple:
+    """
+    Lee las hojas SAP de un archivo, filtra IW29 y une las hojas. Si se pasa una caché
+    y el mismo archivo ya se procesó antes con los mismos filtros, el resultado se lee de ella.
+
+    Args:
+        contenido (bytes): Contenido del archivo Excel.
+        paralelo (bool): Si es True, cada hoja se lee en un proceso distinto.
+        cache (CacheColumnar): Caché en disco opcional.
+        filtros (dict): Filtros previos a la unión (ver filtrar_hechos); por defecto FILTROS_POR_DEFECTO.
+        revisar (bool): Si es True, antes de leer los datos se revisan las hojas y columnas
+            del libro (revisar_libro). Se puede omitir si quien llama ya lo hizo.
+
+    Returns:
+        tuple: El DataFrame combinado y limpio, la lista de tiempos de lectura por hoja,
+        el reporte de filas de cada unión y el de cada filtro (ambos DataFrame).
+
+    Raises:
+        ValueError: Si al libro le faltan hojas o columnas requeridas.
+    """
+    filtros = FILTROS_POR_DEFECTO if filtros is None else filtros
+    # Las hojas leídas se guardan con la firma de la lectura y la unión, además, con su
+    # versión y los filtros: si algo cambia, no se reutilizan resultados anteriores
+    sufijo_hojas = firma_lectura()
+    sufijo = f"v{VERSION_UNION}_{sufijo_hojas}_{firma_filtros(filtros)}"
+    nombre_union, nombre_reporte, nombre_filtros = f"union_{sufijo}", f"reporte_union_{sufijo}", f"filtros_{sufijo}"
+    huella = None
+
+    if cache is not None:
+        huella = huella_contenido(contenido)
+
+        inicio = time.perf_counter()
+        df_union = cache.leer(huella, nombre_union)
+        reporte_union = cache.leer(huella, nombre_reporte) if df_union is not None else None
+        reporte_filtros = cache.leer(huella, nombre_filtros) if reporte_union is not None else None
+        if reporte_filtros is not None:
+            return df_union, [{
+                "Hoja": "Unión (caché)", "Filas": len(df_union), "Segundos": round(time.perf_counter() - inicio, 3)
+            }], reporte_union, reporte_filtros
+
+    # Revisar hojas y columnas con los encabezados, antes de la lectura completa
+    if revisar:
+        errores = revisar_libro(contenido)["Errores"]
+        if errores:
+            raise ValueError(" ".join(errores))
+
+    # Intentar recuperar las hojas ya leídas; si falta alguna se relee el libro completo
+    hojas = {}
+    tiempos_lectura = []
+    if cache is not None:
+        for hoja in HOJAS_SAP:
+            inicio = time.perf_counter()
+            df_hoja = cache.leer(huella, f"{hoja}_{sufijo_hojas}")
+            if df_hoja is None:
+                break
+            hojas[hoja] = df_hoja
+            tiempos_lectura.append({
+                "Hoja": f"{hoja} (caché)", "Filas": len(df_hoja), "Segundos": round(time.perf_counter() - inicio, 3)
+            })
+
+    if len(hojas) < len(HOJAS_SAP):
+        if paralelo:
+            hojas, tiempos_lectura = leer_hojas_sap_paralelo(contenido)
+        else:
+            hojas, tiempos_lectura = leer_hojas_sap(io.BytesIO(contenido))
+        if cache is not None:
+            for hoja, df_hoja in hojas.items():
+                cache.guardar(huella, f"{hoja}_{sufijo_hojas}", df_hoja)
+
+    df_union, reporte_union, reporte_filtros = unir_con_filtros(hojas, filtros)
+    reporte_union = pd.DataFrame(reporte_union)
+    reporte_filtros = pd.DataFrame(reporte_filtros, columns=[
+        "Filtro", "Filas antes", "Filas eliminadas", "Segundos", "Segundos de unión ahorrados (estimado)"
+    ])
+    if cache is not None:
+        cache.guardar(huella, nombre_union, df_union)
+        cache.guardar(huella, nombre_reporte, reporte_union)
+        cache.guardar(huella, nombre_filtros, reporte_filtros)
+    return df_union, tiempos_lectura, reporte_union, reporte_filtros
+
+
+# Columnas de identificadores numéricos que se guardan como el entero más pequeño posible
+COLUMNAS_ENTERAS = ["Aviso", "Orden", "Equipo"]
+
+
+def compactar_tipos(
+    df: pd.DataFrame,
+    columnas_enteras: list = None,
+    max_proporcion_unicos: float = 0.5,
+) -> tuple:
+    """
+    Reduce la memoria del DataFrame: los textos con pocos valores distintos (status,
+    proveedor, tipo de servicio, textos de acción...) pasan a categóricos y los
+    identificadores numéricos a enteros compactos.
+
+    Las columnas con tipos mezclados (por ejemplo un código postal que a veces es número
+    y a veces texto) y las que tienen vacíos que no se pueden representar se dejan igual.
+
+    Args:
+        df (pd.DataFrame): Avisos ya unidos.
+        columnas_enteras (list): Columnas de identificadores; por defecto COLUMNAS_ENTERAS.
+        max_proporcion_unicos (float): Un texto pasa a categórico si sus valores distintos
+            no superan esta proporción de las filas.
+
+    Returns:
+        tuple: (DataFrame con los tipos compactos, dict con 'Bytes antes', 'Bytes después'
+        y las columnas convertidas a 'Categóricas' y 'Enteras').
+    """
+    bytes_antes = int(df.memory_usage(deep=True).sum())
+    df = df.copy(deep=False)
+    categoricas, enteras = [], []
+
+    for col in columnas_enteras or COLUMNAS_ENTERAS:
+        if col not in df.columns or (pd.api.types.is_integer_dtype(df[col]) and df[col].dtype.itemsize <= 4):
+            continue
+        numericos = pd.to_numeric(df[col], errors="coerce")
+        if numericos.notna().sum() != df[col].notna().sum() or (numericos.dropna() % 1 != 0).any():
+            continue
+        if numericos.notna().all():
+            df[col] = pd.to_numeric(numericos.astype("int64"), downcast="integer")
+        else:
+            # Los enteros con vacíos usan el tipo que admite nulos ('Int32' o 'Int64')
+            cabe_en_32 = numericos.abs().max() < 2**31 if numericos.notna().any() else True
+            df[col] = numericos.astype("Int32" if cabe_en_32 else "Int64")
+        enteras.append(col)
+
+    for col in df.columns:
+        serie = df[col]
+        if col in enteras or not (pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)):
+            continue
+        if isinstance(serie.dtype, pd.CategoricalDtype) or pd.api.types.infer_dtype(serie, skipna=True) != "string":
+            continue
+        if serie.nunique() <= max_proporcion_unicos * len(serie):
+            df[col] = serie.astype("category")
+            categoricas.append(col)
+
+    return df, {
+        "Bytes antes": bytes_antes,
+        "Bytes después": int(df.memory_usage(deep=True).sum()),
+        "Categóricas": categoricas,
+        "Enteras": enteras,
+    }
+
+
+def procesar_libro(
+    contenido: bytes,
+    politica_costo: str = "primera_fila",
+    pesos_grupo: dict = None,
+    paralelo: bool = False,
+    cache=None,
+    compactar: bool = False,
+    filtros: dict = None,
+) -> tuple:
+    """
+    Ejecuta el procesamiento completo de un archivo BASE DE DATOS.XLSX, sin interfaz:
+    lectura, filtros sobre IW29 (por defecto, exclusión de avisos PTBO), unión,
+    compactación de tipos (opcional) y reparto de costos.
+
+    Args:
+        contenido (bytes): Contenido del archivo Excel.
+        politica_costo (str): Política de reparto del costo (ver POLITICAS_COSTO).
+        pesos_grupo (dict): Pesos por grupo de acción para 'por_grupo_accion'.
+        paralelo (bool): Si es True, cada hoja se lee en un proceso distinto.
+        cache (CacheColumnar): Caché en disco opcional.
+        compactar (bool): Si es True, se aplica compactar_tipos después de la unión.
+        filtros (dict): Filtros previos a la unión (ver filtrar_hechos); por defecto FILTROS_POR_DEFECTO.
+
+    Returns:
+        tuple: (DataFrame final, lista de dicts con 'Etapa', 'Filas' y 'Segundos').
+    """
+    etapas = []
+
+    inicio = time.perf_counter()
+    df, tiempos_lectura, _, reporte_filtros = cargar_y_unir(contenido, paralelo=paralelo, cache=cache, filtros=filtros)
+    segundos_lectura = sum(tiempo["Segundos"] for tiempo in tiempos_lectura)
+    segundos_filtros = float(reporte_filtros["Segundos"].sum())
+    etapas.append({"Etapa": "lectura", "Filas": sum(t["Filas"] for t in tiempos_lectura), "Segundos": round(segundos_lectura, 3)})
+    for _, filtro in reporte_filtros.iterrows():
+        etapas.append({
+            "Etapa": f"filtro: {filtro['Filtro']}",
+            "Filas": int(filtro["Filas antes"] - filtro["Filas eliminadas"]),
+            "Segundos": filtro["Segundos"],
+        })
+    etapas.append({
+        "Etapa": "unión", "Filas": len(df),
+        "Segundos": round(time.perf_counter() - inicio - segundos_lectura - segundos_filtros, 3)
+    })
+
+    if compactar:
+        inicio = time.perf_counter()
+        df, _ = compactar_tipos(df)
+        etapas.append({"Etapa": "compactación de tipos", "Filas": len(df), "Segundos": round(time.perf_counter() - inicio, 3)})
+
+    inicio = time.perf_counter()
+    df = atribuir_costes(df, politica_costo, pesos_grupo)
+    etapas.append({"Etapa": "reparto de costos", "Filas": len(df), "Segundos": round(time.perf_counter() - inicio, 3)})
+
+    return df, etapas
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Puntuación automática (0 a 2) de las preguntas de desempeño técnico de la evaluación
+de proveedores, a partir de la tabla de indicadores (ver avisos_indicadores).
+
+Los umbrales están en una tabla de reglas (REGLAS_PUNTUACION): cada regla da unos
+puntos si el indicador cumple la comparación. Una entidad recibe los puntos de la
+primera regla que cumple, de más a menos puntos, o 0 si no cumple ninguna (también
+cuando el indicador está vacío). Se puntúan todas las entidades de una vez, con un
+np.select por indicador.
+"""
+
+import operator
+
+import numpy as np
+import pandas as pd
+
+# Comparaciones que pueden usar las reglas
+OPERADORES = {
+    '>=': operator.ge, '>': operator.gt,
+    '<=': operator.le, '<': operator.lt,
+    '==': operator.eq,
+}
+
+# Reglas de puntuación: indicador (columna de la tabla de indicadores), puntos,
+# comparación y umbral. Deben coincidir con las descripciones de rangos_detallados.
+REGLAS_PUNTUACION = pd.DataFrame(
+    [
+        ('Disponibilidad (%)', 2, '>=', 98),
+        ('Disponibilidad (%)', 1, '>=', 75),
+        ('MTTR (hrs)', 2, '<=', 5),
+        ('MTTR (hrs)', 1, '<=', 20),
+        ('MTBF (hrs)', 2, '>', 1000),
+        ('MTBF (hrs)', 1, '>=', 100),
+        ('Rendimiento', 2, '==', 'Alto'),
+        ('Rendimiento', 1, '==', 'Medio'),
+    ],
+    columns=['Indicador', 'Puntos', 'Operador', 'Umbral'],
+)
+
+
+def puntuar_indicadores(indicadores: pd.DataFrame, reglas: pd.DataFrame = REGLAS_PUNTUACION) -> pd.DataFrame:
+    """
+    Puntuación de cada entidad en cada indicador de las reglas.
+
+    Args:
+        indicadores (pd.DataFrame): Indicadores de cada entidad (una fila por entidad),
+            con columnas como las de COLUMNAS_INDICADORES.
+        reglas (pd.DataFrame): Tabla de reglas con las columnas de REGLAS_PUNTUACION.
+
+    Returns:
+        pd.DataFrame: Puntuaciones int8, con el índice de indicadores y una columna
+        por indicador de las reglas (0 en toda la columna si falta el indicador).
+
+    Raises:
+        ValueError: Si una regla usa una comparación que no está en OPERADORES.
+    """
+    desconocidos = sorted(set(reglas['Operador']) - set(OPERADORES))
+    if desconocidos:
+        raise ValueError(f"Comparaciones de puntuación desconocidas: {', '.join(desconocidos)}")
+
+    # De más a menos puntos: np.select se queda con la primera condición que se cumple
+    ordenadas = reglas.sort_values('Puntos', ascending=False, kind='stable')
+    puntuaciones = {}
+    for indicador, grupo in ordenadas.groupby('Indicador', sort=False):
+        if indicador not in indicadores.columns:
+            puntuaciones[indicador] = np.zeros(len(indicadores), dtype=np.int8)
+            continue
+        valores = indicadores[indicador]
+        # Las comparaciones con un valor vacío son falsas: sin indicador, 0 puntos
+        condiciones = [
+            OPERADORES[comparacion](valores, umbral).to_numpy(dtype=bool, na_value=False)
+            for comparacion, umbral in zip(grupo['Operador'], grupo['Umbral'])
+        ]
+        puntuaciones[indicador] = np.select(condiciones, grupo['Puntos'].to_numpy(), default=0).astype(np.int8)
+    return pd.DataFrame(puntuaciones, index=indicadores.index)
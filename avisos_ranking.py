@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Ranking de grupos (costo o avisos por objeto técnico, texto de acción...) para las
+tablas paginadas del tablero.
+
+La primera página sale de una selección parcial (np.partition): O(n + k log k) en
+lugar de ordenar los miles de grupos. El orden completo se calcula una sola vez, la
+primera vez que se pide una página más allá de la primera, y desde ahí cada página
+es un corte. El total y el resto fuera de una página ('Otros') son sumas, sin ordenar.
+
+El orden es el de sort_values(ascending=False, kind='stable'): de mayor a menor y,
+en los empates, en el orden de los grupos (el de groupby, por clave); los valores
+vacíos van al final.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Ranking:
+    """Grupos de una serie agrupada, de mayor a menor valor, calculados por páginas."""
+
+    def __init__(self, serie: pd.Series):
+        """
+        Args:
+            serie (pd.Series): Valor de cada grupo (sin ordenar), indexado por el grupo.
+        """
+        self.etiquetas = serie.index
+        self.nombre = serie.name
+        self.valores = serie.to_numpy()
+        # Clave de orden ascendente: el mayor valor primero y los vacíos al final
+        clave = serie.to_numpy(dtype='float64', na_value=np.nan)
+        self._clave = np.where(np.isnan(clave), np.inf, -clave)
+        self.total = serie.sum()
+        self._orden = None
+        self._primeros = {}
+
+    def __len__(self) -> int:
+        return len(self._clave)
+
+    def _orden_completo(self) -> np.ndarray:
+        """Posiciones de todos los grupos en orden (se calcula una vez)."""
+        if self._orden is None:
+            orden = np.argsort(self._clave, kind='stable')
+            orden.setflags(write=False)
+            self._orden = orden
+        return self._orden
+
+    def _posiciones_primeros(self, k: int) -> np.ndarray:
+        """Posiciones de los k primeros grupos, en orden."""
+        k = max(0, min(k, len(self)))
+        if self._orden is not None or k == len(self):
+            return self._orden_completo()[:k]
+        if k not in self._primeros:
+            if k == 0:
+                self._primeros[k] = self._clave[:0].astype(np.intp)
+            else:
+                # Entran los que superan al k-ésimo y, de los empatados con él, los primeros
+                umbral = np.partition(self._clave, k - 1)[k - 1]
+                mejores = np.flatnonzero(self._clave < umbral)
+                empatados = np.flatnonzero(self._clave == umbral)[:k - len(mejores)]
+                seleccion = np.concatenate([mejores, empatados])
+                self._primeros[k] = seleccion[np.argsort(self._clave[seleccion], kind='stable')]
+        return self._primeros[k]
+
+    def _serie(self, posiciones: np.ndarray) -> pd.Series:
+        return pd.Series(self.valores[posiciones], index=self.etiquetas[posiciones], name=self.nombre)
+
+    def primeros(self, k: int) -> pd.Series:
+        """Los k grupos de mayor valor, en orden, sin ordenar el resto."""
+        return self._serie(self._posiciones_primeros(k))
+
+    def pagina(self, inicio: int, fin: int) -> pd.Series:
+        """
+        Grupos de las posiciones [inicio, fin) del ranking. La primera página es una
+        selección parcial; las demás, un corte del orden completo.
+
+        Args:
+            inicio (int): Primera posición del ranking (desde 0).
+            fin (int): Posición siguiente a la última.
+
+        Returns:
+            pd.Series: Los valores de esos grupos, en orden.
+        """
+        if inicio <= 0 and self._orden is None:
+            return self.primeros(fin)
+        return self._serie(self._orden_completo()[max(0, inicio):max(0, fin)])
+
+    def otros(self, serie: pd.Series):
+        """Suma de los grupos que no están en la serie (una página o los primeros k): el resto 'Otros'."""
+        return self.total - serie.sum()
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Generador de datos SAP sintéticos para pruebas de rendimiento.
+
+Produce las cinco hojas del archivo BASE DE DATOS.XLSX (IW29, IW39, IH08, IW65,
+ZPM015) y la hoja única que espera el tablero (code_avisos (4).py), con el
+número de filas, la proporción de claves duplicadas y las columnas faltantes
+que se indiquen.
+
+Uso:
+    python avisos_sintetico.py --filas 100000 --salida "BASE DE DATOS.xlsx"
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from avisos_exportacion import escribir_parquet, escribir_xlsx, escribir_xlsx_hojas
+from avisos_ingesta import HOJAS_SAP
+from avisos_pipeline import POLITICAS_COSTO, atribuir_costes, unir_con_filtros
+
+# Máximo de filas de datos que admite una hoja de Excel (sin contar el encabezado)
+FILAS_MAXIMAS_EXCEL = 1_048_575
+
+_STATUS = ["MEAB", "NOTI CTEC", "MECE NOPR", "PTBO CERR", "ORAS MEAB"]
+_PROBABILIDAD_STATUS = [0.4, 0.25, 0.15, 0.1, 0.1]
+_CATEGORIAS_DESCRIPCION = ["MC", "PV", "CL", "IN", "RE"]
+_DETALLES_DESCRIPCION = ["FALLA EN ENCENDIDO", "MANTENIMIENTO PREVENTIVO", "CALIBRACIÓN ANUAL", "RUIDO ANORMAL", "CAMBIO DE REPUESTO"]
+_PROVEEDORES = [f"PROVEEDOR {letra} S.A.S." for letra in "ABCDEFGHIJKLMNOP"]
+_TIPOS_SERVICIO = ["MANTENIMIENTO", "CALIBRACIÓN", "METROLOGÍA", "REPARACIÓN", "INSTALACIÓN"]
+_OBJETOS_TECNICOS = ["MONITOR", "BOMBA DE INFUSIÓN", "VENTILADOR", "DESFIBRILADOR", "ECÓGRAFO", "AUTOCLAVE"]
+_GRUPOS_ACCION = ["REPARACIÓN", "REVISIÓN", "CALIBRACIÓN", "AJUSTE"]
+_ACCIONES = ["CAMBIO DE PIEZA", "LIMPIEZA", "AJUSTE DE PARÁMETROS", "PRUEBA FUNCIONAL", "ACTUALIZACIÓN"]
+_CENTROS_COSTE = [f"CC{numero:04d}" for numero in range(1, 41)]
+
+
+def _con_duplicados(df: pd.DataFrame, tasa: float, rng: np.random.Generator) -> pd.DataFrame:
+    """Agrega al final copias de una fracción 'tasa' de las filas, como los registros repetidos de SAP."""
+    copias = int(len(df) * tasa)
+    if copias == 0:
+        return df
+    return pd.concat([df, df.iloc[rng.integers(0, len(df), copias)]], ignore_index=True)
+
+
+def generar_hojas_sap(
+    filas: int,
+    acciones_por_aviso: float = 2.0,
+    equipos_por_aviso: float = 0.25,
+    tasa_duplicados: float = 0.0,
+    columnas_faltantes: list = None,
+    semilla: int = 0,
+) -> dict:
+    """
+    Genera las cinco hojas SAP con valores parecidos a los reales.
+
+    Args:
+        filas (int): Filas de IW65 (una por acción), que son también las filas
+            aproximadas del resultado de la unión.
+        acciones_por_aviso (float): Promedio de acciones por aviso; IW29 tiene filas / acciones_por_aviso avisos.
+        equipos_por_aviso (float): Equipos distintos por aviso (IH08 y ZPM015).
+        tasa_duplicados (float): Fracción de filas repetidas que se agregan a IW39, IH08 y ZPM015.
+        columnas_faltantes (list): Columnas que se quitan de todas las hojas donde aparezcan.
+        semilla (int): Semilla del generador aleatorio, para obtener siempre los mismos datos.
+
+    Returns:
+        dict: Un DataFrame por hoja SAP.
+    """
+    rng = np.random.default_rng(semilla)
+    n_avisos = max(1, int(filas / acciones_por_aviso))
+    n_equipos = max(1, int(n_avisos * equipos_por_aviso))
+
+    avisos = np.arange(n_avisos, dtype="int64") + 10_000_000
+    equipos = np.arange(n_equipos, dtype="int64") + 5_000_000
+    equipo_aviso = equipos[rng.integers(0, n_equipos, n_avisos)]
+
+    descripcion = pd.Series(rng.choice(_CATEGORIAS_DESCRIPCION, n_avisos)).str.cat(
+        pd.Series(rng.choice(_DETALLES_DESCRIPCION, n_avisos)), sep="/"
+    )
+    # Una parte de las descripciones no sigue el formato 'XX/' (categoría 'Otros' en el tablero)
+    descripcion = descripcion.where(rng.random(n_avisos) > 0.05, "SIN CATEGORÍA")
+    # SAP entrega el código postal a veces como número y a veces como texto
+    codigo_postal = np.where(rng.random(n_avisos) < 0.5, "050001", "110111").astype(object)
+    codigo_postal[rng.random(n_avisos) < 0.3] = 50001
+
+    iw29 = pd.DataFrame({
+        "Aviso": avisos,
+        "Orden": avisos + 40_000_000,
+        "Fecha de aviso": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730 * 24 * 60, n_avisos), unit="min"),
+        "Código postal": codigo_postal,
+        "Status del sistema": rng.choice(_STATUS, n_avisos, p=_PROBABILIDAD_STATUS),
+        "Descripción": descripcion,
+        "Ubicación técnica": pd.Series(rng.integers(1, 300, n_avisos)).map("UT-{:03d}".format),
+        "Indicador": rng.choice(["A", "B", "C"], n_avisos),
+        "Equipo": equipo_aviso,
+        "Denominación ejecutante": rng.choice(_PROVEEDORES, n_avisos),
+        "Duración de parada": np.round(rng.exponential(6.0, n_avisos), 2),
+        "Centro de coste": rng.choice(_CENTROS_COSTE, n_avisos),
+    })
+
+    iw39 = pd.DataFrame({
+        "Aviso": avisos,
+        "Orden": avisos + 40_000_000,
+        "Total general (real)": np.round(rng.lognormal(12, 1.2, n_avisos), 0),
+    })
+
+    inicio_garantia = pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, n_equipos), unit="D")
+    ih08 = pd.DataFrame({
+        "Equipo": equipos,
+        "Inic.garantía prov.": inicio_garantia,
+        "Fin garantía prov.": inicio_garantia + pd.to_timedelta(rng.integers(365, 5 * 365, n_equipos), unit="D"),
+        "Texto": pd.Series(rng.integers(1, 135, n_equipos)).map("HORARIO_{}".format),
+        "Indicador ABC": rng.choice(["A", "B", "C"], n_equipos),
+        "Denominación de objeto técnico": rng.choice(_OBJETOS_TECNICOS, n_equipos),
+    })
+
+    # IW65: filas acciones por aviso en promedio (cada aviso tiene al menos una)
+    aviso_accion = np.sort(np.concatenate([
+        np.arange(n_avisos), rng.integers(0, n_avisos, max(0, filas - n_avisos))
+    ]))
+    iw65 = pd.DataFrame({
+        "Aviso": avisos[aviso_accion],
+        "Texto código acción": rng.choice(_ACCIONES, len(aviso_accion)),
+        "Texto de acción": rng.choice(_ACCIONES, len(aviso_accion)),
+        "Texto grupo acción": rng.choice(_GRUPOS_ACCION, len(aviso_accion)),
+        "Equipo": equipo_aviso[aviso_accion],
+        "Descripción": descripcion.to_numpy()[aviso_accion],
+    })
+
+    zpm015 = pd.DataFrame({
+        "Equipo": equipos,
+        "TIPO DE SERVICIO": rng.choice(_TIPOS_SERVICIO, n_equipos),
+    })
+
+    hojas = {
+        "IW29": iw29,
+        "IW39": _con_duplicados(iw39, tasa_duplicados, rng),
+        "IH08": _con_duplicados(ih08, tasa_duplicados, rng),
+        "IW65": iw65,
+        "ZPM015": _con_duplicados(zpm015, tasa_duplicados, rng),
+    }
+    if columnas_faltantes:
+        hojas = {hoja: df.drop(columns=columnas_faltantes, errors="ignore") for hoja, df in hojas.items()}
+    return hojas
+
+
+def generar_hoja_unica(filas: int, politica_costo: str = "primera_fila", **opciones) -> pd.DataFrame:
+    """
+    Genera la hoja única que lee el tablero, igual que la publica avisos.py: las hojas
+    SAP sintéticas filtradas y unidas (unir_con_filtros, sin los avisos PTBO) y con el
+    costo de cada aviso repartido entre sus acciones (atribuir_costes).
+
+    Args:
+        filas (int): Filas aproximadas de la unión, antes de los filtros.
+        politica_costo (str): Una de las claves de POLITICAS_COSTO.
+        **opciones: Las mismas opciones de generar_hojas_sap.
+
+    Returns:
+        pd.DataFrame: Avisos unidos con las columnas de COLUMNAS_FINALES.
+    """
+    df, _, _ = unir_con_filtros(generar_hojas_sap(filas, **opciones))
+    return atribuir_costes(df, politica_costo)
+
+
+def escribir_libro_sap(hojas: dict, destino):
+    """
+    Escribe las hojas SAP en un libro Excel, en el orden documentado.
+
+    Args:
+        hojas (dict): Un DataFrame por hoja SAP.
+        destino: Ruta o archivo binario abierto donde escribir.
+
+    Raises:
+        ValueError: Si alguna hoja supera el máximo de filas de Excel.
+    """
+    for hoja, df in hojas.items():
+        if len(df) > FILAS_MAXIMAS_EXCEL:
+            raise ValueError(f"La hoja '{hoja}' tiene {len(df)} filas; Excel admite como máximo {FILAS_MAXIMAS_EXCEL}.")
+
+    escribir_xlsx_hojas({hoja: hojas[hoja] for hoja in HOJAS_SAP}, destino)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera archivos SAP sintéticos para pruebas de rendimiento.")
+    parser.add_argument("--filas", type=int, default=100_000, help="Filas de IW65 (aproximadamente, filas del resultado).")
+    parser.add_argument("--acciones-por-aviso", type=float, default=2.0, help="Promedio de acciones por aviso.")
+    parser.add_argument("--tasa-duplicados", type=float, default=0.0, help="Fracción de filas repetidas en las dimensiones.")
+    parser.add_argument("--sin-columna", action="append", default=[], help="Columna que se omite (se puede repetir).")
+    parser.add_argument("--hoja-unica", action="store_true", help="Generar la hoja única del tablero en vez de las cinco hojas.")
+    parser.add_argument(
+        "--politica-costo", choices=list(POLITICAS_COSTO), default="primera_fila",
+        help="Reparto del costo de cada aviso en la hoja única."
+    )
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador aleatorio.")
+    parser.add_argument("--salida", default="BASE DE DATOS.xlsx", help="Archivo de salida (.xlsx o .parquet para la hoja única).")
+    args = parser.parse_args()
+
+    opciones = dict(
+        acciones_por_aviso=args.acciones_por_aviso,
+        tasa_duplicados=args.tasa_duplicados,
+        columnas_faltantes=args.sin_columna,
+        semilla=args.semilla,
+    )
+    if args.hoja_unica:
+        df = generar_hoja_unica(args.filas, args.politica_costo, **opciones)
+        if args.salida.lower().endswith(".parquet"):
+            escribir_parquet(df, args.salida)
+        else:
+            escribir_xlsx(df, args.salida)
+        print(f"{args.salida}: {len(df)} filas")
+    else:
+        hojas = generar_hojas_sap(args.filas, **opciones)
+        escribir_libro_sap(hojas, args.salida)
+        print(f"{args.salida}: " + ", ".join(f"{hoja} {len(df)} filas" for hoja, df in hojas.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,68 +3,43 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
 import io
 import numpy as np
+
+from avisos_cache import CacheColumnar, CacheResultados, huella_contenido
+from avisos_calificaciones import EVALUADOR_POR_DEFECTO, AlmacenCalificaciones, ruta_calificaciones
+from avisos_cubo import CuboAvisos, indicadores_cubo, serie_mensual, sumar_por, valores_dimension
+from avisos_enriquecimiento import cargar_horarios, enriquecer_avisos
+from avisos_estilos import hoja_de_estilos
+from avisos_exportacion import es_parquet
+from avisos_filtros import IndiceFiltros
+from avisos_graficos import ServicioGraficos
+from avisos_indicadores import calcular_tabla_indicadores
+from avisos_ingesta import leer_encabezados_xlsx
+from avisos_medicion import RUTA_REGISTRO, Medidor, iniciar_perfil, perfilado_solicitado, perfilar_ejecucion
+from avisos_pipeline import compactar_tipos
+from avisos_puntuacion import puntuar_indicadores
+from avisos_ranking import Ranking
+
+# Con AVISOS_PERFILAR=1 o '?perfilar=1' en la URL, cada ejecución se perfila con cProfile
+# desde aquí hasta el final del script (el perfil se guarda al cerrar el bloque de
+# perfilar_ejecucion). Solo quedan fuera los imports, que se cargan una vez por proceso.
+perfil_en_curso = iniciar_perfil(perfilado_solicitado(st.query_params))
+
 # --- Configuración de la página (temática Sura) ---
 st.set_page_config(
-    page_title="2 Gestión Administrativa - Sura",
+    page_title="Gerencia de Gestión Administrativa - Sura",
     layout="wide",
     initial_sidebar_state="expanded",
     # Icono de la página (opcional, puedes cambiar '📈' por el tuyo)
     # Abre este enlace para ver más emojis: https://www.webfx.com/tools/emoji-cheat-sheet/
 )
 
-# Estilos CSS para ambientar en amarillo, blanco y azul rey
-st.markdown(
-    """
-    <style>
-    /* Estilos generales del fondo con degradado */
-    .stApp {
-        background: linear-gradient(to right, #FFFFFF, #FFFACD, #4169E1); /* Blanco, Amarillo claro (Cream), Azul Rey */
-        color: #333333; /* Color de texto general */
-    }
-    /* Sidebar */
-    .st-emotion-cache-1oe6z58 { /* Esta clase puede cambiar en futuras versiones de Streamlit */
-        background-color: #F0F8FF; /* Azul claro para la sidebar */
-    }
-    /* Títulos */
-    h1, h2, h3, h4, h5, h6 {
-        color: #4169E1; /* Azul Rey para los títulos */
-    }
-    /* Botones */
-    .stButton>button {
-        background-color: #4169E1; /* Azul Rey para los botones */
-        color: white;
-        border: none;
-        padding: 0.75rem 1.5rem;
-        border-radius: 0.5rem;
-        transition: background-color 0.3s ease;
-    }
-    .stButton>button:hover {
-        background-color: #F8D568; /* Amarillo para hover */
-        color: #4169E1;
-        border: 1px solid #4169E1;
-    }
-    /* Contenedores de contenido principal */
-    .st-emotion-cache-z5fcl4, .st-emotion-cache-1c7y2kl, .st-emotion-cache-nahz7x { /* Clases genéricas para contenedores */
-        background-color: rgba(255, 255, 255, 0.9); /* Blanco semitransparente */
-        padding: 1.5rem;
-        border-radius: 0.75rem;
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-        margin-bottom: 1rem;
-    }
-    /* Mejoras para la tabla (dataframe) */
-    .streamlit-dataframe {
-        border-radius: 0.5rem;
-        overflow: hidden; /* Asegura que las esquinas redondeadas se apliquen bien */
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+# Cada ejecución del tablero mide sus etapas (tiempo, CPU y memoria; ver avisos_medicion)
+medidor = Medidor("tablero", pagina=st.session_state.get('page', 'upload'))
+
+# Estilos CSS para ambientar en amarillo, blanco y azul rey (ver avisos_estilos)
+st.markdown(hoja_de_estilos(), unsafe_allow_html=True)
 
 # --- Bienvenida y encabezado ---
 st.title("¡Hola, usuario Sura! 👋")
@@ -73,109 +48,136 @@ st.header("Proyecto de **Gestión Administrativa** en Ingeniería Clínica")
 st.markdown("""
     Aquí podrás **analizar y gestionar los datos de avisos** para optimizar los procesos. Creado por Naida López Aprendiz Universitaria.
 """)
-# Set a nice style for plots
-sns.set_style('whitegrid')
+# El estilo de los gráficos (seaborn 'whitegrid') se aplica al dibujar el primero (ver avisos_graficos)
 
-# --- Configuración de la página (temática Sura) ---
-st.set_page_config(
-    page_title="Gerencia de Gestión Administrativa - Sura",
-    layout="wide",
-    initial_sidebar_state="expanded",
-)
 
-# Estilos CSS para ambientar en amarillo, blanco y azul rey
-st.markdown(
+# Columnas esperadas en la hoja única (las que produce la app de unión de avisos)
+COLUMNAS_ESPERADAS = [
+    "Aviso", "Fecha de aviso", "Código postal", "Status del sistema",
+    "Descripción", "Ubicación técnica", "Equipo", "Denominación de objeto técnico",
+    "Denominación ejecutante", "Duración de parada", "Costes tot.reales",
+    "Inic.garantía prov.", "Fin garantía prov.", "Texto_equipo",
+    "Texto código acción", "Texto de acción", "Texto grupo acción", "TIPO DE SERVICIO"
+]
+
+
+def columnas_faltantes(contenido: bytes) -> list:
     """
-    <style>
-    /* Estilos generales del fondo con degradado */
-    .stApp {
-        background: linear-gradient(to right, #FFFFFF, #FFFACD, #4169E1); /* Blanco, Amarillo claro (Cream), Azul Rey */
-        color: #333333; /* Color de texto general */
-    }
-    /* Sidebar */
-    .st-emotion-cache-1oe6z58 { /* Esta clase puede cambiar en futuras versiones de Streamlit */
-        background-color: #F0F8FF; /* Azul claro para la sidebar */
-    }
-    /* Títulos */
-    h1, h2, h3, h4, h5, h6 {
-        color: #4169E1; /* Azul Rey para los títulos */
-    }
-    /* Botones */
-    .stButton>button {
-        background-color: #4169E1; /* Azul Rey para los botones */
-        color: white;
-        border: none;
-        padding: 0.75rem 1.5rem;
-        border-radius: 0.5rem;
-        transition: background-color 0.3s ease;
-    }
-    .stButton>button:hover {
-        background-color: #F8D568; /* Amarillo para hover */
-        color: #4169E1;
-        border: 1px solid #4169E1;
-    }
-    /* Contenedores de contenido principal */
-    .st-emotion-cache-z5fcl4, .st-emotion-cache-1c7y2kl, .st-emotion-cache-nahz7x { /* Clases genéricas para contenedores */
-        background-color: rgba(255, 255, 255, 0.9); /* Blanco semitransparente */
-        padding: 1.5rem;
-        border-radius: 0.75rem;
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-        margin-bottom: 1rem;
-    }
-    /* Mejoras para la tabla (dataframe) */
-    .streamlit-dataframe {
-        border-radius: 0.5rem;
-        overflow: hidden; /* Asegura que las esquinas redondeadas se apliquen bien */
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+    Revisa los encabezados del archivo antes de leer los datos: la primera hoja
+    del Excel o el esquema del Parquet. Tarda milisegundos aunque el archivo sea grande.
+
+    Args:
+        contenido (bytes): Contenido del archivo subido.
+
+    Returns:
+        list: Columnas de COLUMNAS_ESPERADAS que no están en el archivo.
+
+    Raises:
+        ValueError: Si el archivo no es un Excel .xlsx ni un Parquet válido.
+    """
+    if es_parquet(contenido):
+        import pyarrow.parquet as pq
+        try:
+            encabezados = pq.read_schema(io.BytesIO(contenido)).names
+        except Exception as e:
+            raise ValueError("El archivo no es un Parquet válido.") from e
+    else:
+        hojas = leer_encabezados_xlsx(contenido)
+        encabezados = next(iter(hojas.values()), [])
+    presentes = {str(col).strip() for col in encabezados}
+    return [col for col in COLUMNAS_ESPERADAS if col not in presentes]
+
+
+# --- Caché en disco compartida entre sesiones y reinicios del servidor ---
+@st.cache_resource
+def obtener_cache() -> CacheColumnar:
+    return CacheColumnar()
+
+
+# --- Caché en memoria de resultados de consultas, compartida entre sesiones ---
+@st.cache_resource
+def obtener_cache_resultados() -> CacheResultados:
+    return CacheResultados()
+
+
+# --- Gráficos renderizados a PNG una vez por (datos, especificación), compartidos entre sesiones ---
+@st.cache_resource
+def obtener_graficos() -> ServicioGraficos:
+    return ServicioGraficos()
+
+
+def mostrar_grafico(nombre: str, dibujar, datos: tuple, figsize: tuple, **especificacion):
+    """Muestra el gráfico dibujar(fig, *datos, **especificacion) desde la caché de imágenes (ver avisos_graficos)."""
+    st.image(obtener_graficos().png(nombre, dibujar, datos, figsize, **especificacion))
+
+
+def calcular_con_cache(nombre: str, clave: tuple, calcular):
+    """
+    Resultado de calcular() guardado en la caché de resultados bajo la huella de los
+    datos cargados, el nombre del cálculo y la clave (filtros, opción de análisis...).
+    Sin huella (datos que no vienen de la carga) se calcula sin caché.
+    """
+    huella = st.session_state.get('huella_datos')
+    if huella is None:
+        return calcular()
+    return obtener_cache_resultados().obtener((huella, nombre) + tuple(clave), calcular)
+
+
+def _leer_hoja_unica(contenido: bytes, huella: str = None) -> pd.DataFrame:
+    """
+    Lee la primera hoja del Excel, o la recupera de la caché en disco si el
+    mismo archivo ya se había subido antes. El Parquet publicado por la app de
+    unión se lee directamente, con sus tipos de datos.
+    """
+    if es_parquet(contenido):
+        return pd.read_parquet(io.BytesIO(contenido))
+
+    cache = obtener_cache()
+    huella = huella or huella_contenido(contenido)
+    df = cache.leer(huella, "hoja_unica")
+    if df is None:
+        df = pd.read_excel(io.BytesIO(contenido), sheet_name=0)
+        cache.guardar(huella, "hoja_unica", df)
+    return df
 
 
 # --- Función de carga (modificada para no unir) ---
-@st.cache_data
-def load_and_merge_data(uploaded_file_buffer: io.BytesIO) -> pd.DataFrame:
+def load_and_merge_data(uploaded_file_buffer: io.BytesIO, compactar: bool = True) -> pd.DataFrame:
     """
     Carga los datos de un único archivo Excel. Se asume que el archivo
     contiene todas las columnas necesarias en una sola hoja.
 
     Args:
         uploaded_file_buffer (io.BytesIO): Buffer del archivo Excel subido por el usuario.
+        compactar (bool): Si es True, los textos repetidos se guardan como categorías y
+            los identificadores como enteros (ver compactar_tipos).
 
     Returns:
         pd.DataFrame: El DataFrame cargado y limpio.
     """
-    # Cargar la primera (o única) hoja del Excel directamente
+    # Lo derivado del archivo anterior no debe sobrevivir a esta carga aunque falle: las
+    # páginas usarían su cubo e índice, y la caché de resultados respondería con su huella
+    for clave in ('cubo', 'indice_filtros', 'huella_datos', 'memoria_datos'):
+        st.session_state.pop(clave, None)
+
+    # Cargar el Parquet de la app de unión, o la primera (o única) hoja del Excel
     try:
-        df = pd.read_excel(uploaded_file_buffer, sheet_name=0)
+        with medidor.etapa("lectura del archivo"):
+            contenido = uploaded_file_buffer.getvalue()
+            huella = huella_contenido(contenido)
+            df = _leer_hoja_unica(contenido, huella)
     except Exception as e:
-        st.error(f"No se pudo leer el archivo Excel. Asegúrate de que es un archivo .xlsx y contiene datos en la primera hoja: {e}")
+        st.error(f"No se pudo leer el archivo. Asegúrate de que es un archivo .xlsx con datos en la primera hoja o el .parquet generado al unir los avisos: {e}")
         return pd.DataFrame() # Retorna un DataFrame vacío en caso de error
 
     # Limpiar encabezados
     df.columns = df.columns.str.strip()
 
-    # Columnas esperadas según tu descripción
-    # Asegúrate de que estas columnas coincidan exactamente con las de tu Excel
-    columnas_esperadas = [
-        "Aviso", "Fecha de aviso", "Código postal", "Status del sistema",
-        "Descripción", "Ubicación técnica", "Equipo", "Denominación de objeto técnico",
-        "Denominación ejecutante", "Duración de parada", "Costes tot.reales",
-        "Inic.garantía prov.", "Fin garantía prov.", "Texto_equipo",
-        "Texto código acción", "Texto de acción", "Texto grupo acción", "TIPO DE SERVICIO"
-    ]
-
-    # Verificar si todas las columnas esperadas están presentes
-    missing_columns = [col for col in columnas_esperadas if col not in df.columns]
-    if missing_columns:
-        st.warning(f"Advertencia: Faltan las siguientes columnas en el archivo Excel: {', '.join(missing_columns)}. El análisis podría verse afectado.")
-        # Opcional: puedes decidir si quieres detener la ejecución o continuar con las columnas disponibles
-        # Por ahora, continuaremos y las columnas faltantes se manejarán como NaN o errores en pasos posteriores.
-
-    # Seleccionar solo las columnas que el usuario especificó y que existen en el DataFrame
+    # Las columnas faltantes ya se avisaron con columnas_faltantes antes de la carga;
+    # las que falten se manejarán como NaN o errores en pasos posteriores.
+    # Seleccionar solo las columnas esperadas que existen en el DataFrame
     # Esto también manejará si hay columnas adicionales que no se necesitan
-    df = df[[col for col in columnas_esperadas if col in df.columns]].copy()
+    df = df[[col for col in COLUMNAS_ESPERADAS if col in df.columns]].copy()
 
 
     # Normalizar los nombres de las columnas (manteniendo la lógica existente)
@@ -266,88 +268,28 @@ def load_and_merge_data(uploaded_file_buffer: io.BytesIO) -> pd.DataFrame:
     if 'costes_totreales' in df.columns:
         df['costes_totreales'] = pd.to_numeric(df['costes_totreales'], errors='coerce')
 
-    # Lógica de mapeo de HORARIO (se mantiene igual si 'texto_equipo' está presente)
-    horarios_dict = {
-        "HORARIO_99": (17, 364.91), "HORARIO_98": (14.5, 312.78), "HORARIO_97": (9.818181818, 286.715),
-        "HORARIO_96": (14.5, 312.78), "HORARIO_95": (4, 208.52), "HORARIO_93": (13.45454545, 286.715),
-        "HORARIO_92": (6, 338.845), "HORARIO_91": (9.25, 312.78), "HORARIO_90": (11, 260.65),
-        "HORARIO_9": (16, 312.78), "HORARIO_89": (9.5, 260.65), "HORARIO_88": (14, 260.65),
-        "HORARIO_87": (9.333333333, 312.78), "HORARIO_86": (9.666666667, 312.78), "HORARIO_85": (12, 312.78),
-        "HORARIO_84": (9.5, 312.78), "HORARIO_83": (8.416666667, 312.78), "HORARIO_82": (6, 312.78),
-        "HORARIO_81": (10, 312.78), "HORARIO_80": (8.5, 312.78), "HORARIO_8": (11.6, 260.65),
-        "HORARIO_79": (14, 312.78), "HORARIO_78": (12, 312.78), "HORARIO_77": (3, 312.78),
-        "HORARIO_76": (16, 312.78), "HORARIO_75": (12.16666667, 312.78), "HORARIO_74": (11.33333333, 312.78),
-        "HORARIO_73": (12.66666667, 312.78), "HORARIO_72": (11.83333333, 312.78), "HORARIO_71": (11, 312.78),
-        "HORARIO_70": (15.16666667, 312.78), "HORARIO_7": (15.33333333, 312.78), "HORARIO_69": (9.166666667, 312.78),
-        "HORARIO_68": (4, 312.78), "HORARIO_67": (10, 260.65), "HORARIO_66": (4, 260.65),
-        "HORARIO_65": (16.76923077, 338.845), "HORARIO_64": (17.15384615, 338.845), "HORARIO_63": (22.5, 312.78),
-        "HORARIO_62": (12.25, 312.78), "HORARIO_61": (4, 312.78), "HORARIO_60": (13, 312.78),
-        "HORARIO_6": (18.46153846, 338.845), "HORARIO_59": (12.66666667, 312.78), "HORARIO_58": (12.33333333, 312.78),
-        "HORARIO_57": (13.53846154, 338.845), "HORARIO_56": (12.16666667, 312.78), "HORARIO_55": (6.333333333, 312.78),
-        "HORARIO_54": (7.230769231, 338.845), "HORARIO_53": (5.5, 312.78), "HORARIO_52": (4, 312.78),
-        "HORARIO_51": (14, 338.845), "HORARIO_50": (15, 312.78), "HORARIO_5": (17, 312.78),
-        "HORARIO_49": (15.27272727, 286.715), "HORARIO_48": (14.76923077, 338.845), "HORARIO_47": (14.5, 312.78),
-        "HORARIO_46": (14.33333333, 312.78), "HORARIO_45": (14.16666667, 312.78), "HORARIO_44": (13.83333333, 312.78),
-        "HORARIO_43": (13.5, 312.78), "HORARIO_42": (13.91666667, 312.78), "HORARIO_41": (15, 364.91),
-        "HORARIO_40": (15.81818182, 286.715), "HORARIO_4": (16.16666667, 312.78), "HORARIO_39": (15.27272727, 286.715),
-        "HORARIO_38": (13.84615385, 338.845), "HORARIO_37": (15.09090909, 286.715), "HORARIO_36": (14, 364.91),
-        "HORARIO_35": (14.30769231, 338.845), "HORARIO_34": (14.90909091, 286.715), "HORARIO_33": (13.55, 312.78),
-        "HORARIO_32": (14, 338.845), "HORARIO_31": (14.72727273, 286.715), "HORARIO_30": (13.08333333, 312.78),
-        "HORARIO_3": (16, 312.78), "HORARIO_29": (14, 286.715), "HORARIO_28": (13, 364.91),
-        "HORARIO_27": (14, 286.715), "HORARIO_26": (12.58333333, 312.78), "HORARIO_25": (12, 312.78),
-        "HORARIO_24": (13.27272727, 286.715), "HORARIO_23": (11.83333333, 312.78), "HORARIO_22": (11.91666667, 312.78),
-        "HORARIO_21": (13.09090909, 286.715), "HORARIO_20": (5, 312.78), "HORARIO_2": (23.5, 364.91),
-        "HORARIO_19": (12.18181818, 286.715), "HORARIO_18": (5, 312.78), "HORARIO_17": (9.75, 312.78),
-        "HORARIO_16": (10.36363636, 286.715), "HORARIO_15": (10.18181818, 286.715), "HORARIO_14": (8.5, 312.78),
-        "HORARIO_134": (12, 364.91), "HORARIO_133": (12, 260.65), "HORARIO_132": (13, 312.78),
-        "HORARIO_131": (10, 312.78), "HORARIO_130": (11, 260.65), "HORARIO_13": (9.454545455, 286.715),
-        "HORARIO_129": (9.384615385, 338.845), "HORARIO_128": (12.33333333, 312.78), "HORARIO_127": (9.666666667, 312.78),
-        "HORARIO_126": (10.83333333, 312.78), "HORARIO_125": (4, 312.78), "HORARIO_124": (13.66666667, 312.78),
-        "HORARIO_123": (16.61538462, 338.845), "HORARIO_122": (11, 260.65), "HORARIO_121": (11.66666667, 312.78),
-        "HORARIO_120": (8.25, 312.78), "HORARIO_12": (9.272727273, 286.715), "HORARIO_119": (11.23076923, 338.845),
-        "HORARIO_118": (11.27272727, 286.715), "HORARIO_117": (11.41666667, 312.78), "HORARIO_116": (11, 312.78),
-        "HORARIO_115": (9.25, 312.78), "HORARIO_114": (23.07692308, 338.845), "HORARIO_113": (20, 338.845),
-        "HORARIO_112": (10.61538462, 338.845), "HORARIO_111": (9.454545455, 286.715), "HORARIO_110": (6.833333333, 312.78),
-        "HORARIO_11": (8, 312.78), "HORARIO_109": (12.90909091, 286.715), "HORARIO_108": (10.54545455, 286.715),
-        "HORARIO_107": (12.61538462, 338.845), "HORARIO_106": (14.76923077, 338.845), "HORARIO_105": (12, 156.39),
-        "HORARIO_104": (7.666666667, 312.78), "HORARIO_103": (3, 260.65), "HORARIO_102": (10.16666667, 312.78),
-        "HORARIO_101": (12, 260.65), "HORARIO_100": (11.16666667, 312.78), "HORARIO_10": (6, 312.78),
-        "HORARIO_1": (24, 364.91),
-    }
+    # Columnas derivadas: horario de operación (tabla versionada horarios.csv), año, mes
+    # y categoría de la descripción, calculadas una vez por valor distinto
+    with medidor.etapa("enriquecimiento"):
+        df = enriquecer_avisos(df, cargar_horarios())
 
-    if 'texto_equipo' in df.columns:
-        df['HORARIO'] = df['texto_equipo'].str.strip().str.upper()
-        df['HORA/ DIA'] = df['HORARIO'].map(lambda x: horarios_dict.get(x, (None, None))[0])
-        df['DIAS/ AÑO'] = df['HORARIO'].map(lambda x: horarios_dict.get(x, (None, None))[1])
-        df['DIAS/ AÑO'] = pd.to_numeric(df['DIAS/ AÑO'], errors='coerce')
-        df['HORA/ DIA'] = pd.to_numeric(df['HORA/ DIA'], errors='coerce')
-    else:
-        df['HORARIO'] = np.nan
-        df['HORA/ DIA'] = np.nan
-        df['DIAS/ AÑO'] = np.nan
-
-    # Preprocesamiento adicional para requisitos de la segunda parte del código
-    if 'fecha_de_aviso' in df.columns:
-        df["fecha_de_aviso"] = pd.to_datetime(df["fecha_de_aviso"], errors="coerce")
-        df["año"] = df["fecha_de_aviso"].dt.year
-        df["mes"] = df["fecha_de_aviso"].dt.strftime("%B")
+    # Menos memoria y agrupaciones más rápidas en el resto del tablero
+    if compactar:
+        with medidor.etapa("compactación de tipos"):
+            df, resumen_tipos = compactar_tipos(df, columnas_enteras=["AVISO", "EQUIPO", "aviso", "equipo"])
+        st.session_state['memoria_datos'] = resumen_tipos
     else:
-        df["fecha_de_aviso"] = pd.NaT # Not a Time
-        df["año"] = np.nan
-        df["mes"] = np.nan
-
-    def extract_description_category(description):
-        if pd.isna(description):
-            return "Otros"
-        match = re.match(r'^([A-Z]{2})/', str(description).strip())
-        if match:
-            return match.group(1)
-        return "Otros"
-
-    if 'descripcion' in df.columns:
-        df["description_category"] = df['descripcion'].apply(extract_description_category)
-    else:
-        df["description_category"] = "Otros" # O un valor por defecto adecuado
+        st.session_state.pop('memoria_datos', None)
+
+    # Medidas por proveedor × tipo de servicio × categoría × mes: las consultas de las
+    # páginas suman celdas del cubo en lugar de recorrer todas las filas
+    with medidor.etapa("cubo de métricas"):
+        st.session_state['cubo'] = CuboAvisos(df)
+    # Fechas ordenadas y posiciones por proveedor y tipo de servicio para filtrar sin recorrer las filas
+    with medidor.etapa("índice de filtros"):
+        st.session_state['indice_filtros'] = IndiceFiltros(df)
+    # Identifica los datos en la caché de resultados (ver calcular_con_cache)
+    st.session_state['huella_datos'] = huella
 
     return df
 # --- DEFINICIÓN DE PREGUNTAS PARA EVALUACIÓN ---
@@ -379,6 +321,15 @@ preguntas = [
     ("Desempeño técnico", "Rendimiento promedio equipos", "auto"),
 ]
 
+# Indicador (columna de la tabla de indicadores) de cada pregunta automática; los umbrales
+# están en avisos_puntuacion.REGLAS_PUNTUACION
+INDICADOR_PREGUNTA_AUTOMATICA = {
+    "Disponibilidad promedio (%)": 'Disponibilidad (%)',
+    "MTTR promedio (hrs)": 'MTTR (hrs)',
+    "MTBF promedio (hrs)": 'MTBF (hrs)',
+    "Rendimiento promedio equipos": 'Rendimiento',
+}
+
 # --- Definición de las preguntas y rangos DETALLADOS ---
 rangos_detallados = {
     "Calidad": {
@@ -552,58 +503,85 @@ rangos_detallados = {
 }
 
 
-# --- FUNCIONES DE CÁLCULO DE INDICADORES (Modificadas para calcular por Proveedor dentro de un Tipo de Servicio) ---
-def calcular_indicadores(df_filtered_data, group_col='PROVEEDOR'):
+def _indice_plano(serie: pd.Series) -> pd.Series:
+    """
+    Quita el tipo categórico al índice de una serie agrupada. Las gráficas de seaborn
+    ordenan un índice categórico por sus categorías (e incluyen las que no tienen datos)
+    en lugar de respetar el orden de la serie.
+    """
+    if isinstance(serie.index, pd.CategoricalIndex):
+        return serie.set_axis(serie.index.astype(object))
+    return serie
+
+
+# --- FUNCIONES DE CÁLCULO DE INDICADORES (ver avisos_indicadores) ---
+# Indicador que usa cada página -> columna de la tabla de indicadores
+COLUMNAS_METRICAS = {
+    'cnt': 'Avisos', 'cost': 'Costo', 'mttr': 'MTTR (hrs)',
+    'mtbf': 'MTBF (hrs)', 'disp': 'Disponibilidad (%)', 'rend': 'Rendimiento',
+}
+
+def tabla_indicadores(df_filtered_data, group_col, celdas=None):
+    """
+    Tabla de indicadores por group_col: se suma desde las celdas del cubo si las hay
+    (mismo resultado, sin recorrer las filas) y si no se calcula sobre las filas.
+    """
+    if celdas is not None:
+        return indicadores_cubo(celdas, group_col)
+    return calcular_tabla_indicadores(df_filtered_data, group_col)
+
+def calcular_indicadores(df_filtered_data, group_col='PROVEEDOR', celdas=None):
     """
-    Calcula indicadores de servicio (MTTR, MTBF, Disp, Rendimiento) agrupados por una columna.
+    Calcula indicadores de servicio (MTTR, MTBF, Disp, Rendimiento) agrupados por una columna,
+    en una sola agregación (calcular_tabla_indicadores).
     Args:
         df_filtered_data (pd.DataFrame): DataFrame filtrado.
         group_col (str): Columna por la cual agrupar (e.g., 'PROVEEDOR' or 'TIPO DE SERVICIO').
+        celdas (pd.DataFrame): Celdas del cubo con los mismos filtros, si el cubo puede responder.
     Returns:
         tuple: Series de Pandas con los indicadores (count, cost, mttr, mtbf, disp, rend) agrupados.
     """
+    vacias = (pd.Series(dtype=int), pd.Series(dtype=float), pd.Series(dtype=float),
+              pd.Series(dtype=float), pd.Series(dtype=float), pd.Series(dtype=object))
     if df_filtered_data.empty:
         # Return empty Series with appropriate dtypes for robustness
-        return (pd.Series(dtype=int), pd.Series(dtype=float), pd.Series(dtype=float),
-                pd.Series(dtype=float), pd.Series(dtype=float), pd.Series(dtype=object))
+        return vacias
 
-    # Ensure required columns are present
-    required_cols = [group_col, 'TIEMPO PARADA', 'COSTO', 'AVISO', 'HORA/ DIA', 'DIAS/ AÑO']
-    if not all(col in df_filtered_data.columns for col in required_cols):
-        st.error(f"Faltan columnas requeridas para calcular indicadores: {set(required_cols) - set(df_filtered_data.columns)}")
-        return (pd.Series(dtype=int), pd.Series(dtype=float), pd.Series(dtype=float),
-                pd.Series(dtype=float), pd.Series(dtype=float), pd.Series(dtype=object))
-
-    cnt = df_filtered_data.groupby(group_col)['AVISO'].nunique() # Unique avisos count
-    cost = df_filtered_data.groupby(group_col)['COSTO'].sum()
-    mttr = df_filtered_data.groupby(group_col)['TIEMPO PARADA'].mean()
-
-    # Calculate ttot (total operating time for a service type for each group)
-    ttot = df_filtered_data.groupby(group_col).agg(
-        total_horas_anio=('DIAS/ AÑO', 'mean'),
-        horas_dia=('HORA/ DIA', 'mean')
-    )
-    ttot_calculated = (ttot['total_horas_anio'] * ttot['horas_dia']).replace([np.inf, -np.inf], np.nan)
-    ttot_calculated = ttot_calculated.fillna(0) # Assume 0 if no valid time info
-
-    down = df_filtered_data.groupby(group_col)['TIEMPO PARADA'].sum()
-    fails = df_filtered_data.groupby(group_col)['AVISO'].nunique() # Unique avisos as failures
-
-    # Handle division by zero for MTBF and Disponibilidad
-    mtbf = (ttot_calculated - down) / fails.replace(0, np.nan)
-    mtbf = mtbf.fillna(0) # Treat as 0 if no failures or ttot is 0
-
-    disp = (mtbf / (mtbf + mttr)).replace([np.inf, -np.inf], np.nan) * 100
-    disp = disp.fillna(0) # Treat as 0 if cannot be calculated
+    try:
+        tabla = tabla_indicadores(df_filtered_data, group_col, celdas).set_index(group_col)
+    except ValueError as e:
+        st.error(str(e))
+        return vacias
+    return tuple(_indice_plano(tabla[columna]) for columna in COLUMNAS_METRICAS.values())
 
-    rend = disp.apply(lambda v: 'Alto' if v >= 90 else ('Medio' if v >= 75 else 'Bajo') if not pd.isna(v) else 'No Aplica')
-    return cnt, cost, mttr, mtbf, disp, rend
+def puntuaciones_automaticas(indicadores, entidades):
+    """
+    Puntuación de las preguntas automáticas para todas las entidades de una evaluación,
+    en una sola pasada (avisos_puntuacion.puntuar_indicadores).
+    Args:
+        indicadores (pd.DataFrame): Tabla de indicadores indexada por entidad.
+        entidades (list): Proveedores o tipos de servicio evaluados.
+    Returns:
+        pd.DataFrame: Una fila por entidad y una columna por pregunta automática (texto);
+        las entidades sin indicadores tienen 0.
+    """
+    puntuaciones = puntuar_indicadores(indicadores)[list(INDICADOR_PREGUNTA_AUTOMATICA.values())]
+    return puntuaciones.set_axis(list(INDICADOR_PREGUNTA_AUTOMATICA), axis=1).reindex(entidades, fill_value=0)
 
 
 # --- COSTOS Y AVISOS APP ---
 class CostosAvisosApp:
-    def __init__(self, df):
+    # Columnas de análisis que también son dimensiones del cubo de métricas
+    DIMENSIONES_CUBO = {
+        'denominacion_ejecutante': 'PROVEEDOR',
+        'tipo_de_servicio': 'TIPO DE SERVICIO',
+        'description_category': 'description_category',
+    }
+
+    def __init__(self, df, cubo=None, indice=None):
         self.df = df
+        self.cubo = cubo
+        self.indice = indice if indice is not None else IndiceFiltros(df)
         self.EJECUTANTE_COL_NAME_NORMALIZED = 'denominacion_ejecutante'
         self.COL_COSTOS_NORMALIZED = 'costes_totreales'
         self.COL_AVISO_NORMALIZED = 'aviso'
@@ -635,14 +613,16 @@ class CostosAvisosApp:
         # Sidebar filters for Costos y Avisos
         st.sidebar.markdown("---")
         st.sidebar.header("Filtros para Análisis")
-        all_providers = ['Todos'] + sorted(self.df['PROVEEDOR'].dropna().unique().tolist())
+        celdas_cubo = self.cubo.celdas if self.cubo is not None else self.df
+        all_providers = ['Todos'] + valores_dimension(celdas_cubo, 'PROVEEDOR')
         selected_provider_costos = st.sidebar.selectbox("Selecciona Proveedor:", all_providers, key='costos_provider_filter')
 
-        all_service_types = ['Todos'] + sorted(self.df['TIPO DE SERVICIO'].dropna().unique().tolist())
+        all_service_types = ['Todos'] + valores_dimension(celdas_cubo, 'TIPO DE SERVICIO')
         selected_service_type_costos = st.sidebar.selectbox("Selecciona Tipo de Servicio:", all_service_types, key='costos_service_type_filter')
 
-        min_date = self.df[self.COL_FECHA_AVISO_NORMALIZED].min().date() if not self.df[self.COL_FECHA_AVISO_NORMALIZED].empty and pd.notna(self.df[self.COL_FECHA_AVISO_NORMALIZED].min()) else pd.to_datetime('2020-01-01').date()
-        max_date = self.df[self.COL_FECHA_AVISO_NORMALIZED].max().date() if not self.df[self.COL_FECHA_AVISO_NORMALIZED].empty and pd.notna(self.df[self.COL_FECHA_AVISO_NORMALIZED].max()) else pd.to_datetime('2024-12-31').date()
+        primera_fecha, ultima_fecha = self.indice.rango_fechas()
+        min_date = primera_fecha.date() if primera_fecha is not None else pd.to_datetime('2020-01-01').date()
+        max_date = ultima_fecha.date() if ultima_fecha is not None else pd.to_datetime('2024-12-31').date()
         date_range = st.sidebar.date_input(
             "Rango de Fechas:",
             value=(min_date, max_date),
@@ -651,27 +631,31 @@ class CostosAvisosApp:
             key='costos_date_filter'
         )
 
-        filtered_df_costos = self.df.copy()
-        if selected_provider_costos != 'Todos':
-            filtered_df_costos = filtered_df_costos[filtered_df_costos['PROVEEDOR'] == selected_provider_costos]
-        if selected_service_type_costos != 'Todos':
-            filtered_df_costos = filtered_df_costos[filtered_df_costos['TIPO DE SERVICIO'] == selected_service_type_costos]
+        with medidor.etapa("filtros de análisis"):
+            filtros = {
+                'proveedor': None if selected_provider_costos == 'Todos' else selected_provider_costos,
+                'tipo_servicio': None if selected_service_type_costos == 'Todos' else selected_service_type_costos,
+                'desde': None, 'hasta': None,
+            }
+            if len(date_range) == 2:
+                start_date, end_date = date_range
+                filtros['desde'], filtros['hasta'] = start_date, end_date
 
-        if len(date_range) == 2:
-            start_date, end_date = date_range
-            filtered_df_costos = filtered_df_costos[
-                (filtered_df_costos[self.COL_FECHA_AVISO_NORMALIZED].dt.date >= start_date) &
-                (filtered_df_costos[self.COL_FECHA_AVISO_NORMALIZED].dt.date <= end_date)
-            ]
+            # Posiciones de las filas filtradas (índice de filtros, sin copiar el DataFrame)
+            posiciones = self.indice.seleccionar(**filtros)
+            clave_filtros = tuple(filtros.values())
 
-        if filtered_df_costos.empty:
+        if len(posiciones) == 0:
             st.warning("No hay datos para los filtros seleccionados.")
             return
 
         st.markdown("### Resumen General de Costos y Avisos")
 
-        total_costos = filtered_df_costos[self.COL_COSTOS_NORMALIZED].sum()
-        total_avisos = filtered_df_costos[self.COL_AVISO_NORMALIZED].nunique()
+        # Los resultados se guardan por huella de los datos, filtros y análisis: paginar,
+        # cambiar de análisis o volver a unos filtros ya usados no recalcula nada
+        total_costos, total_avisos = calcular_con_cache(
+            "totales", clave_filtros, lambda: self._totales(filtros, posiciones)
+        )
         avg_costo_por_aviso = total_costos / total_avisos if total_avisos > 0 else 0
 
         col1, col2, col3 = st.columns(3)
@@ -696,29 +680,88 @@ class CostosAvisosApp:
 
         if analysis_type == "costos":
             st.markdown(f"#### {selected_analysis_key}")
-            # Get full sorted data for pagination
-            full_data_sorted = filtered_df_costos.groupby(group_col)[value_col].sum().sort_values(ascending=False)
+            # Ranking de los grupos: cada página se pide por separado (ver avisos_ranking)
+            with medidor.etapa("agrupación"):
+                ranking = calcular_con_cache(
+                    "agrupación", clave_filtros + (selected_analysis_key,),
+                    lambda: self._agrupar(filtros, posiciones, group_col, analysis_type)
+                )
             title = f'Top {selected_analysis_key}'
             xlabel = group_col.replace("_", " ").title()
             ylabel = 'Costo Total ($COP)'
-            self._display_paged_table_and_plot(full_data_sorted, title, xlabel, ylabel, "costos")
+            self._display_paged_table_and_plot(ranking, title, xlabel, ylabel, "costos")
         elif analysis_type == "avisos":
             st.markdown(f"#### {selected_analysis_key}")
-            # Get full sorted data for pagination
-            full_data_sorted = filtered_df_costos.groupby(group_col)[self.COL_AVISO_NORMALIZED].nunique().sort_values(ascending=False)
+            # Ranking de los grupos: cada página se pide por separado (ver avisos_ranking)
+            with medidor.etapa("agrupación"):
+                ranking = calcular_con_cache(
+                    "agrupación", clave_filtros + (selected_analysis_key,),
+                    lambda: self._agrupar(filtros, posiciones, group_col, analysis_type)
+                )
             title = f'Top {selected_analysis_key}'
             xlabel = group_col.replace("_", " ").title()
             ylabel = 'Número de Avisos'
-            self._display_paged_table_and_plot(full_data_sorted, title, xlabel, ylabel, "avisos", color_palette='viridis')
+            self._display_paged_table_and_plot(ranking, title, xlabel, ylabel, "avisos", color_palette='viridis')
 
         st.markdown("---")
         st.markdown("### Tendencia Mensual de Costos y Avisos")
-        df_monthly = filtered_df_costos.set_index(self.COL_FECHA_AVISO_NORMALIZED).resample('M').agg(
+        with medidor.etapa("tendencia mensual"):
+            df_monthly = calcular_con_cache(
+                "tendencia mensual", clave_filtros, lambda: self._tendencia_mensual(filtros, posiciones)
+            )
+
+        with medidor.etapa("gráfico mensual"):
+            mostrar_grafico("tendencia mensual", self._dibujar_tendencia_mensual, (df_monthly,), (12, 6))
+
+        st.markdown("### Detalle de Datos Filtrados (Primeras 100 Filas)")
+        columnas_detalle = [self.COL_AVISO_NORMALIZED, self.COL_FECHA_AVISO_NORMALIZED, 'PROVEEDOR', 'TIPO DE SERVICIO', 'descripcion', self.COL_COSTOS_NORMALIZED, 'TIEMPO PARADA']
+        st.dataframe(self.df.iloc[posiciones[:100]][columnas_detalle])
+
+    # --- Cálculos del tablero: desde el cubo de métricas si puede responder, si no desde las filas ---
+    def _celdas(self, filtros):
+        """Celdas del cubo para los filtros, o None si el cubo no puede responder (ver CuboAvisos.seleccionar)."""
+        if self.cubo is None:
+            return None
+        return calcular_con_cache("celdas", tuple(filtros.values()), lambda: self.cubo.seleccionar(**filtros))
+
+    def _totales(self, filtros, posiciones):
+        """(costo total, avisos distintos) de los datos filtrados."""
+        celdas = self._celdas(filtros)
+        if celdas is not None:
+            return celdas['Costo'].sum(), int(celdas['Avisos'].sum())
+        filas = self.df.iloc[posiciones]
+        return filas[self.COL_COSTOS_NORMALIZED].sum(), filas[self.COL_AVISO_NORMALIZED].nunique()
+
+    def _agrupar(self, filtros, posiciones, group_col, analysis_type):
+        """Ranking del costo total o de los avisos distintos por group_col (de mayor a menor)."""
+        celdas = self._celdas(filtros)
+        dimension_cubo = self.DIMENSIONES_CUBO.get(group_col) if celdas is not None else None
+        if analysis_type == "costos":
+            if dimension_cubo is not None:
+                agrupado = sumar_por(celdas, dimension_cubo, ['Costo'])['Costo'].rename_axis(group_col).rename(self.COL_COSTOS_NORMALIZED)
+            else:
+                agrupado = self.df.iloc[posiciones].groupby(group_col, observed=True)[self.COL_COSTOS_NORMALIZED].sum()
+        else:
+            if dimension_cubo is not None:
+                agrupado = sumar_por(celdas, dimension_cubo, ['Avisos'])['Avisos'].rename_axis(group_col).rename(self.COL_AVISO_NORMALIZED)
+            else:
+                agrupado = self.df.iloc[posiciones].groupby(group_col, observed=True)[self.COL_AVISO_NORMALIZED].nunique()
+        return Ranking(_indice_plano(agrupado))
+
+    def _tendencia_mensual(self, filtros, posiciones):
+        """Costo total y avisos distintos por mes (indexados por el último día del mes)."""
+        celdas = self._celdas(filtros)
+        if celdas is not None:
+            return serie_mensual(celdas).rename(columns={'Costo': 'Total_Costos', 'Avisos': 'Num_Avisos'})
+        return self.df.iloc[posiciones].set_index(self.COL_FECHA_AVISO_NORMALIZED).resample('ME').agg(
             Total_Costos=(self.COL_COSTOS_NORMALIZED, 'sum'),
             Num_Avisos=(self.COL_AVISO_NORMALIZED, 'nunique')
         ).fillna(0)
 
-        fig_monthly, ax_monthly1 = plt.subplots(figsize=(12, 6))
+
+    @staticmethod
+    def _dibujar_tendencia_mensual(fig, df_monthly):
+        ax_monthly1 = fig.subplots()
         color = 'tab:red'
         ax_monthly1.set_xlabel('Fecha')
         ax_monthly1.set_ylabel('Total Costos ($COP)', color=color)
@@ -731,28 +774,33 @@ class CostosAvisosApp:
         ax_monthly2.plot(df_monthly.index, df_monthly['Num_Avisos'], color=color, marker='x', linestyle='--')
         ax_monthly2.tick_params(axis='y', labelcolor=color)
 
-        fig_monthly.autofmt_xdate()
-        plt.title('Tendencia Mensual de Costos y Avisos')
-        st.pyplot(fig_monthly)
-
-        st.markdown("### Detalle de Datos Filtrados (Primeras 100 Filas)")
-        st.dataframe(filtered_df_costos[[self.COL_AVISO_NORMALIZED, self.COL_FECHA_AVISO_NORMALIZED, 'PROVEEDOR', 'TIPO DE SERVICIO', 'descripcion', self.COL_COSTOS_NORMALIZED, 'TIEMPO PARADA']].head(100))
+        fig.autofmt_xdate()
+        ax_monthly2.set_title('Tendencia Mensual de Costos y Avisos')
 
+    @staticmethod
+    def _dibujar_barras(fig, data, title, xlabel, ylabel, color_palette):
+        import seaborn as sns # solo se carga al dibujar (ver avisos_graficos)
 
-    def _plot_bar_chart(self, data, title, xlabel, ylabel, color_palette='coolwarm'):
-        fig, ax = plt.subplots(figsize=(10, 6))
+        ax = fig.subplots()
         sns.barplot(x=data.index, y=data.values, ax=ax, palette=color_palette)
         ax.set_title(title)
         ax.set_xlabel(xlabel)
         ax.set_ylabel(ylabel)
         ax.ticklabel_format(style='plain', axis='y')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout() # Added for better label spacing
-        st.pyplot(fig)
+        for etiqueta in ax.get_xticklabels():
+            etiqueta.set_rotation(45)
+            etiqueta.set_horizontalalignment('right')
+        fig.tight_layout() # Added for better label spacing
+
+    def _plot_bar_chart(self, data, title, xlabel, ylabel, color_palette='coolwarm'):
+        mostrar_grafico(
+            "barras", self._dibujar_barras, (data,), (10, 6),
+            title=title, xlabel=xlabel, ylabel=ylabel, color_palette=color_palette
+        )
         
-    def _display_paged_table_and_plot(self, full_data_sorted, title, xlabel, ylabel, analysis_type, color_palette='coolwarm'):
+    def _display_paged_table_and_plot(self, ranking, title, xlabel, ylabel, analysis_type, color_palette='coolwarm'):
         items_per_page = 10
-        total_items = len(full_data_sorted)
+        total_items = len(ranking)
         max_page = max(0, (total_items - 1) // items_per_page)
 
         # Ensure current page is valid
@@ -763,7 +811,10 @@ class CostosAvisosApp:
 
         start_index = st.session_state['analysis_page'] * items_per_page
         end_index = min(start_index + items_per_page, total_items)
-        data_to_display = full_data_sorted.iloc[start_index:end_index]
+        # La primera página es una selección parcial; las siguientes, cortes del orden completo
+        with medidor.etapa("página del ranking"):
+            data_to_display = ranking.pagina(start_index, end_index)
+            otros = ranking.otros(data_to_display)
 
         st.markdown("#### Tabla de Datos")
         # Format costs in the table if it's a costs analysis
@@ -773,6 +824,11 @@ class CostosAvisosApp:
             st.dataframe(formatted_df, use_container_width=True)
         else:
             st.dataframe(data_to_display.to_frame(), use_container_width=True) # Convert series to dataframe for better display
+        formato = (lambda x: f"${x:,.2f} COP") if analysis_type == "costos" else (lambda x: f"{x:,.0f}")
+        st.caption(
+            f"Grupos {start_index + 1 if total_items else 0}–{end_index} de {total_items:,}. "
+            f"Suma de todos los grupos: {formato(ranking.total)}; resto fuera de esta página (Otros): {formato(otros)}."
+        )
 
         col_prev_table, col_next_table = st.columns([1,1])
         with col_prev_table:
@@ -785,16 +841,19 @@ class CostosAvisosApp:
                 st.rerun()
 
         st.markdown("#### Gráfico")
-        self._plot_bar_chart(data_to_display, title, xlabel, ylabel, color_palette)
+        with medidor.etapa("gráfico de barras"):
+            self._plot_bar_chart(data_to_display, title, xlabel, ylabel, color_palette)
 
 
 # --- EVALUATION APP FOR STREAMLIT ---
 class EvaluacionProveedoresApp:
-    def __init__(self, df):
+    def __init__(self, df, cubo=None, indice=None):
         self.df = df
+        self.cubo = cubo
+        self.indice = indice if indice is not None else IndiceFiltros(df)
         # Initialize session state for this class if not already done
-        if 'all_evaluation_widgets_map' not in st.session_state:
-            st.session_state['all_evaluation_widgets_map'] = {}
+        if 'almacenes_calificaciones' not in st.session_state:
+            st.session_state['almacenes_calificaciones'] = {} # Calificaciones por evaluación (ver _almacen)
         if 'evaluation_page_providers' not in st.session_state: # Page for providers
             st.session_state['evaluation_page_providers'] = 0
         if 'current_service_type_metrics' not in st.session_state:
@@ -813,10 +872,33 @@ class EvaluacionProveedoresApp:
             st.session_state['current_provider_service_type_metrics'] = {}
 
 
+    def _celdas(self, **filtros):
+        """Celdas del cubo para los filtros, o None si no hay cubo o no puede responder."""
+        return self.cubo.seleccionar(**filtros) if self.cubo is not None else None
+
+    def _almacen(self, modo, identificador, entidades):
+        """
+        Calificaciones del evaluador para una evaluación (modo, tipo de servicio o
+        proveedor evaluado y sus entidades). Se leen de su archivo SQLite una vez por
+        sesión; cambiar de selector no las borra.
+        """
+        evaluador = st.session_state.get('evaluador', '').strip() or EVALUADOR_POR_DEFECTO
+        clave = (evaluador, modo, identificador, tuple(entidades))
+        almacenes = st.session_state['almacenes_calificaciones']
+        if clave not in almacenes:
+            almacenes[clave] = AlmacenCalificaciones(
+                [(cat, texto) for cat, texto, _ in preguntas], entidades, ruta_calificaciones(evaluador, modo, identificador)
+            )
+        return almacenes[clave]
+
     def display_evaluation_form(self):
         st.title("Evaluación de Proveedores")
 
         st.sidebar.markdown("---")
+        st.sidebar.text_input(
+            "Evaluador:", key='evaluador', placeholder=EVALUADOR_POR_DEFECTO,
+            help="Las calificaciones se guardan como borrador por evaluador y se recuperan al volver a la evaluación."
+        )
         st.sidebar.header("Modo de Evaluación")
         evaluation_mode = st.sidebar.radio(
             "Selecciona cómo quieres evaluar:",
@@ -862,14 +944,13 @@ class EvaluacionProveedoresApp:
         if st.session_state['selected_service_type'] != selected_service_type_eval:
             st.session_state['selected_service_type'] = selected_service_type_eval
             st.session_state['evaluation_page_providers'] = 0
-            st.session_state['all_evaluation_widgets_map'] = {} # Clear map on service type change
             st.rerun()
 
         if st.session_state['selected_service_type'] == "Seleccionar...":
             st.info("Por favor, selecciona un 'Tipo de Servicio' en la barra lateral para comenzar la evaluación.")
             return
 
-        df_filtered_by_service = self.df[self.df['TIPO DE SERVICIO'] == st.session_state['selected_service_type']]
+        df_filtered_by_service = self.df.iloc[self.indice.seleccionar(tipo_servicio=st.session_state['selected_service_type'])]
         
         # Get unique providers for the selected service type
         all_service_providers = sorted(df_filtered_by_service['PROVEEDOR'].dropna().unique().tolist())
@@ -877,11 +958,18 @@ class EvaluacionProveedoresApp:
 
         if not all_service_providers:
             st.info(f"No se encontraron proveedores para el tipo de servicio '{st.session_state['selected_service_type']}'.")
-            st.session_state['all_evaluation_widgets_map'] = {}
             return
 
         # Recalculate metrics for all providers under this service type
-        cnt_p, cost_p, mttr_p, mtbf_p, disp_p, rend_p = calcular_indicadores(df_filtered_by_service, group_col='PROVEEDOR')
+        with medidor.etapa("indicadores por proveedor"):
+            cnt_p, cost_p, mttr_p, mtbf_p, disp_p, rend_p = calcular_con_cache(
+                "indicadores", ('PROVEEDOR', st.session_state['selected_service_type']),
+                lambda: calcular_indicadores(df_filtered_by_service, group_col='PROVEEDOR', celdas=self._celdas(tipo_servicio=st.session_state['selected_service_type']))
+            )
+            puntuaciones = puntuaciones_automaticas(
+                pd.DataFrame({'MTTR (hrs)': mttr_p, 'MTBF (hrs)': mtbf_p, 'Disponibilidad (%)': disp_p, 'Rendimiento': rend_p}),
+                all_service_providers
+            )
         st.session_state['current_service_type_metrics'] = {
             'cnt': cnt_p, 'cost': cost_p, 'mttr': mttr_p,
             'mtbf': mtbf_p, 'disp': disp_p, 'rend': rend_p
@@ -903,7 +991,6 @@ class EvaluacionProveedoresApp:
 
         if not providers_on_page:
             st.info("No hay proveedores para mostrar en esta página para el tipo de servicio seleccionado.")
-            st.session_state['all_evaluation_widgets_map'] = {}
             return
 
         st.markdown("---") # Visual separator
@@ -919,110 +1006,12 @@ class EvaluacionProveedoresApp:
             else:
                 st.write("No hay proveedores en esta página para mapear.")
 
-        # Create columns dynamically for questions and providers
-        col_widths = [0.4] + [(0.6 / len(providers_on_page)) for _ in providers_on_page]
-        cols = st.columns(col_widths)
-
-        # Header row
-        with cols[0]:
-            st.write("**Pregunta**")
-        for i, prov_label in enumerate(providers_on_page):
-            with cols[i+1]:
-                global_idx = all_service_providers.index(prov_label) + 1
-                st.write(f"**Proveedor {global_idx}**")
-                st.markdown(f"<p style='font-size: small; text-align: center;'>({prov_label})</p>", unsafe_allow_html=True) # Smaller label
-                st.write(" ") # Add spacing for alignment with selectboxes below
-
-        # Questions and Selectboxes/Scores
-        for cat, texto, escala in preguntas:
-            with cols[0]:
-                st.markdown(f"**[{cat}]** {texto}")
-
-            for i, prov_original in enumerate(providers_on_page):
-                with cols[i+1]:
-                    # Key format: {evaluation_mode}-{service_type/provider_identifier}-{category}-{question_text}-{provider_name (if by service type)}
-                    # For by_service_type mode, key is {service_type}-{category}-{question_text}-{provider_name}
-                    unique_key = f"{st.session_state['evaluation_mode']}-{st.session_state['selected_service_type']}-{cat}-{texto}-{prov_original}"
-                    if escala == "auto":
-                        val = 0 # Default value if no specific calculation applies
-                        metrics = st.session_state['current_service_type_metrics']
-
-                        # Access provider-specific metrics within the selected service type
-                        disp_prov = metrics.get('disp', pd.Series()).get(prov_original, np.nan)
-                        mttr_prov = metrics.get('mttr', pd.Series()).get(prov_original, np.nan)
-                        mtbf_prov = metrics.get('mtbf', pd.Series()).get(prov_original, np.nan)
-                        rend_prov = metrics.get('rend', pd.Series()).get(prov_original, 'No Aplica')
-
-                        if 'Disponibilidad' in texto and not pd.isna(disp_prov):
-                            val = 2 if disp_prov >= 98 else (1 if disp_prov >= 75 else 0)
-                        elif 'MTTR' in texto and not pd.isna(mttr_prov):
-                            val = 2 if mttr_prov <= 5 else (1 if mttr_prov <= 20 else 0)
-                        elif 'MTBF' in texto and not pd.isna(mtbf_prov):
-                            val = 2 if mtbf_prov > 1000 else (1 if mtbf_prov >= 100 else 0)
-                        elif 'Rendimiento' in texto:
-                            if rend_prov == 'Alto':
-                                val = 2
-                            elif rend_prov == 'Medio':
-                                val = 1
-                            elif rend_prov == 'Bajo':
-                                val = 0
-                        
-                        st.write(f"**{val}**") # Display the numerical score for auto questions
-                        
-                        # Display the detailed description for the auto-calculated score if available
-                        if cat in rangos_detallados and texto in rangos_detallados[cat] and val in rangos_detallados[cat][texto]:
-                             st.markdown(f"<p style='font-size: smaller; color: grey;'>({rangos_detallados[cat][texto][val]})</p>", unsafe_allow_html=True)
-                        else:
-                            st.markdown(f"<p style='font-size: smaller; color: grey;'>(Valor calculado automáticamente)</p>", unsafe_allow_html=True)
-
-
-                        # Store fixed value in session state to persist
-                        st.session_state['all_evaluation_widgets_map'][unique_key] = val
-                    else:
-                        # Get detailed options for manual questions
-                        if cat in rangos_detallados and texto in rangos_detallados[cat]:
-                            # Map numerical scores to their descriptions for the selectbox
-                            options_dict = rangos_detallados[cat][texto]
-                            # Create a list of (value, description) tuples, sorted by value descending for display
-                            sorted_options = sorted(options_dict.items(), key=lambda item: item[0], reverse=True)
-                            
-                            # Create a list of descriptions for the selectbox
-                            display_options = [desc for val, desc in sorted_options]
-                            # Create a mapping from description back to value
-                            desc_to_value_map = {desc: val for val, desc in sorted_options}
-                            
-                            current_value = st.session_state['all_evaluation_widgets_map'].get(unique_key, 0) # Get existing value or default to 0
-                            
-                            # Find the current description based on the current_value
-                            current_description = next((desc for val, desc in sorted_options if val == current_value), display_options[0])
-                            
-                            # Get the index of the current_description for the selectbox
-                            try:
-                                current_index = display_options.index(current_description)
-                            except ValueError:
-                                current_index = 0 # Default to first option if not found
-                            
-                            selected_description = st.selectbox(
-                                label=" ", # Empty label for cleaner UI
-                                options=display_options,
-                                key=unique_key,
-                                index=current_index,
-                            )
-                            # Store the numerical value corresponding to the selected description
-                            st.session_state['all_evaluation_widgets_map'][unique_key] = desc_to_value_map[selected_description]
-                        else:
-                            # Fallback if no detailed ranges are defined (shouldn't happen with current data)
-                            opts = {'Sobresaliente': 2, 'Bueno': 1, 'Indiferente': 0, 'Malo': -1}
-                            current_value = st.session_state['all_evaluation_widgets_map'].get(unique_key, 0)
-                            current_label = next((label for label, val in opts.items() if val == current_value), 'Indiferente')
-                            current_index = list(opts.keys()).index(current_label)
-                            selected_label = st.selectbox(
-                                label=" ",
-                                options=list(opts.keys()),
-                                key=unique_key,
-                                index=current_index,
-                            )
-                            st.session_state['all_evaluation_widgets_map'][unique_key] = opts[selected_label]
+        # Grilla de calificación (fragmento: cambiar una calificación no vuelve a ejecutar el resto de la página)
+        self._grilla_evaluacion(
+            self._almacen('by_service_type', st.session_state['selected_service_type'], all_service_providers),
+            providers_on_page, {prov: all_service_providers.index(prov) + 1 for prov in providers_on_page},
+            'Proveedor', st.session_state['selected_service_type'], puntuaciones.loc[providers_on_page].to_dict('index')
+        )
 
         # Pagination buttons
         col_prev, col_next = st.columns([1,1])
@@ -1037,7 +1026,8 @@ class EvaluacionProveedoresApp:
 
         st.markdown("---") # Visual separator
         if st.button("Generar Resumen de Evaluación y Exportar a Excel", key="generate_summary_service_type"):
-            self.generar_resumen_evaluacion(df_filtered_by_service, st.session_state['selected_service_type'], mode='by_service_type')
+            with medidor.etapa("resumen de evaluación"):
+                self.generar_resumen_evaluacion(df_filtered_by_service, st.session_state['selected_service_type'], mode='by_service_type')
 
         # Plotting if metrics are available for the selected service type
         metrics = st.session_state.get('current_service_type_metrics', {})
@@ -1045,7 +1035,8 @@ class EvaluacionProveedoresApp:
             st.markdown("#### Distribución de Rendimiento por Proveedor")
             rend_data_for_plot = metrics.get('rend', pd.Series()).dropna()
             if not rend_data_for_plot.empty:
-                self.graficar_rendimiento(rend_data_for_plot)
+                with medidor.etapa("gráfico de rendimiento"):
+                    self.graficar_rendimiento(rend_data_for_plot)
             else:
                 st.info("No hay datos de rendimiento de proveedores para graficar para este tipo de servicio.")
 
@@ -1056,7 +1047,8 @@ class EvaluacionProveedoresApp:
 
             plots_exist = not mttr_data_for_plot.empty or not mtbf_data_for_plot.empty or not disp_data_for_plot.empty
             if plots_exist:
-                self.graficar_resumen_proveedor(mttr_data_for_plot, mtbf_data_for_plot, disp_data_for_plot)
+                with medidor.etapa("gráfico de métricas"):
+                    self.graficar_resumen_proveedor(mttr_data_for_plot, mtbf_data_for_plot, disp_data_for_plot)
             else:
                 st.info("No hay datos de MTTR, MTBF o Disponibilidad válidos para graficar de los proveedores para este tipo de servicio.")
         else:
@@ -1084,7 +1076,6 @@ class EvaluacionProveedoresApp:
         if st.session_state['selected_provider_eval'] != selected_provider_eval:
             st.session_state['selected_provider_eval'] = selected_provider_eval
             st.session_state['evaluation_page_service_types_for_provider'] = 0 # Reset page for new provider
-            st.session_state['all_evaluation_widgets_map'] = {} # Clear map on provider change
             st.rerun() # Rerun to apply the new provider selection
 
         if st.session_state['selected_provider_eval'] == "Seleccionar...":
@@ -1092,11 +1083,10 @@ class EvaluacionProveedoresApp:
             return
 
         # Filter DataFrame for the selected provider across all service types
-        df_filtered_by_provider = self.df[self.df['PROVEEDOR'] == st.session_state['selected_provider_eval']]
+        df_filtered_by_provider = self.df.iloc[self.indice.seleccionar(proveedor=st.session_state['selected_provider_eval'])]
         
         if df_filtered_by_provider.empty:
             st.info(f"No hay datos para el proveedor '{st.session_state['selected_provider_eval']}'.")
-            st.session_state['all_evaluation_widgets_map'] = {}
             return
 
         # Get unique service types for the selected provider
@@ -1105,25 +1095,18 @@ class EvaluacionProveedoresApp:
             st.info(f"El proveedor '{st.session_state['selected_provider_eval']}' no tiene tipos de servicio asociados en los datos.")
             return
 
-        # Recalculate metrics for all service types for this provider
+        # Recalculate metrics for all service types for this provider in a single aggregation
         # This will give us MTTR, MTBF, Disp per service type for the selected provider
-        provider_service_type_metrics = {}
-        for service_type in all_service_types_for_provider:
-            df_sub = df_filtered_by_provider[df_filtered_by_provider['TIPO DE SERVICIO'] == service_type]
-            # Use a dummy group_col if only one row for service_type is expected in results
-            # Otherwise, calculate_indicadores will return a Series, and we need to extract the value for 'service_type'
-            cnt, cost, mttr, mtbf, disp, rend = calcular_indicadores(df_sub, group_col='TIPO DE SERVICIO')
-            
-            # Extract scalar values from the Series returned by calcular_indicadores for the specific service_type
-            # .get(service_type, default_value) is safe for Series
-            provider_service_type_metrics[service_type] = {
-                'cnt': cnt.get(service_type, 0),
-                'cost': cost.get(service_type, 0.0),
-                'mttr': mttr.get(service_type, np.nan),
-                'mtbf': mtbf.get(service_type, np.nan),
-                'disp': disp.get(service_type, np.nan),
-                'rend': rend.get(service_type, 'No Aplica')
-            }
+        with medidor.etapa("indicadores por tipo de servicio"):
+            tabla_tipos = calcular_con_cache(
+                "indicadores", ('TIPO DE SERVICIO', st.session_state['selected_provider_eval']),
+                lambda: tabla_indicadores(df_filtered_by_provider, 'TIPO DE SERVICIO', self._celdas(proveedor=st.session_state['selected_provider_eval']))
+            )
+            puntuaciones = puntuaciones_automaticas(tabla_tipos.set_index('TIPO DE SERVICIO'), all_service_types_for_provider)
+        provider_service_type_metrics = {
+            fila['TIPO DE SERVICIO']: {clave: fila[columna] for clave, columna in COLUMNAS_METRICAS.items()}
+            for fila in tabla_tipos.to_dict('records')
+        }
         st.session_state['current_provider_service_type_metrics'] = provider_service_type_metrics
 
 
@@ -1157,93 +1140,15 @@ class EvaluacionProveedoresApp:
             else:
                 st.write("No hay tipos de servicio en esta página para mapear.")
 
-        # Create columns dynamically for questions and service types
-        col_widths_sts = [0.4] + [(0.6 / len(service_types_on_page)) for _ in service_types_on_page]
-        cols_sts = st.columns(col_widths_sts)
-
-        # Header row
-        with cols_sts[0]:
-            st.write("**Pregunta**")
-        for i, service_type_label in enumerate(service_types_on_page):
-            with cols_sts[i+1]:
-                global_idx = all_service_types_for_provider.index(service_type_label) + 1
-                st.write(f"**Tipo de Servicio {global_idx}**")
-                st.markdown(f"<p style='font-size: small; text-align: center;'>({service_type_label})</p>", unsafe_allow_html=True)
-                st.write(" ")
-
-        # Questions and Selectboxes/Scores
-        for cat, texto, escala in preguntas:
-            with cols_sts[0]:
-                st.markdown(f"**[{cat}]** {texto}")
-
-            for i, service_type_original in enumerate(service_types_on_page):
-                with cols_sts[i+1]:
-                    # Key format: {mode}-{selected_provider_eval}-{category}-{question_text}-{service_type_original}
-                    unique_key = f"{st.session_state['evaluation_mode']}-{st.session_state['selected_provider_eval']}-{cat}-{texto}-{service_type_original}"
-                    
-                    if escala == "auto":
-                        val = 0 # Default
-                        # Get metrics specific to this service_type for the selected provider
-                        metrics = st.session_state['current_provider_service_type_metrics'].get(service_type_original, {})
-                        disp_sts = metrics.get('disp', np.nan)
-                        mttr_sts = metrics.get('mttr', np.nan)
-                        mtbf_sts = metrics.get('mtbf', np.nan)
-                        rend_sts = metrics.get('rend', 'No Aplica')
-
-                        if 'Disponibilidad' in texto and not pd.isna(disp_sts):
-                            val = 2 if disp_sts >= 98 else (1 if disp_sts >= 75 else 0)
-                        elif 'MTTR' in texto and not pd.isna(mttr_sts):
-                            val = 2 if mttr_sts <= 5 else (1 if mttr_sts <= 20 else 0)
-                        elif 'MTBF' in texto and not pd.isna(mtbf_sts):
-                            val = 2 if mtbf_sts > 1000 else (1 if mtbf_sts >= 100 else 0)
-                        elif 'Rendimiento' in texto:
-                            if rend_sts == 'Alto': val = 2
-                            elif rend_sts == 'Medio': val = 1
-                            elif rend_sts == 'Bajo': val = 0
-                        
-                        st.write(f"**{val}**")
-                        if cat in rangos_detallados and texto in rangos_detallados[cat] and val in rangos_detallados[cat][texto]:
-                            st.markdown(f"<p style='font-size: smaller; color: grey;'>({rangos_detallados[cat][texto][val]})</p>", unsafe_allow_html=True)
-                        else:
-                            st.markdown(f"<p style='font-size: smaller; color: grey;'>(Valor calculado automáticamente)</p>", unsafe_allow_html=True)
-                        st.session_state['all_evaluation_widgets_map'][unique_key] = val
-
-                    else: # Manual questions
-                        if cat in rangos_detallados and texto in rangos_detallados[cat]:
-                            options_dict = rangos_detallados[cat][texto]
-                            sorted_options = sorted(options_dict.items(), key=lambda item: item[0], reverse=True)
-                            display_options = [desc for val, desc in sorted_options]
-                            desc_to_value_map = {desc: val for val, desc in sorted_options}
-                            
-                            current_value = st.session_state['all_evaluation_widgets_map'].get(unique_key, 0)
-                            current_description = next((desc for val, desc in sorted_options if val == current_value), display_options[0])
-                            
-                            try:
-                                current_index = display_options.index(current_description)
-                            except ValueError:
-                                current_index = 0
-                            
-                            selected_description = st.selectbox(
-                                label=" ",
-                                options=display_options,
-                                key=unique_key,
-                                index=current_index,
-                            )
-                            st.session_state['all_evaluation_widgets_map'][unique_key] = desc_to_value_map[selected_description]
-                        else: # Fallback
-                            opts = {'Sobresaliente': 2, 'Bueno': 1, 'Indiferente': 0, 'Malo': -1}
-                            current_value = st.session_state['all_evaluation_widgets_map'].get(unique_key, 0)
-                            current_label = next((label for label, val in opts.items() if val == current_value), 'Indiferente')
-                            current_index = list(opts.keys()).index(current_label)
-                            selected_label = st.selectbox(
-                                label=" ",
-                                options=list(opts.keys()),
-                                key=unique_key,
-                                index=current_index,
-                            )
-                            st.session_state['all_evaluation_widgets_map'][unique_label] = opts[selected_label] # Changed to unique_key to match pattern
-                            st.session_state['all_evaluation_widgets_map'][unique_key] = opts[selected_label]
-        
+        # Grilla de calificación (fragmento: cambiar una calificación no vuelve a ejecutar el resto de la página)
+        self._grilla_evaluacion(
+            self._almacen('by_provider', st.session_state['selected_provider_eval'], all_service_types_for_provider),
+            service_types_on_page,
+            {tipo: all_service_types_for_provider.index(tipo) + 1 for tipo in service_types_on_page},
+            'Tipo de Servicio', st.session_state['selected_provider_eval'],
+            puntuaciones.loc[service_types_on_page].to_dict('index')
+        )
+
         # Pagination for service types within provider evaluation
         col_prev_sts, col_next_sts = st.columns([1,1])
         with col_prev_sts:
@@ -1260,7 +1165,8 @@ class EvaluacionProveedoresApp:
         if st.button("Generar Resumen de Evaluación y Exportar a Excel", key="generate_summary_by_provider"):
             # When generating summary for 'by_provider' mode, we consider the overall performance of the selected provider
             # This means summing scores across all their evaluated service types
-            self.generar_resumen_evaluacion(df_filtered_by_provider, st.session_state['selected_provider_eval'], mode='by_provider')
+            with medidor.etapa("resumen de evaluación"):
+                self.generar_resumen_evaluacion(df_filtered_by_provider, st.session_state['selected_provider_eval'], mode='by_provider')
 
         # Plotting of provider metrics per service type
         metrics = st.session_state.get('current_provider_service_type_metrics', {})
@@ -1268,7 +1174,8 @@ class EvaluacionProveedoresApp:
             st.markdown(f"#### Distribución de Rendimiento del Proveedor '{st.session_state['selected_provider_eval']}' por Tipo de Servicio")
             rend_data_for_plot_sts = pd.Series({k: v['rend'] for k, v in metrics.items() if not pd.isna(v.get('rend'))}).dropna()
             if not rend_data_for_plot_sts.empty:
-                self.graficar_rendimiento(rend_data_for_plot_sts)
+                with medidor.etapa("gráfico de rendimiento"):
+                    self.graficar_rendimiento(rend_data_for_plot_sts)
             else:
                 st.info("No hay datos de rendimiento por tipo de servicio para este proveedor.")
 
@@ -1279,21 +1186,139 @@ class EvaluacionProveedoresApp:
 
             plots_exist_sts = not mttr_data_for_plot_sts.empty or not mtbf_data_for_plot_sts.empty or not disp_data_for_plot_sts.empty
             if plots_exist_sts:
-                self.graficar_resumen_proveedor(mttr_data_for_plot_sts, mtbf_data_for_plot_sts, disp_data_for_plot_sts, axis_label='Tipo de Servicio')
+                with medidor.etapa("gráfico de métricas"):
+                    self.graficar_resumen_proveedor(mttr_data_for_plot_sts, mtbf_data_for_plot_sts, disp_data_for_plot_sts, axis_label='Tipo de Servicio')
             else:
                 st.info("No hay datos de MTTR, MTBF o Disponibilidad válidos para graficar de los tipos de servicio para este proveedor.")
         else:
             st.info("No hay métricas de desempeño disponibles por tipo de servicio para este proveedor.")
 
 
+    @st.fragment
+    def _grilla_evaluacion(self, almacen, entidades, numeros, etiqueta, identificador, puntuaciones):
+        """
+        Grilla de calificación: una fila por pregunta y una columna por entidad de la
+        página, con la puntuación total de cada columna al final.
+
+        Es un fragmento de Streamlit: cambiar una calificación vuelve a ejecutar solo la
+        grilla y sus totales, sin filtrar los datos, recalcular los indicadores ni
+        redibujar los gráficos. Los botones de página y los selectores de la barra
+        lateral están fuera de la grilla y vuelven a ejecutar toda la página.
+
+        Las calificaciones se guardan en el almacén de la evaluación (y en su archivo)
+        al terminar cada ejecución de la grilla. Cada ejecución de la grilla se mide con
+        su propio Medidor y, si se pidió la medición, se muestra dentro del fragmento (un
+        fragmento no puede escribir en la barra lateral).
+
+        Args:
+            almacen (AlmacenCalificaciones): Calificaciones de la evaluación.
+            entidades (list): Proveedores o tipos de servicio de la página.
+            numeros (dict): Número de cada entidad en la lista completa (para los encabezados).
+            etiqueta (str): 'Proveedor' o 'Tipo de Servicio'.
+            identificador (str): Tipo de servicio o proveedor evaluado (parte de la clave de cada calificación).
+            puntuaciones (dict): Puntuación de cada pregunta automática (por texto) de cada entidad.
+        """
+        # Cuando solo se vuelve a ejecutar el fragmento el script no se ejecuta y 'medidor' sigue
+        # siendo el de la última ejecución completa: la grilla se mide como una ejecución propia
+        medidor_grilla = Medidor(
+            "tablero", medidor.ruta_registro, pagina=st.session_state['page'],
+            fragmento="grilla de evaluación", ejecucion_pagina=medidor.ejecucion
+        )
+        with medidor_grilla.etapa("grilla de evaluación"):
+            # Key format: {evaluation_mode}-{service_type/provider_identifier}-{category}-{question_text}-{provider/service_type}
+            prefijo = f"{st.session_state['evaluation_mode']}-{identificador}"
+            cols = st.columns([0.4] + [(0.6 / len(entidades)) for _ in entidades])
+
+            # Header row
+            with cols[0]:
+                st.write("**Pregunta**")
+            for i, entidad in enumerate(entidades):
+                with cols[i+1]:
+                    st.write(f"**{etiqueta} {numeros[entidad]}**")
+                    st.markdown(f"<p style='font-size: small; text-align: center;'>({entidad})</p>", unsafe_allow_html=True) # Smaller label
+                    st.write(" ") # Add spacing for alignment with selectboxes below
+
+            # Questions and Selectboxes/Scores
+            for cat, texto, escala in preguntas:
+                with cols[0]:
+                    st.markdown(f"**[{cat}]** {texto}")
+
+                for i, entidad in enumerate(entidades):
+                    with cols[i+1]:
+                        unique_key = f"{prefijo}-{cat}-{texto}-{entidad}"
+                        if escala == "auto":
+                            val = self._celda_automatica(cat, texto, puntuaciones[entidad][texto])
+                        else:
+                            val = self._celda_manual(cat, texto, unique_key, almacen.valor((cat, texto), entidad, 0))
+                        almacen.asignar((cat, texto), entidad, val)
+            almacen.guardar()
+
+            # Puntuación acumulada de cada entidad con las calificaciones actuales
+            totales = almacen.totales()
+            with cols[0]:
+                st.markdown("**Puntuación total**")
+            for i, entidad in enumerate(entidades):
+                with cols[i+1]:
+                    st.markdown(f"**{totales[entidad]}**")
+
+        if st.session_state.get('mostrar_medicion'):
+            with st.expander("Medición de la grilla de evaluación"):
+                st.dataframe(medidor_grilla.tabla(), hide_index=True)
+                st.caption(f"Ejecución de la grilla: {medidor_grilla.segundos_transcurridos():,.2f} s.")
+
+    @staticmethod
+    def _celda_automatica(cat, texto, val):
+        """Muestra la puntuación calculada de una pregunta automática (ver puntuaciones_automaticas) y la devuelve."""
+        val = int(val)
+        st.write(f"**{val}**") # Display the numerical score for auto questions
+
+        # Display the detailed description for the auto-calculated score if available
+        if cat in rangos_detallados and texto in rangos_detallados[cat] and val in rangos_detallados[cat][texto]:
+            st.markdown(f"<p style='font-size: smaller; color: grey;'>({rangos_detallados[cat][texto][val]})</p>", unsafe_allow_html=True)
+        else:
+            st.markdown(f"<p style='font-size: smaller; color: grey;'>(Valor calculado automáticamente)</p>", unsafe_allow_html=True)
+        return val
+
+    @staticmethod
+    def _celda_manual(cat, texto, unique_key, current_value):
+        """Selector de la calificación de una pregunta manual (con la guardada o 0 al inicio); devuelve la puntuación elegida."""
+        if cat in rangos_detallados and texto in rangos_detallados[cat]:
+            # Create a list of (value, description) tuples, sorted by value descending for display
+            sorted_options = sorted(rangos_detallados[cat][texto].items(), key=lambda item: item[0], reverse=True)
+            display_options = [desc for val, desc in sorted_options]
+            desc_to_value_map = {desc: val for val, desc in sorted_options}
+
+            # Find the current description based on the current_value
+            current_description = next((desc for val, desc in sorted_options if val == current_value), display_options[0])
+            selected_description = st.selectbox(
+                label=" ", # Empty label for cleaner UI
+                options=display_options,
+                key=unique_key,
+                index=display_options.index(current_description),
+            )
+            return desc_to_value_map[selected_description]
+
+        # Fallback if no detailed ranges are defined (shouldn't happen with current data)
+        opts = {'Sobresaliente': 2, 'Bueno': 1, 'Indiferente': 0, 'Malo': -1}
+        current_label = next((label for label, val in opts.items() if val == current_value), 'Indiferente')
+        selected_label = st.selectbox(
+            label=" ",
+            options=list(opts.keys()),
+            key=unique_key,
+            index=list(opts.keys()).index(current_label),
+        )
+        return opts[selected_label]
+
     def generar_resumen_evaluacion(self, df_filtered, identifier, mode):
         st.subheader("Generando resumen de evaluación...")
 
-        if not st.session_state.get('all_evaluation_widgets_map'):
+        columna_entidades = 'PROVEEDOR' if mode == 'by_service_type' else 'TIPO DE SERVICIO'
+        entidades = sorted(df_filtered[columna_entidades].dropna().unique().tolist())
+        almacen = self._almacen(mode, identifier, entidades)
+        if not almacen.hay_calificaciones():
             st.warning("No hay evaluaciones para resumir. Selecciona un modo de evaluación y completa las evaluaciones.")
             return
 
-        summary_data = []
         quantitative_metrics_data = {
             'Identificador de Evaluación': identifier,
             'Tipo de Elemento Evaluado': [],
@@ -1306,24 +1331,13 @@ class EvaluacionProveedoresApp:
             'Rendimiento': []
         }
 
+        # Calificaciones por pregunta (NaN sin calificar) y la puntuación total de cada entidad
+        summary_df_calificacion = almacen.tabla()
+        summary_df_calificacion.loc[('Total General', 'Puntuación Total')] = almacen.totales()
+
         if mode == 'by_service_type':
             # This mode evaluates PROVEEDORES within a selected TIPO DE SERVICIO
             st_identifier = identifier # This is the service type selected
-            all_providers_for_st = sorted(df_filtered['PROVEEDOR'].dropna().unique().tolist())
-            
-            # Prepare summary_df_calificacion
-            for cat, texto, escala in preguntas:
-                row = {'Categoría': cat, 'Pregunta': texto}
-                for prov in all_providers_for_st:
-                    # Key format: {evaluation_mode}-{service_type/provider_identifier}-{category}-{question_text}-{provider_name (if by service type)}
-                    unique_key = f"{mode}-{st_identifier}-{cat}-{texto}-{prov}"
-                    score = st.session_state['all_evaluation_widgets_map'].get(unique_key, np.nan)
-                    row[prov] = score
-                summary_data.append(row)
-            summary_df_calificacion = pd.DataFrame(summary_data)
-            summary_df_calificacion.set_index(['Categoría', 'Pregunta'], inplace=True)
-            total_scores_by_provider = summary_df_calificacion.sum(numeric_only=True)
-            summary_df_calificacion.loc[('Total General', 'Puntuación Total')] = total_scores_by_provider.astype(int) # Ensure int
 
             # Quantitative Metrics
             metrics = st.session_state.get('current_service_type_metrics', {})
@@ -1334,7 +1348,7 @@ class EvaluacionProveedoresApp:
             disp_p = metrics.get('disp', pd.Series())
             rend_p = metrics.get('rend', pd.Series())
 
-            for prov in all_providers_for_st:
+            for prov in entidades:
                 quantitative_metrics_data['Tipo de Elemento Evaluado'].append('Proveedor')
                 quantitative_metrics_data['Elemento Evaluado (Nombre)'].append(prov)
                 quantitative_metrics_data['Número de Avisos'].append(cnt_p.get(prov, 0))
@@ -1351,26 +1365,10 @@ class EvaluacionProveedoresApp:
         elif mode == 'by_provider':
             # This mode evaluates TIPO DE SERVICIO for a selected PROVEEDOR
             prov_identifier = identifier # This is the provider selected
-            all_service_types_for_prov = sorted(df_filtered['TIPO DE SERVICIO'].dropna().unique().tolist())
-
-            # Prepare summary_df_calificacion
-            for cat, texto, escala in preguntas:
-                row = {'Categoría': cat, 'Pregunta': texto}
-                for service_type in all_service_types_for_prov:
-                    # Key format: {mode}-{selected_provider_eval}-{category}-{question_text}-{service_type_original}
-                    unique_key = f"{mode}-{prov_identifier}-{cat}-{texto}-{service_type}"
-                    score = st.session_state['all_evaluation_widgets_map'].get(unique_key, np.nan)
-                    row[service_type] = score
-                summary_data.append(row)
-            summary_df_calificacion = pd.DataFrame(summary_data)
-            summary_df_calificacion.set_index(['Categoría', 'Pregunta'], inplace=True)
-            total_scores_by_service_type = summary_df_calificacion.sum(numeric_only=True)
-            summary_df_calificacion.loc[('Total General', 'Puntuación Total')] = total_scores_by_service_type.astype(int) # Ensure int
-
 
             # Quantitative Metrics
             metrics_per_service_type = st.session_state.get('current_provider_service_type_metrics', {})
-            for service_type in all_service_types_for_prov:
+            for service_type in entidades:
                 sts_metrics = metrics_per_service_type.get(service_type, {})
                 quantitative_metrics_data['Tipo de Elemento Evaluado'].append('Tipo de Servicio')
                 quantitative_metrics_data['Elemento Evaluado (Nombre)'].append(service_type)
@@ -1412,7 +1410,7 @@ class EvaluacionProveedoresApp:
                 for idx, col in enumerate(summary_df_calificacion.columns):
                     max_len = max(
                         len(str(col)),
-                        (summary_df_calificacion[col].astype(str).map(len).max() if not summary_df_calificacion[col].empty else 0)
+                        (summary_df_calificacion[col].map(lambda valor: len(str(valor))).max() if not summary_df_calificacion[col].empty else 0)
                     ) + 2
                     worksheet.set_column(idx, idx, max_len)
                 # For MultiIndex, adjust first few columns manually if needed
@@ -1437,8 +1435,11 @@ class EvaluacionProveedoresApp:
         # Count occurrences of each category
         # Ensure consistent order even if a category has 0 occurrences
         rendimiento_counts = rendimiento_series.value_counts().reindex(['Alto', 'Medio', 'Bajo', 'No Aplica'], fill_value=0)
+        mostrar_grafico("rendimiento", self._dibujar_rendimiento, (rendimiento_counts,), (10, 6))
 
-        fig, ax = plt.subplots(figsize=(10, 6))
+    @staticmethod
+    def _dibujar_rendimiento(fig, rendimiento_counts):
+        ax = fig.subplots()
         # Ensure colors match the meaning: Green for Alto, Amber for Medio, Red for Bajo, Grey for No Aplica
         colors = ['#4CAF50', '#FFC107', '#FF5722', '#9E9E9E']
         
@@ -1456,8 +1457,7 @@ class EvaluacionProveedoresApp:
             yval = bar.get_height()
             ax.text(bar.get_x() + bar.get_width()/2, yval + 0.5, round(yval, 0), ha='center', va='bottom', fontsize=9) # Add 0.5 for slight offset
 
-        plt.tight_layout()
-        st.pyplot(fig)
+        fig.tight_layout()
 
 
     def graficar_resumen_proveedor(self, mttr_series, mtbf_series, disp_series, axis_label='Proveedor'):
@@ -1482,7 +1482,10 @@ class EvaluacionProveedoresApp:
             
             # Recreate all_service_types_for_provider based on the selected provider.
             # This is less efficient but ensures correctness if session state is complex.
-            if 'df' in st.session_state and st.session_state['df'] is not None:
+            if self.cubo is not None:
+                celdas_proveedor = self.cubo.celdas[self.cubo.celdas['PROVEEDOR'] == st.session_state['selected_provider_eval']]
+                plot_df = plot_df.reindex(valores_dimension(celdas_proveedor, 'TIPO DE SERVICIO'))
+            elif 'df' in st.session_state and st.session_state['df'] is not None:
                 current_df_for_provider = st.session_state['df'][
                     st.session_state['df']['PROVEEDOR'] == st.session_state['selected_provider_eval']
                 ]
@@ -1501,7 +1504,13 @@ class EvaluacionProveedoresApp:
         # Adjust figsize based on number of items to avoid squashing labels
         num_items = len(plot_df)
         fig_height = max(10, num_items * 0.8) # Min height 10, grows with number of items
-        fig, axes = plt.subplots(3, 1, figsize=(12, fig_height), sharex=True)
+        mostrar_grafico("métricas", self._dibujar_metricas, (plot_df,), (12, fig_height), axis_label=axis_label)
+
+    @staticmethod
+    def _dibujar_metricas(fig, plot_df, axis_label):
+        import seaborn as sns # solo se carga al dibujar (ver avisos_graficos)
+
+        axes = fig.subplots(3, 1, sharex=True)
         fig.suptitle(f'Métricas Clave de Desempeño por {axis_label}', fontsize=16)
 
         # MTTR Plot
@@ -1525,8 +1534,7 @@ class EvaluacionProveedoresApp:
         # Set x-axis label only for the bottom plot
         axes[2].set_xlabel(axis_label)
 
-        plt.tight_layout(rect=[0, 0.03, 1, 0.96]) # Adjust layout to prevent title overlap
-        st.pyplot(fig)
+        fig.tight_layout(rect=[0, 0.03, 1, 0.96]) # Adjust layout to prevent title overlap
 
 # --- Main Application Logic (using Streamlit's new structure) ---
 
@@ -1538,52 +1546,152 @@ def navigate_to(page):
     st.session_state['page'] = page
     st.rerun()
 
-# Sidebar for navigation
-with st.sidebar:
-    st.image("https://www.sura.com/blogs/wp-content/uploads/2018/02/LogoSURA.png", width=200) # Replace with actual Sura logo if available
-    st.title("Menú Principal")
-    if st.button("Cargar Datos", key="nav_upload"):
-        navigate_to('upload')
-    if 'df' in st.session_state and st.session_state['df'] is not None:
-        if st.button("Análisis de Costos y Avisos", key="nav_costos"):
-            navigate_to('costos_avisos')
-        if st.button("Evaluación de Proveedores", key="nav_evaluacion"):
-            navigate_to('evaluacion')
-    else:
-        st.warning("Carga datos para habilitar otras secciones.")
+# Filtros de cada página cuyos valores etiquetan los perfiles, para reproducir la sesión perfilada
+CLAVES_FILTROS = {
+    'upload': [],
+    'costos_avisos': [
+        'costos_provider_filter', 'costos_service_type_filter', 'costos_date_filter',
+        'analysis_type_selector', 'analysis_page',
+    ],
+    'evaluacion': [
+        'evaluation_mode_selector', 'selected_service_type', 'selected_provider_eval', 'evaluation_page_providers',
+    ],
+}
+
+def filtros_activos(page: str) -> dict:
+    """Valores actuales de los filtros de la página, para etiquetar los perfiles."""
+    return {clave: st.session_state[clave] for clave in CLAVES_FILTROS.get(page, []) if clave in st.session_state}
+
+def mostrar_medicion_etapas():
+    """Panel de la barra lateral con las etapas medidas en esta ejecución, si se pidió."""
+    if not st.session_state.get('mostrar_medicion'):
+        return
+    with st.sidebar.expander("Medición por etapa", expanded=True):
+        st.dataframe(medidor.tabla(), hide_index=True)
+        st.caption(
+            f"Ejecución completa: {medidor.segundos_transcurridos():,.2f} s. "
+            f"Registro: {RUTA_REGISTRO or 'desactivado'}."
+        )
 
+# Continúa el perfil empezado después de los imports y lo guarda al terminar la ejecución
+pagina_ejecucion = st.session_state['page']
+with perfilar_ejecucion(
+    perfil_en_curso is not None, pagina_ejecucion,
+    lambda: filtros_activos(pagina_ejecucion), medidor.ejecucion, en_curso=perfil_en_curso
+):
+    # Sidebar for navigation
+    with st.sidebar:
+        st.image("https://www.sura.com/blogs/wp-content/uploads/2018/02/LogoSURA.png", width=200) # Replace with actual Sura logo if available
+        st.title("Menú Principal")
+        if st.button("Cargar Datos", key="nav_upload"):
+            navigate_to('upload')
+        if 'df' in st.session_state and st.session_state['df'] is not None:
+            if st.button("Análisis de Costos y Avisos", key="nav_costos"):
+                navigate_to('costos_avisos')
+            if st.button("Evaluación de Proveedores", key="nav_evaluacion"):
+                navigate_to('evaluacion')
+        else:
+            st.warning("Carga datos para habilitar otras secciones.")
+
+        with st.expander("Administración de caché"):
+            estado_cache = obtener_cache().estadisticas()
+            st.metric("Aciertos", f"{estado_cache['aciertos']:,}")
+            st.metric("Fallos", f"{estado_cache['fallos']:,}")
+            st.metric("Archivos en caché", f"{estado_cache['entradas']:,}")
+            st.metric(
+                "Espacio usado",
+                f"{estado_cache['bytes_usados'] / 1024**2:,.1f} MB de {estado_cache['limite_bytes'] / 1024**2:,.0f} MB"
+            )
+            estado_resultados = obtener_cache_resultados().estadisticas()
+            st.metric(
+                "Resultados en memoria: aciertos",
+                f"{estado_resultados['tasa_aciertos']:.0%}",
+                help="Consultas del tablero (agrupaciones, tendencia, indicadores) que se respondieron sin recalcular."
+            )
+            st.caption(
+                f"{estado_resultados['aciertos']:,} aciertos, {estado_resultados['fallos']:,} fallos; "
+                f"{estado_resultados['entradas']:,} de {estado_resultados['maximo']:,} resultados guardados."
+            )
+            estado_graficos = obtener_graficos().estadisticas()
+            st.caption(
+                f"Gráficos: {estado_graficos['tasa_aciertos']:.0%} sin volver a dibujar; "
+                f"{estado_graficos['entradas']:,} de {estado_graficos['maximo']:,} imágenes guardadas."
+            )
+            if st.button("Vaciar caché", key="vaciar_cache"):
+                obtener_cache().vaciar()
+                obtener_cache_resultados().vaciar()
+                obtener_graficos().vaciar()
+                st.rerun()
 
-# --- Page Logic ---
-if st.session_state['page'] == 'upload':
-    st.title("Carga de Datos")
-    st.write("Por favor, sube el archivo Excel que contiene las 5 hojas de datos (IW29, IW39, IH08, IW65, ZPM015).")
-    uploaded_file = st.file_uploader("Arrastra aquí tu archivo Excel o haz clic para buscar", type=["xlsx"])
+        st.checkbox(
+            "Mostrar medición por etapa", key="mostrar_medicion",
+            help="Tiempo real, tiempo de CPU y memoria de cada etapa de esta ejecución. "
+                 "Las etapas se guardan siempre en el registro de medición."
+        )
 
-    if uploaded_file:
-        st.info("Archivo cargando y procesando. Esto puede tardar unos segundos...")
-        try:
-            df = load_and_merge_data(uploaded_file)
-            st.session_state['df'] = df
-            st.success("¡Datos cargados y procesados exitosamente!")
-            st.write("Vista previa de los datos:")
-            st.dataframe(df.head())
-            st.info("Ahora puedes navegar a las secciones de análisis y evaluación desde el menú lateral.")
-            # Automatically navigate to Costos y Avisos for initial display
-            navigate_to('costos_avisos')
-        except Exception as e:
-            st.error(f"Hubo un error al procesar el archivo: {e}")
-            st.warning("Asegúrate de que el archivo Excel contenga las hojas correctas y los formatos esperados.")
+        if 'memoria_datos' in st.session_state:
+            with st.expander("Memoria de los datos"):
+                resumen_tipos = st.session_state['memoria_datos']
+                st.metric(
+                    "Memoria usada",
+                    f"{resumen_tipos['Bytes después'] / 1024**2:,.1f} MB",
+                    delta=f"{(resumen_tipos['Bytes después'] - resumen_tipos['Bytes antes']) / 1024**2:,.1f} MB",
+                    delta_color="inverse"
+                )
+                st.caption(f"Antes de compactar los tipos: {resumen_tipos['Bytes antes'] / 1024**2:,.1f} MB.")
+
+
+    # --- Page Logic ---
+    if st.session_state['page'] == 'upload':
+        st.title("Carga de Datos")
+        st.write("Por favor, sube el archivo Excel que contiene las 5 hojas de datos (IW29, IW39, IH08, IW65, ZPM015).")
+        st.write("Si vienes de la app de unión de avisos, sube el archivo `avisos_filtrados.parquet`: carga mucho más rápido que el Excel.")
+        uploaded_file = st.file_uploader("Arrastra aquí tu archivo Excel o haz clic para buscar", type=["xlsx", "parquet"])
+
+        if uploaded_file:
+            # Revisión previa de los encabezados, antes de la lectura completa
+            # (st.stop() termina el script: el panel de medición se muestra antes)
+            try:
+                with medidor.etapa("revisión del archivo"):
+                    faltantes = columnas_faltantes(uploaded_file.getvalue())
+            except ValueError as e:
+                st.error(f"{e} Sube el archivo .xlsx con los datos en la primera hoja o el .parquet generado al unir los avisos.")
+                mostrar_medicion_etapas()
+                st.stop()
+            if len(faltantes) == len(COLUMNAS_ESPERADAS):
+                st.error("La primera hoja del archivo no tiene ninguna de las columnas esperadas (¿es el libro SAP de 5 hojas sin unir?). Únelo primero con la app de unión de avisos.")
+                mostrar_medicion_etapas()
+                st.stop()
+            if faltantes:
+                st.warning(f"Advertencia: Faltan las siguientes columnas en el archivo: {', '.join(faltantes)}. El análisis podría verse afectado.")
+
+            st.info("Archivo cargando y procesando. Esto puede tardar unos segundos...")
+            try:
+                df = load_and_merge_data(uploaded_file)
+                st.session_state['df'] = df
+                st.success("¡Datos cargados y procesados exitosamente!")
+                st.write("Vista previa de los datos:")
+                st.dataframe(df.head())
+                st.info("Ahora puedes navegar a las secciones de análisis y evaluación desde el menú lateral.")
+                # Automatically navigate to Costos y Avisos for initial display
+                navigate_to('costos_avisos')
+            except Exception as e:
+                st.error(f"Hubo un error al procesar el archivo: {e}")
+                st.warning("Asegúrate de que el archivo Excel contenga las hojas correctas y los formatos esperados.")
+
+    elif st.session_state['page'] == 'costos_avisos':
+        if 'df' in st.session_state and st.session_state['df'] is not None:
+            costos_avisos_app = CostosAvisosApp(st.session_state['df'], st.session_state.get('cubo'), st.session_state.get('indice_filtros'))
+            costos_avisos_app.display_costos_avisos_dashboard()
+        else:
+            st.warning("Por favor, carga los datos primero desde la sección 'Cargar Datos'.")
 
-elif st.session_state['page'] == 'costos_avisos':
-    if 'df' in st.session_state and st.session_state['df'] is not None:
-        costos_avisos_app = CostosAvisosApp(st.session_state['df'])
-        costos_avisos_app.display_costos_avisos_dashboard()
-    else:
-        st.warning("Por favor, carga los datos primero desde la sección 'Cargar Datos'.")
+    elif st.session_state['page'] == 'evaluacion':
+        if 'df' in st.session_state and st.session_state['df'] is not None:
+            eval_app = EvaluacionProveedoresApp(st.session_state['df'], st.session_state.get('cubo'), st.session_state.get('indice_filtros'))
+            eval_app.display_evaluation_form()
+        else:
+            st.warning("Por favor, carga los datos primero desde la sección 'Cargar Datos'.")
 
-elif st.session_state['page'] == 'evaluacion':
-    if 'df' in st.session_state and st.session_state['df'] is not None:
-        eval_app = EvaluacionProveedoresApp(st.session_state['df'])
-        eval_app.display_evaluation_form()
-    else:
-        st.warning("Por favor, carga los datos primero desde la sección 'Cargar Datos'.")
+    # --- Medición por etapa de esta ejecución (al final, cuando ya terminaron todas las etapas) ---
+    mostrar_medicion_etapas()
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+Configuración de pytest: al estar en la raíz del repositorio, pytest agrega la raíz
+a sys.path y las pruebas de tests/ importan los módulos avisos_* directamente.
+"""
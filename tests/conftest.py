@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Datos compartidos por las pruebas del tablero."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def avisos_tablero():
+    """
+    Avisos con las columnas que usa el tablero después de enriquecerlos: varias filas
+    (acciones) por aviso, un proveedor y tipo de servicio vacíos, fechas vacías y
+    avisos sin horario.
+    """
+    rng = np.random.default_rng(11)
+    n_avisos = 80
+    avisos = pd.DataFrame({
+        "AVISO": np.arange(n_avisos) + 1000,
+        "PROVEEDOR": rng.choice(["PROVEEDOR A", "PROVEEDOR B", "PROVEEDOR C", None], n_avisos, p=[0.4, 0.3, 0.25, 0.05]),
+        "TIPO DE SERVICIO": rng.choice(["MANTENIMIENTO", "CALIBRACIÓN", "REPARACIÓN", None], n_avisos, p=[0.4, 0.3, 0.25, 0.05]),
+        "description_category": rng.choice(["MC", "PV", "Otros"], n_avisos),
+        "fecha_de_aviso": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 200 * 24, n_avisos), unit="h"),
+        "TIEMPO PARADA": np.round(rng.exponential(6.0, n_avisos), 2),
+        "HORA/ DIA": rng.choice([8.0, 12.0, 24.0, np.nan], n_avisos),
+        "DIAS/ AÑO": rng.choice([250.0, 365.0, np.nan], n_avisos),
+    })
+    avisos.loc[avisos.index[::17], "fecha_de_aviso"] = pd.NaT
+    # Cada aviso tiene de una a tres acciones; el costo queda solo en la primera fila
+    df = avisos.loc[avisos.index.repeat(rng.integers(1, 4, n_avisos))].reset_index(drop=True)
+    df["COSTO"] = np.where(~df["AVISO"].duplicated(), np.round(rng.lognormal(10, 1, len(df)), 0), 0.0)
+    for col in ("PROVEEDOR", "TIPO DE SERVICIO", "description_category"):
+        df[col] = df[col].astype("category")
+    return df
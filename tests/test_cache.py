@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Caché en disco de las hojas SAP y caché en memoria de resultados (política LRU)."""
+
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from avisos_cache import CacheColumnar, CacheResultados, huella_contenido
+from avisos_pipeline import cargar_y_unir
+from avisos_sintetico import escribir_libro_sap, generar_hojas_sap
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheColumnar(str(tmp_path / "cache"), limite_mb=64)
+
+
+def _tabla(n: int) -> pd.DataFrame:
+    return pd.DataFrame({"Aviso": range(n), "Status del sistema": pd.Categorical(["MEAB", "PTBO"] * (n // 2))})
+
+
+def test_tabla_guardada_igual_a_la_original(cache):
+    assert cache.leer("huella", "IW29") is None
+    assert cache.guardar("huella", "IW29", _tabla(10))
+    pd.testing.assert_frame_equal(cache.leer("huella", "IW29"), _tabla(10))
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["entradas"]) == (1, 1, 1)
+
+
+def test_limite_elimina_la_entrada_usada_hace_mas_tiempo(cache):
+    for huella, antiguedad in (("a", 300), ("b", 200)):
+        cache.guardar(huella, "IW29", _tabla(1000))
+        os.utime(os.path.join(cache.directorio, huella), (0, os.stat(cache.directorio).st_mtime - antiguedad))
+    # Leer 'a' la marca como recién usada: al superar el límite se elimina 'b'
+    assert cache.leer("a", "IW29") is not None
+    cache.limite_bytes = cache.estadisticas()["bytes_usados"] * 5 // 4  # caben dos entradas y media
+    cache.guardar("c", "IW29", _tabla(1000))
+    assert sorted(os.listdir(cache.directorio)) == ["a", "c"]
+    assert cache.leer("b", "IW29") is None
+
+
+def test_cargar_y_unir_desde_cache_igual_a_sin_cache(cache):
+    destino = io.BytesIO()
+    escribir_libro_sap(generar_hojas_sap(200, semilla=3), destino)
+    contenido = destino.getvalue()
+
+    sin_cache, _, reporte_union, reporte_filtros = cargar_y_unir(contenido)
+    primera, _, _, _ = cargar_y_unir(contenido, cache=cache)
+    segunda, tiempos, reporte_union_cache, reporte_filtros_cache = cargar_y_unir(contenido, cache=cache)
+
+    assert [tiempo["Hoja"] for tiempo in tiempos] == ["Unión (caché)"]
+    pd.testing.assert_frame_equal(primera, sin_cache)
+    pd.testing.assert_frame_equal(segunda, sin_cache)
+    pd.testing.assert_frame_equal(reporte_union_cache.drop(columns="Segundos"), reporte_union.drop(columns="Segundos"))
+    assert reporte_filtros_cache["Filas eliminadas"].tolist() == reporte_filtros["Filas eliminadas"].tolist()
+    # Otros filtros no reutilizan la unión guardada, pero sí las hojas ya leídas
+    _, tiempos, _, _ = cargar_y_unir(contenido, cache=cache, filtros={})
+    assert all(tiempo["Hoja"].endswith("(caché)") for tiempo in tiempos) and len(tiempos) == 5
+    assert len(os.listdir(os.path.join(cache.directorio, huella_contenido(contenido)))) == 5 + 3 * 2
+
+
+def test_resultados_descarta_el_usado_hace_mas_tiempo():
+    resultados = CacheResultados(maximo=2)
+    calculados = []
+
+    def obtener(clave):
+        return resultados.obtener((clave,), lambda: calculados.append(clave) or clave.upper())
+
+    assert [obtener("a"), obtener("b"), obtener("a"), obtener("c")] == ["A", "B", "A", "C"]
+    # 'b' era la entrada usada hace más tiempo al agregar 'c'
+    assert obtener("a") == "A" and obtener("b") == "B"
+    assert calculados == ["a", "b", "c", "b"]
+    estadisticas = resultados.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["entradas"]) == (2, 4, 2)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Matriz de calificaciones y su archivo SQLite, frente a un diccionario de puntuaciones como el original."""
+
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+from avisos_calificaciones import EVALUADOR_POR_DEFECTO, SIN_CALIFICAR, AlmacenCalificaciones, ruta_calificaciones
+
+PREGUNTAS = [
+    ("Desempeño técnico", "Disponibilidad"),
+    ("Desempeño técnico", "MTTR"),
+    ("Calidad", "Cumplimiento de la garantía"),
+    ("Calidad", "Documentación entregada"),
+]
+PROVEEDORES = ["PROVEEDOR A", "PROVEEDOR B", "PROVEEDOR C"]
+
+
+@pytest.fixture
+def puntuaciones():
+    """Puntuaciones por (pregunta, proveedor), como las guardaba la versión original en st.session_state."""
+    rng = np.random.default_rng(2)
+    celdas = [(pregunta, proveedor) for pregunta in PREGUNTAS for proveedor in PROVEEDORES]
+    elegidas = rng.choice(len(celdas), 8, replace=False)
+    return {celdas[i]: int(rng.integers(-1, 3)) for i in elegidas}
+
+
+def _almacen(puntuaciones: dict, ruta=None) -> AlmacenCalificaciones:
+    almacen = AlmacenCalificaciones(PREGUNTAS, PROVEEDORES, ruta)
+    for (pregunta, proveedor), valor in puntuaciones.items():
+        almacen.asignar(pregunta, proveedor, valor)
+    return almacen
+
+
+def test_resumen_igual_al_del_diccionario(puntuaciones):
+    almacen = _almacen(puntuaciones)
+    totales = {proveedor: 0 for proveedor in PROVEEDORES}
+    for (_, proveedor), valor in puntuaciones.items():
+        totales[proveedor] += valor
+    assert almacen.totales().to_dict() == totales
+
+    tabla = almacen.tabla()
+    for pregunta in PREGUNTAS:
+        for proveedor in PROVEEDORES:
+            esperado = puntuaciones.get((pregunta, proveedor))
+            celda = tabla.loc[pregunta, proveedor]
+            assert almacen.valor(pregunta, proveedor) == esperado
+            assert np.isnan(celda) if esperado is None else celda == esperado
+    assert almacen.hay_calificaciones()
+    assert not AlmacenCalificaciones(PREGUNTAS, PROVEEDORES).hay_calificaciones()
+
+
+def test_calificaciones_guardadas_se_recuperan(puntuaciones, tmp_path):
+    ruta = ruta_calificaciones("Evaluador 1", "Por Tipo de Servicio", "CALIBRACIÓN", str(tmp_path))
+    _almacen(puntuaciones, ruta).guardar()
+    np.testing.assert_array_equal(AlmacenCalificaciones(PREGUNTAS, PROVEEDORES, ruta).valores, _almacen(puntuaciones).valores)
+
+    # Con otras preguntas y proveedores, las calificaciones que ya no están se ignoran
+    otras = AlmacenCalificaciones(PREGUNTAS[1:], PROVEEDORES[::-1] + ["PROVEEDOR D"], ruta)
+    for pregunta in PREGUNTAS[1:]:
+        for proveedor in PROVEEDORES:
+            assert otras.valor(pregunta, proveedor) == puntuaciones.get((pregunta, proveedor))
+        assert otras.valor(pregunta, "PROVEEDOR D") is None
+
+
+def test_guardar_solo_escribe_los_cambios(puntuaciones, tmp_path):
+    ruta = ruta_calificaciones("", "Por Proveedor", "PROVEEDOR A", str(tmp_path))
+    assert os.path.basename(os.path.dirname(ruta)).startswith(EVALUADOR_POR_DEFECTO)
+    almacen = _almacen(puntuaciones, ruta)
+    almacen.guardar()
+    pregunta, proveedor = next(iter(puntuaciones))
+    almacen.asignar(pregunta, proveedor, puntuaciones[(pregunta, proveedor)])
+    assert not almacen._pendientes
+    nuevo = 2 if puntuaciones[(pregunta, proveedor)] != 2 else 1
+    almacen.asignar(pregunta, proveedor, nuevo)
+    assert len(almacen._pendientes) == 1
+    almacen.guardar()
+    assert not almacen._pendientes
+    assert AlmacenCalificaciones(PREGUNTAS, PROVEEDORES, ruta).valor(pregunta, proveedor) == nuevo
+    conexion = sqlite3.connect(ruta)
+    try:
+        assert conexion.execute("SELECT COUNT(*) FROM calificaciones").fetchone()[0] == len(puntuaciones)
+    finally:
+        conexion.close()
+
+
+def test_evaluaciones_en_archivos_distintos(tmp_path):
+    rutas = {
+        ruta_calificaciones(evaluador, modo, identificador, str(tmp_path))
+        for evaluador in ("Ana", "Luis") for modo, identificador in (("Por Tipo de Servicio", "A/B"), ("Por Tipo de Servicio", "A_B"))
+    }
+    assert len(rutas) == 4
+
+
+def test_almacen_sin_calificar():
+    almacen = AlmacenCalificaciones(PREGUNTAS, PROVEEDORES)
+    assert (almacen.valores == SIN_CALIFICAR).all()
+    assert almacen.totales().eq(0).all()
+    assert almacen.tabla().isna().all().all()
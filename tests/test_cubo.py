@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Indicadores de servicio y cubo de métricas frente al cálculo original sobre las filas."""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from avisos_cubo import CuboAvisos, indicadores_cubo, serie_mensual, valores_dimension
+from avisos_indicadores import calcular_tabla_indicadores
+
+COLUMNAS_ORIGINALES = ["Avisos", "Costo", "MTTR (hrs)", "MTBF (hrs)", "Disponibilidad (%)", "Rendimiento"]
+
+
+def _indicadores_original(df: pd.DataFrame, group_col: str) -> pd.DataFrame:
+    """calcular_indicadores de la versión original del tablero: una agrupación por indicador."""
+    grupos = df.groupby(group_col, observed=True)
+    cnt = grupos['AVISO'].nunique()
+    cost = grupos['COSTO'].sum()
+    mttr = grupos['TIEMPO PARADA'].mean()
+    ttot = grupos.agg(total_horas_anio=('DIAS/ AÑO', 'mean'), horas_dia=('HORA/ DIA', 'mean'))
+    ttot = (ttot['total_horas_anio'] * ttot['horas_dia']).replace([np.inf, -np.inf], np.nan).fillna(0)
+    mtbf = ((ttot - grupos['TIEMPO PARADA'].sum()) / cnt.replace(0, np.nan)).fillna(0)
+    disp = ((mtbf / (mtbf + mttr)).replace([np.inf, -np.inf], np.nan) * 100).fillna(0)
+    rend = disp.apply(lambda v: 'Alto' if v >= 90 else ('Medio' if v >= 75 else 'Bajo') if not pd.isna(v) else 'No Aplica')
+    tabla = pd.DataFrame(dict(zip(COLUMNAS_ORIGINALES, (cnt, cost, mttr, mtbf, disp, rend)))).reset_index()
+    return tabla.astype({group_col: str})
+
+
+def _comparar(tabla: pd.DataFrame, original: pd.DataFrame, group_col: str):
+    tabla = tabla[[group_col] + COLUMNAS_ORIGINALES].astype({group_col: str})
+    pd.testing.assert_frame_equal(tabla.reset_index(drop=True), original, check_dtype=False)
+
+
+@pytest.mark.parametrize("group_col", ["PROVEEDOR", "TIPO DE SERVICIO"])
+def test_indicadores_iguales_al_calculo_original(avisos_tablero, group_col):
+    tabla = calcular_tabla_indicadores(avisos_tablero, group_col)
+    _comparar(tabla, _indicadores_original(avisos_tablero, group_col), group_col)
+
+
+@pytest.mark.parametrize("filtros", [
+    {},
+    {"proveedor": "PROVEEDOR A"},
+    {"tipo_servicio": "CALIBRACIÓN", "desde": datetime.date(2024, 2, 1), "hasta": datetime.date(2024, 4, 30)},
+    {"proveedor": "PROVEEDOR B", "hasta": datetime.date(2024, 5, 31)},
+    {"proveedor": "PROVEEDOR SIN AVISOS"},
+])
+@pytest.mark.parametrize("group_col", ["PROVEEDOR", "TIPO DE SERVICIO"])
+def test_cubo_igual_a_las_filas_filtradas(avisos_tablero, filtros, group_col):
+    df = avisos_tablero
+    mascara = pd.Series(True, index=df.index)
+    if "proveedor" in filtros:
+        mascara &= df["PROVEEDOR"] == filtros["proveedor"]
+    if "tipo_servicio" in filtros:
+        mascara &= df["TIPO DE SERVICIO"] == filtros["tipo_servicio"]
+    if "desde" in filtros:
+        mascara &= df["fecha_de_aviso"].dt.date >= filtros["desde"]
+    if "hasta" in filtros:
+        mascara &= df["fecha_de_aviso"].dt.date <= filtros["hasta"]
+
+    celdas = CuboAvisos(df).seleccionar(**filtros)
+    assert celdas is not None
+    assert celdas["Filas"].sum() == mascara.sum()
+    _comparar(indicadores_cubo(celdas, group_col), _indicadores_original(df[mascara], group_col), group_col)
+
+
+def test_rango_que_corta_un_mes_se_calcula_sobre_las_filas(avisos_tablero):
+    cubo = CuboAvisos(avisos_tablero)
+    assert cubo.seleccionar(desde=datetime.date(2024, 2, 15)) is None
+    assert cubo.seleccionar(desde=datetime.date(2024, 2, 1)) is not None
+
+
+def test_serie_mensual_igual_a_resample(avisos_tablero):
+    celdas = CuboAvisos(avisos_tablero).seleccionar()
+    original = avisos_tablero.set_index("fecha_de_aviso").resample("ME").agg({"COSTO": "sum", "AVISO": "nunique"})
+    mensual = serie_mensual(celdas)
+    np.testing.assert_array_equal(mensual.index, original.index)
+    np.testing.assert_allclose(mensual["Costo"], original["COSTO"])
+    np.testing.assert_array_equal(mensual["Avisos"], original["AVISO"])
+
+
+def test_valores_dimension(avisos_tablero):
+    celdas = CuboAvisos(avisos_tablero).seleccionar()
+    assert valores_dimension(celdas, "PROVEEDOR") == sorted(avisos_tablero["PROVEEDOR"].dropna().unique())
+
+
+def test_aviso_en_varias_celdas_no_usa_el_cubo(avisos_tablero):
+    df = avisos_tablero.copy()
+    primera = df.index[df["AVISO"] == df["AVISO"].iloc[0]][0]
+    otra = "PV" if df.at[primera, "description_category"] != "PV" else "MC"
+    df = pd.concat([df, df.loc[[primera]].assign(description_category=otra)])
+    cubo = CuboAvisos(df)
+    assert not cubo.avisos_aditivos
+    assert cubo.seleccionar() is None
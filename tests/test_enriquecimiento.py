@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Columnas derivadas del tablero frente al cálculo original fila por fila."""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from avisos_enriquecimiento import RUTA_HORARIOS, cargar_horarios, enriquecer_avisos
+
+HORARIOS = {"HORARIO_1": (24.0, 364.91), "HORARIO_2": (23.5, 364.91), "HORARIO_9": (16.0, 312.78)}
+
+
+@pytest.fixture
+def horarios():
+    return pd.DataFrame(
+        [valores for valores in HORARIOS.values()], index=pd.Index(list(HORARIOS), name="HORARIO"),
+        columns=["HORA/ DIA", "DIAS/ AÑO"],
+    )
+
+
+@pytest.fixture
+def avisos():
+    return pd.DataFrame({
+        "texto_equipo": [" horario_1", "HORARIO_2 ", None, "HORARIO_77", "HORARIO_1", "HORARIO_9"],
+        "fecha_de_aviso": pd.to_datetime(["2024-01-15 00:00", "2024-12-31 23:00", None, None, "2024-07-04 08:15", "2024-01-02 00:00"]),
+        "descripcion": ["MC/FALLA", "  PV/PREVENTIVO", None, "mc/minúsculas", "SIN CATEGORÍA", "MC/FALLA"],
+    })
+
+
+def _original(df: pd.DataFrame) -> pd.DataFrame:
+    """Las columnas derivadas como las calculaba la versión original del tablero."""
+    df = df.copy()
+    df['HORARIO'] = df['texto_equipo'].str.strip().str.upper()
+    df['HORA/ DIA'] = pd.to_numeric(df['HORARIO'].map(lambda x: HORARIOS.get(x, (None, None))[0]), errors='coerce')
+    df['DIAS/ AÑO'] = pd.to_numeric(df['HORARIO'].map(lambda x: HORARIOS.get(x, (None, None))[1]), errors='coerce')
+    df["fecha_de_aviso"] = pd.to_datetime(df["fecha_de_aviso"], errors="coerce")
+    df["año"] = df["fecha_de_aviso"].dt.year
+    df["mes"] = df["fecha_de_aviso"].dt.strftime("%B")
+
+    def extract_description_category(description):
+        if pd.isna(description):
+            return "Otros"
+        match = re.match(r'^([A-Z]{2})/', str(description).strip())
+        return match.group(1) if match else "Otros"
+
+    df["description_category"] = df['descripcion'].apply(extract_description_category)
+    return df
+
+
+def test_columnas_derivadas_iguales_al_calculo_original(avisos, horarios):
+    enriquecidos = enriquecer_avisos(avisos.copy(), horarios)
+    original = _original(avisos)
+    for col in ("HORA/ DIA", "DIAS/ AÑO", "año"):
+        pd.testing.assert_series_equal(enriquecidos[col], original[col], check_dtype=False)
+    # HORARIO y la categoría son categóricas; los valores son los mismos
+    for col in ("HORARIO", "description_category", "mes"):
+        assert enriquecidos[col].astype(object).where(enriquecidos[col].notna(), None).tolist() == (
+            original[col].astype(object).where(original[col].notna(), None).tolist()
+        )
+
+
+def test_sin_columnas_de_origen(horarios):
+    enriquecidos = enriquecer_avisos(pd.DataFrame({"aviso": [1, 2]}), horarios)
+    assert enriquecidos["description_category"].tolist() == ["Otros", "Otros"]
+    assert enriquecidos[["HORA/ DIA", "DIAS/ AÑO", "año", "mes"]].isna().all().all()
+
+
+def test_tabla_de_horarios_versionada():
+    tabla = cargar_horarios(RUTA_HORARIOS)
+    assert tabla.index.is_unique and tabla.index.str.fullmatch(r"HORARIO_\d+").all()
+    assert tabla.loc["HORARIO_2"].tolist() == [23.5, 364.91]
+    assert np.isfinite(tabla.to_numpy()).all()
+
+
+def test_tabla_de_horarios_con_codigos_repetidos(tmp_path):
+    ruta = tmp_path / "horarios.csv"
+    ruta.write_text("HORARIO,HORA/ DIA,DIAS/ AÑO\nHORARIO_1,24,364.91\n horario_1 ,12,260.65\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="repite los horarios: HORARIO_1"):
+        cargar_horarios(str(ruta))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Exportaciones de avisos.py, también por el camino diferido de st.download_button."""
+
+import io
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+from avisos_exportacion import (
+    FILAS_POR_BLOQUE, es_parquet, escribir_csv, escribir_xlsx, exportar_csv, exportar_parquet, exportar_xlsx
+)
+
+
+@pytest.fixture
+def avisos():
+    return pd.DataFrame({
+        "Aviso": [1001, 1002, 1003],
+        "Fecha de aviso": pd.to_datetime(["2024-01-05 08:30", None, "2024-03-01 00:00"]),
+        "Costes tot.reales": [150.5, None, 0.0],
+        "Denominación ejecutante": pd.Categorical(["PROVEEDOR A", "PROVEEDOR B", "PROVEEDOR A"]),
+        "Código postal": ["050001", None, "110111"],
+    })
+
+
+def _descarga_diferida(generar) -> bytes:
+    """Bytes que recibe el navegador al pulsar un st.download_button(data=generar)."""
+    almacen = MemoryMediaFileStorage("/media")
+    gestor = MediaFileManager(almacen)
+    url = gestor.execute_deferred(gestor.add_deferred(generar, None, "prueba", "archivo"))
+    return almacen.get_file(url.rsplit("/", 1)[-1].split(".")[0]).content
+
+
+def _referencia(escribir, df) -> bytes:
+    destino = io.BytesIO()
+    escribir(df, destino)
+    return destino.getvalue()
+
+
+@pytest.mark.parametrize("exportar", [exportar_csv, exportar_xlsx, exportar_parquet])
+def test_exportacion_es_un_tipo_que_acepta_download_button(avisos, exportar):
+    datos, _ = convert_data_to_bytes_and_infer_mime(exportar(avisos), unsupported_error=TypeError("tipo no admitido"))
+    assert datos
+
+
+def test_csv_descargado_igual_al_escrito_en_memoria(avisos):
+    descargado = _descarga_diferida(lambda: exportar_csv(avisos))
+    assert descargado == _referencia(escribir_csv, avisos)
+    leido = pd.read_csv(io.BytesIO(descargado), dtype={"Código postal": str})
+    assert leido["Aviso"].tolist() == [1001, 1002, 1003]
+    assert leido["Código postal"].tolist()[::2] == ["050001", "110111"]
+
+
+def test_xlsx_descargado_conserva_los_datos(avisos):
+    descargado = _descarga_diferida(lambda: exportar_xlsx(avisos))
+    leido = pd.read_excel(io.BytesIO(descargado))
+    assert list(leido.columns) == list(avisos.columns)
+    assert leido["Aviso"].tolist() == avisos["Aviso"].tolist()
+    assert leido["Fecha de aviso"].iloc[0] == pd.Timestamp("2024-01-05 08:30")
+    assert pd.isna(leido["Fecha de aviso"].iloc[1])
+    assert leido["Costes tot.reales"].fillna(-1).tolist() == [150.5, -1, 0.0]
+
+
+def test_parquet_descargado_conserva_los_tipos(avisos):
+    # El tablero lee este archivo directamente (ver es_parquet en code_avisos (4).py)
+    descargado = _descarga_diferida(lambda: exportar_parquet(avisos))
+    assert es_parquet(descargado)
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(descargado)), avisos)
+
+
+@pytest.mark.parametrize("filas_por_bloque", [1, 2, FILAS_POR_BLOQUE])
+def test_csv_por_bloques_igual_a_to_csv_completo(avisos, filas_por_bloque, tmp_path):
+    # Un bloque con todas las horas a medianoche no debe perder la hora de la columna
+    grande = pd.concat([avisos] * 3, ignore_index=True)
+    esperado = grande.to_csv(index=False).encode("utf-8")
+    assert _referencia(lambda df, destino: escribir_csv(df, destino, filas_por_bloque), grande) == esperado
+    ruta = tmp_path / "avisos.csv"
+    escribir_csv(grande, str(ruta), filas_por_bloque)
+    assert ruta.read_bytes() == esperado
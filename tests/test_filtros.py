@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Índice de filtros del tablero frente a las máscaras booleanas sobre todo el DataFrame."""
+
+import datetime
+
+import numpy as np
+import pytest
+
+from avisos_filtros import IndiceFiltros
+
+PROVEEDORES = [None, "PROVEEDOR A", "PROVEEDOR C", "PROVEEDOR SIN AVISOS"]
+TIPOS = [None, "CALIBRACIÓN", "REPARACIÓN"]
+RANGOS = [
+    (None, None),
+    (datetime.date(2024, 2, 10), None),
+    (None, datetime.date(2024, 3, 31)),
+    (datetime.date(2024, 3, 5), datetime.date(2024, 3, 5)),
+    (datetime.date(2025, 1, 1), datetime.date(2025, 2, 1)),
+]
+
+
+def _mascara(df, proveedor, tipo_servicio, desde, hasta) -> np.ndarray:
+    """El filtro original: una comparación sobre todas las filas por cada filtro."""
+    mascara = np.ones(len(df), dtype=bool)
+    if proveedor is not None:
+        mascara &= (df["PROVEEDOR"] == proveedor).to_numpy()
+    if tipo_servicio is not None:
+        mascara &= (df["TIPO DE SERVICIO"] == tipo_servicio).to_numpy()
+    fechas = df["fecha_de_aviso"].dt.date
+    if desde is not None:
+        mascara &= (fechas >= desde).to_numpy()
+    if hasta is not None:
+        mascara &= (fechas <= hasta).to_numpy()
+    return mascara
+
+
+@pytest.mark.parametrize("categoricas", [True, False])
+def test_seleccion_igual_a_las_mascaras(avisos_tablero, categoricas):
+    df = avisos_tablero if categoricas else avisos_tablero.astype({"PROVEEDOR": object, "TIPO DE SERVICIO": object})
+    indice = IndiceFiltros(df)
+    for proveedor in PROVEEDORES:
+        for tipo_servicio in TIPOS:
+            for desde, hasta in RANGOS:
+                posiciones = indice.seleccionar(proveedor, tipo_servicio, desde, hasta)
+                esperado = np.flatnonzero(_mascara(df, proveedor, tipo_servicio, desde, hasta))
+                np.testing.assert_array_equal(posiciones, esperado)
+
+
+def test_rango_de_fechas(avisos_tablero):
+    primera, ultima = IndiceFiltros(avisos_tablero).rango_fechas()
+    assert (primera, ultima) == (avisos_tablero["fecha_de_aviso"].min(), avisos_tablero["fecha_de_aviso"].max())
+
+
+def test_selecciones_recordadas_de_solo_lectura(avisos_tablero):
+    indice = IndiceFiltros(avisos_tablero, maximo=2)
+    primera = indice.seleccionar("PROVEEDOR A")
+    assert indice.seleccionar("PROVEEDOR A") is primera
+    assert not primera.flags.writeable
+    indice.seleccionar("PROVEEDOR B")
+    indice.seleccionar("PROVEEDOR C")
+    # Solo se recuerdan las dos últimas; la primera se vuelve a calcular igual
+    nueva = indice.seleccionar("PROVEEDOR A")
+    assert nueva is not primera
+    np.testing.assert_array_equal(nueva, primera)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Lectura del libro SAP y revisión previa de hojas y encabezados, frente a pd.read_excel."""
+
+import io
+
+import pandas as pd
+import pytest
+
+from avisos_ingesta import (
+    COLUMNAS_POR_HOJA, HOJAS_SAP, leer_encabezados_xlsx, leer_hojas_sap, leer_hojas_sap_paralelo, revisar_libro
+)
+from avisos_sintetico import escribir_libro_sap, generar_hojas_sap
+
+
+@pytest.fixture(scope="module")
+def hojas():
+    return generar_hojas_sap(120, semilla=5)
+
+
+def _libro(hojas: dict, motor: str = "openpyxl") -> bytes:
+    """Libro con las hojas en el orden del diccionario; openpyxl guarda los textos como compartidos."""
+    destino = io.BytesIO()
+    with pd.ExcelWriter(destino, engine=motor) as libro:
+        for nombre, df in hojas.items():
+            df.to_excel(libro, sheet_name=nombre, index=False)
+    return destino.getvalue()
+
+
+@pytest.fixture(scope="module")
+def contenido(hojas):
+    destino = io.BytesIO()
+    escribir_libro_sap(hojas, destino)
+    return destino.getvalue()
+
+
+@pytest.mark.parametrize("motor", ["openpyxl", "xlsxwriter"])
+def test_encabezados_iguales_a_read_excel(hojas, motor):
+    renombradas = {**hojas, "IW29": hojas["IW29"].rename(columns={"Aviso": "  Aviso ", "Orden": 2024})}
+    contenido = _libro(renombradas, motor)
+    esperado = {
+        nombre: [str(col).strip() for col in df.columns]
+        for nombre, df in pd.read_excel(io.BytesIO(contenido), sheet_name=None, nrows=0).items()
+    }
+    assert leer_encabezados_xlsx(contenido) == esperado
+
+
+def test_lectura_igual_a_read_excel_por_hoja(contenido):
+    hojas, tiempos = leer_hojas_sap(io.BytesIO(contenido))
+    assert [tiempo["Hoja"] for tiempo in tiempos] == list(HOJAS_SAP)
+    for posicion, hoja in enumerate(HOJAS_SAP):
+        # La lectura original: pd.read_excel de cada hoja por posición, con los encabezados sin espacios
+        original = pd.read_excel(io.BytesIO(contenido), sheet_name=posicion)
+        original.columns = original.columns.str.strip()
+        original = original[[col for col in original.columns if col in COLUMNAS_POR_HOJA[hoja]]]
+        pd.testing.assert_frame_equal(hojas[hoja], original)
+
+
+def test_lectura_en_paralelo_igual_a_secuencial(contenido):
+    secuencial, _ = leer_hojas_sap(io.BytesIO(contenido))
+    paralelo, tiempos = leer_hojas_sap_paralelo(contenido, max_procesos=2)
+    # 'Proceso' solo aparece si las hojas se leyeron en otros procesos (sin volver a la lectura secuencial)
+    assert [(tiempo["Hoja"], "Proceso" in tiempo) for tiempo in tiempos] == [(hoja, True) for hoja in HOJAS_SAP]
+    for hoja in HOJAS_SAP:
+        pd.testing.assert_frame_equal(paralelo[hoja], secuencial[hoja])
+
+
+def test_revision_sin_errores(contenido):
+    revision = revisar_libro(contenido)
+    assert revision["Errores"] == [] and revision["Advertencias"] == []
+    assert revision["Hojas"] == {hoja: hoja for hoja in HOJAS_SAP}
+
+
+def test_revision_toma_por_posicion_la_hoja_con_otro_nombre(hojas):
+    revision = revisar_libro(_libro({("Avisos" if hoja == "IW29" else hoja): df for hoja, df in hojas.items()}))
+    assert revision["Errores"] == []
+    assert revision["Hojas"]["IW29"] == "Avisos"
+    assert "se usará la hoja 'Avisos' (posición 1)" in revision["Advertencias"][0]
+
+
+def test_revision_encuentra_hojas_y_columnas_que_faltan(hojas):
+    incompletas = {hoja: df for hoja, df in hojas.items() if hoja != "ZPM015"}
+    incompletas["IW39"] = hojas["IW39"].drop(columns="Total general (real)")
+    errores = revisar_libro(_libro(incompletas))["Errores"]
+    assert errores == [
+        "Falta la hoja 'ZPM015'. Hojas del archivo: IW29, IW39, IH08, IW65.",
+        "A la hoja 'IW39' (IW39) le faltan las columnas: 'Total general (real)'.",
+    ]
+    # Sin la revisión, la lectura completa falla con la primera hoja que no encuentra
+    with pytest.raises(ValueError, match="ZPM015"):
+        leer_hojas_sap(io.BytesIO(_libro(incompletas)))
+
+
+def test_revision_de_un_archivo_que_no_es_xlsx():
+    assert revisar_libro(b"Aviso;Equipo\n1;2\n")["Errores"] == ["El archivo no es un Excel .xlsx válido."]
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Unión de las hojas SAP, filtros previos y reparto del costo frente al cálculo original de avisos.py."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from avisos_ingesta import COLUMNAS_FINALES, COLUMNAS_IH08, COLUMNAS_ZPM015
+from avisos_pipeline import atribuir_costes, filtrar_hechos, unir_con_filtros, unir_hojas
+from avisos_sintetico import generar_hojas_sap
+
+
+@pytest.fixture
+def hojas():
+    return generar_hojas_sap(300, semilla=7)
+
+
+def _union_original(hojas: dict) -> pd.DataFrame:
+    """La cadena de pd.merge de la versión original de avisos.py, con las columnas finales que comparte."""
+    iw29, iw39, ih08, iw65, zpm015 = (hojas[h] for h in ("IW29", "IW39", "IH08", "IW65", "ZPM015"))
+    df = pd.merge(iw29, iw39[["Aviso", "Total general (real)"]], on="Aviso", how="left")
+    df = pd.merge(df, iw65.drop(columns=["Equipo", "Descripción"]), on="Aviso", how="left")
+    df = pd.merge(df, ih08[COLUMNAS_IH08], on="Equipo", how="left")
+    df = pd.merge(df, zpm015[COLUMNAS_ZPM015], on="Equipo", how="left")
+    df = df.rename(columns={"Texto": "Texto_equipo", "Total general (real)": "Costes tot.reales"})
+    return df[[col for col in COLUMNAS_FINALES if col in df.columns]]
+
+
+def _sin_ptbo(df: pd.DataFrame) -> pd.DataFrame:
+    return df[~df["Status del sistema"].str.contains("PTBO", case=False, na=False)].reset_index(drop=True)
+
+
+def test_union_igual_a_la_cadena_de_merge(hojas):
+    df, reporte = unir_hojas(hojas)
+    pd.testing.assert_frame_equal(df, _union_original(hojas).reset_index(drop=True))
+    assert [union["Filas después"] for union in reporte] == [len(hojas["IW29"])] + [len(df)] * 3
+
+
+def test_dimensiones_repetidas_no_multiplican_avisos(hojas):
+    # Con registros repetidos en IW39, IH08 y ZPM015 el resultado es el de unir las
+    # dimensiones sin repetidos (la primera fila de cada clave)
+    repetidas = generar_hojas_sap(300, tasa_duplicados=0.2, semilla=7)
+    df, reporte = unir_hojas(repetidas)
+    pd.testing.assert_frame_equal(df, unir_hojas(hojas)[0])
+    assert sum(union["Filas descartadas"] for union in reporte) == (
+        sum(len(repetidas[h]) - len(hojas[h]) for h in ("IW39", "IH08", "ZPM015"))
+    )
+
+
+def test_filtros_antes_de_unir_igual_a_filtrar_despues(hojas):
+    filtros = {
+        "excluir_status": "ptbo",
+        "fecha_desde": "2023-06-01", "fecha_hasta": "2024-06-30",
+        "centros_coste": ["CC0001", " CC0002 ", "CC0003"],
+    }
+    df, _, reporte = unir_con_filtros(hojas, filtros)
+
+    esperado = _sin_ptbo(_union_original(hojas))
+    fechas = esperado["Fecha de aviso"]
+    esperado = esperado[
+        (fechas >= "2023-06-01") & (fechas < "2024-07-01")
+        & esperado["Centro de coste"].isin(["CC0001", "CC0002", "CC0003"])
+    ]
+    pd.testing.assert_frame_equal(df, esperado.reset_index(drop=True))
+    assert [filtro["Filas antes"] - filtro["Filas eliminadas"] for filtro in reporte][-1] == df["Aviso"].nunique()
+
+
+def test_filtro_sin_columna_no_elimina_filas(hojas):
+    iw29, reporte = filtrar_hechos(hojas["IW29"].drop(columns="Centro de coste"), {"centros_coste": ["CC0001"]})
+    assert len(iw29) == len(hojas["IW29"])
+    assert reporte[0]["Filtro"].endswith("(columna no encontrada)")
+
+
+@pytest.fixture
+def unidos():
+    return pd.DataFrame({
+        "Aviso": [1, 1, 1, 2, 3, 3, None],
+        "Costes tot.reales": [90.0, 90.0, 90.0, None, "40", "40", 10.0],
+        "Texto grupo acción": ["REPARACIÓN", "REVISIÓN", "REVISIÓN", "AJUSTE", "AJUSTE", "OTRO", "AJUSTE"],
+    })
+
+
+def test_primera_fila_igual_al_transform_original(unidos):
+    original = unidos.copy()
+    original["Costes tot.reales"] = original.groupby("Aviso")["Costes tot.reales"].transform(
+        lambda x: [x.iloc[0]] + [0] * (len(x) - 1)
+    )
+    # La fila sin aviso no recibe costo (en el original ni siquiera formaba grupo)
+    original.loc[original["Aviso"].isna(), "Costes tot.reales"] = 0
+    original["Costes tot.reales"] = pd.to_numeric(original["Costes tot.reales"], errors="coerce").fillna(0)
+    pd.testing.assert_frame_equal(atribuir_costes(unidos, "primera_fila"), original)
+
+
+@pytest.mark.parametrize("pesos", [None, {"REPARACIÓN": 2, "REVISIÓN": 1, "AJUSTE": 0, "OTRO": 0}])
+def test_reparto_igual_al_calculo_por_aviso(unidos, pesos):
+    politica = "reparto_igual" if pesos is None else "por_grupo_accion"
+    repartido = atribuir_costes(unidos, politica, pesos)["Costes tot.reales"]
+
+    # Cálculo aviso por aviso, como se haría con un bucle en Python
+    esperado = pd.Series(0.0, index=unidos.index)
+    for _, filas in unidos.dropna(subset=["Aviso"]).groupby("Aviso"):
+        costo = pd.to_numeric(filas["Costes tot.reales"].iloc[0], errors="coerce")
+        peso = filas["Texto grupo acción"].map(pesos or {}).astype(float).fillna(1.0)
+        if peso.sum() == 0:
+            peso[:] = 1.0
+        esperado[filas.index] = 0.0 if pd.isna(costo) else costo * peso / peso.sum()
+    pd.testing.assert_series_equal(repartido, esperado, check_names=False)
+    # El reparto conserva el costo total de los avisos
+    assert np.isclose(repartido.sum(), 130.0)
+
+
+def test_politica_desconocida(unidos):
+    with pytest.raises(ValueError, match="Política de costo desconocida"):
+        atribuir_costes(unidos, "al_azar")
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Puntuación automática por reglas frente a los umbrales originales, entidad por entidad."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from avisos_puntuacion import REGLAS_PUNTUACION, puntuar_indicadores
+
+
+def _puntuacion_original(indicador: str, valor) -> int:
+    """Los if/else de la versión original de la grilla de evaluación, para un valor."""
+    if indicador == 'Rendimiento':
+        return {'Alto': 2, 'Medio': 1}.get(valor, 0)
+    if pd.isna(valor):
+        return 0
+    if indicador == 'Disponibilidad (%)':
+        return 2 if valor >= 98 else (1 if valor >= 75 else 0)
+    if indicador == 'MTTR (hrs)':
+        return 2 if valor <= 5 else (1 if valor <= 20 else 0)
+    return 2 if valor > 1000 else (1 if valor >= 100 else 0)
+
+
+@pytest.fixture
+def indicadores():
+    # Valores en los umbrales y justo a cada lado, y vacíos
+    return pd.DataFrame({
+        'Disponibilidad (%)': [98, 97.99, 75, 74.99, 100, 0, np.nan, 80],
+        'MTTR (hrs)': [5, 5.01, 20, 20.01, 0, np.nan, 3, 50],
+        'MTBF (hrs)': [1000, 1000.01, 100, 99.99, np.nan, 0, 5000, 150],
+        'Rendimiento': ['Alto', 'Medio', 'Bajo', 'No Aplica', None, 'Alto', 'Medio', 'Bajo'],
+    }, index=[f"PROVEEDOR {letra}" for letra in "ABCDEFGH"])
+
+
+def test_puntuacion_igual_a_los_umbrales_originales(indicadores):
+    puntuaciones = puntuar_indicadores(indicadores)
+    esperado = pd.DataFrame({
+        indicador: [_puntuacion_original(indicador, valor) for valor in indicadores[indicador]]
+        for indicador in REGLAS_PUNTUACION['Indicador'].unique()
+    }, index=indicadores.index).astype(np.int8)
+    pd.testing.assert_frame_equal(puntuaciones, esperado)
+
+
+def test_indicador_ausente_puntua_cero(indicadores):
+    puntuaciones = puntuar_indicadores(indicadores.drop(columns='MTBF (hrs)'))
+    assert (puntuaciones['MTBF (hrs)'] == 0).all()
+
+
+def test_orden_de_las_reglas_no_importa(indicadores):
+    # Solo cambia el orden de las columnas, que sigue al de las reglas
+    invertidas = REGLAS_PUNTUACION.iloc[::-1]
+    pd.testing.assert_frame_equal(
+        puntuar_indicadores(indicadores, invertidas), puntuar_indicadores(indicadores), check_like=True
+    )
+
+
+def test_comparacion_desconocida(indicadores):
+    reglas = pd.concat([REGLAS_PUNTUACION, pd.DataFrame([('MTTR (hrs)', 1, '~', 3)], columns=REGLAS_PUNTUACION.columns)])
+    with pytest.raises(ValueError, match="desconocidas: ~"):
+        puntuar_indicadores(indicadores, reglas)
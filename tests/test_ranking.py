@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Ranking por páginas frente a sort_values(ascending=False, kind='stable') de la serie completa."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from avisos_ranking import Ranking
+
+
+@pytest.fixture(params=["float", "int", "con vacíos"])
+def serie(request):
+    # Muchos empates, para que el orden entre iguales dependa de la estabilidad
+    valores = np.random.default_rng(3).integers(0, 6, 40).astype(float)
+    if request.param == "int":
+        valores = valores.astype("int64")
+    elif request.param == "con vacíos":
+        valores[::7] = np.nan
+    return pd.Series(valores, index=[f"GRUPO {i:02d}" for i in range(40)], name="Costo")
+
+
+def test_primeros_iguales_al_orden_completo(serie):
+    ordenada = serie.sort_values(ascending=False, kind="stable")
+    for k in range(len(serie) + 2):
+        pd.testing.assert_series_equal(Ranking(serie).primeros(k), ordenada.iloc[:k])
+
+
+@pytest.mark.parametrize("tamano", [1, 7, 10, 40])
+def test_paginas_iguales_a_cortes_del_orden_completo(serie, tamano):
+    ordenada = serie.sort_values(ascending=False, kind="stable")
+    ranking = Ranking(serie)
+    for inicio in range(0, len(serie), tamano):
+        pagina = ranking.pagina(inicio, inicio + tamano)
+        pd.testing.assert_series_equal(pagina, ordenada.iloc[inicio:inicio + tamano])
+        assert ranking.otros(pagina) == pytest.approx(serie.sum() - pagina.sum())
+
+
+def test_ranking_vacio():
+    ranking = Ranking(pd.Series([], dtype=float, name="Avisos"))
+    assert len(ranking) == 0 and ranking.pagina(0, 10).empty and ranking.otros(ranking.primeros(5)) == 0